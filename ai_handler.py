@@ -1,6 +1,12 @@
-import requests
+import io
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from speech import say
+from n8n_client import N8nClient, CircuitOpenError, RateLimiter
+from response_cache import ResponseCache, make_key
+from tracing import span, bind
+from image_upload import prepare_image, list_images
 
 # n8n webhook URLs (replace with your actual webhook URLs from n8n)
 N8N_TEXT_QUERY_URL = "http://localhost:5678/webhook/text-query-workflow"
@@ -9,16 +15,146 @@ N8N_IMAGE_TO_TEXT_URL = "http://localhost:5678/webhook/image-to-text-workflow"
 N8N_IMAGE_CAPTION_URL = "http://localhost:5678/webhook/image-caption-workflow"
 N8N_CODE_QUERY_URL = "http://localhost:5678/webhook/code-query-workflow"
 
+# (connect, read) timeouts per workflow; uploads and transcription get longer to answer.
+WORKFLOW_TIMEOUTS = {
+    N8N_TEXT_QUERY_URL: (3.05, 30),
+    N8N_CODE_QUERY_URL: (3.05, 60),
+    N8N_VOICE_TO_TEXT_URL: (3.05, 60),
+    N8N_IMAGE_TO_TEXT_URL: (3.05, 60),
+    N8N_IMAGE_CAPTION_URL: (3.05, 60),
+}
+
+# Shared client: pooled keep-alive connections, retries and a circuit breaker.
+n8n_client = N8nClient(timeouts=WORKFLOW_TIMEOUTS)
+
+# Workflows whose answers may be served from the response cache; set one to False to opt out.
+CACHED_WORKFLOWS = {
+    N8N_TEXT_QUERY_URL: True,
+    N8N_CODE_QUERY_URL: True,
+    N8N_IMAGE_TO_TEXT_URL: True,
+    N8N_IMAGE_CAPTION_URL: True,
+}
+RESPONSE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.jarvis_response_cache.json')
+response_cache = ResponseCache(persist_path=RESPONSE_CACHE_PATH)
+
+# Image results are keyed by the image's content hash, so they stay valid for as
+# long as the picture does; they get their own, larger cache.
+IMAGE_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.jarvis_image_cache.json')
+IMAGE_CACHE_TTL = 30 * 24 * 3600
+image_cache = ResponseCache(max_entries=4096, ttl=IMAGE_CACHE_TTL, persist_path=IMAGE_CACHE_PATH)
+
+# "extract text from all images in <folder>": uploads in flight at once, and uploads started per second.
+IMAGE_BATCH_WORKERS = 4
+IMAGE_BATCH_RATE = 2.0
+
+def _extract_result(payload):
+    return payload.get("result", "No result returned from n8n")
+
 def call_n8n_workflow(webhook_url, data=None, files=None):
     """Helper function to call an n8n workflow."""
+    cache_key = None
+    if not files and data and "prompt" in data and CACHED_WORKFLOWS.get(webhook_url):
+        cache_key = make_key(webhook_url, data["prompt"])
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print("[DEBUG] Answering from the response cache.")
+            return cached
+    return _post_workflow(webhook_url, data, files, cache_key, response_cache)
+
+def _post_workflow(webhook_url, data, files, cache_key=None, cache=None):
     try:
-        response = requests.post(webhook_url, json=data if not files else None, files=files)
-        response.raise_for_status()
-        return response.json().get("result", "No result returned from n8n")
+        payload = n8n_client.post_json(webhook_url, data=data, files=files)
+        if cache_key is not None and payload.get("result"):
+            cache.put(cache_key, payload["result"])
+        return _extract_result(payload)
+    except CircuitOpenError as e:
+        print(f"[WARN] Skipping n8n workflow: {e}")
+        return None
     except Exception as e:
         print(f"[ERROR] Failed to call n8n workflow: {e}")
         return None
 
+# Speak streamed answers sentence by sentence instead of waiting for the whole reply.
+STREAM_TEXT_RESPONSES = True
+# A run-on fragment longer than this is spoken at the last word break anyway.
+MAX_SENTENCE_CHARS = 300
+
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+|\n+')
+
+class SentenceBuffer:
+    """Accumulates streamed text and hands out complete sentences."""
+
+    def __init__(self):
+        self._pending = ""
+
+    def feed(self, text):
+        """Add a fragment; return the sentences it completed."""
+        self._pending += text
+        parts = _SENTENCE_END.split(self._pending)
+        self._pending = parts.pop()
+        if len(self._pending) > MAX_SENTENCE_CHARS and " " in self._pending:
+            head, self._pending = self._pending.rsplit(" ", 1)
+            parts.append(head)
+        return [part.strip() for part in parts if part.strip()]
+
+    def flush(self):
+        """Return whatever is left once the stream has ended."""
+        rest, self._pending = self._pending.strip(), ""
+        return [rest] if rest else []
+
+def call_n8n_workflow_stream(webhook_url, data=None, on_sentence=say, cancel_event=None):
+    """
+    Call an n8n workflow that streams its answer, passing each complete sentence
+    to on_sentence as soon as it arrives. Returns the full transcript, or None.
+    Setting cancel_event stops reading (and speaking) the rest of the answer.
+    """
+    cache_key = None
+    if data and "prompt" in data and CACHED_WORKFLOWS.get(webhook_url):
+        cache_key = make_key(webhook_url, data["prompt"])
+        cached = response_cache.get(cache_key)
+        if cached is not None:
+            print("[DEBUG] Answering from the response cache.")
+            on_sentence(cached)
+            return cached
+
+    fragments = []
+    sentences = SentenceBuffer()
+    complete = False
+    try:
+        with span("n8n_stream") as s:
+            for fragment in n8n_client.stream_text(webhook_url, data=data):
+                if cancel_event is not None and cancel_event.is_set():
+                    print("[INFO] Streamed answer cancelled.")
+                    return None
+                fragments.append(fragment)
+                for sentence in sentences.feed(fragment):
+                    on_sentence(sentence)
+            s.set(fragments=len(fragments))
+        complete = True
+    except CircuitOpenError as e:
+        print(f"[WARN] Skipping n8n workflow: {e}")
+        return None
+    except Exception as e:
+        print(f"[ERROR] Failed to stream n8n workflow: {e}")
+        if not fragments:
+            return None
+    for sentence in sentences.flush():
+        on_sentence(sentence)
+
+    transcript = "".join(fragments).strip()
+    if not transcript:
+        return None
+    if cache_key is not None and complete:
+        response_cache.put(cache_key, transcript)
+    return transcript
+
+def call_n8n_workflow_async(webhook_url, data=None, files=None):
+    """
+    Start an n8n workflow call on the client's thread pool, so several can be in flight.
+    Returns a Future that resolves to the result text, or None on failure.
+    """
+    return n8n_client.executor.submit(bind(call_n8n_workflow), webhook_url, data, files)
+
 def handle_code_query(prompt):
     """Handle code generation or debugging via n8n workflow."""
     data = {"prompt": prompt}
@@ -30,9 +166,18 @@ def handle_code_query(prompt):
     say("Sorry, I couldn't assist with the code.")
     return None
 
-def handle_text_query(prompt):
+def handle_text_query(prompt, stream=None, cancel_event=None):
     """Handle text-based AI queries via n8n workflow."""
     data = {"prompt": prompt}
+    if stream is None:
+        stream = STREAM_TEXT_RESPONSES
+    if stream:
+        result = call_n8n_workflow_stream(N8N_TEXT_QUERY_URL, data, on_sentence=say, cancel_event=cancel_event)
+        if result or (cancel_event is not None and cancel_event.is_set()):
+            print(result)
+            return result
+        say("Sorry, I couldn't process the AI request.")
+        return None
     result = call_n8n_workflow(N8N_TEXT_QUERY_URL, data)
     if result:
         print(result)
@@ -41,12 +186,16 @@ def handle_text_query(prompt):
     say("Sorry, I couldn't process the AI request.")
     return None
 
-def handle_voice_to_text(audio_path):
-    """Handle voice-to-text transcription via n8n workflow."""
+def handle_voice_to_text(audio):
+    """Handle voice-to-text transcription via n8n workflow. audio is WAV bytes or the path of a .wav file."""
     try:
-        with open(audio_path, "rb") as audio_file:
-            files = {"audio": audio_file}
+        if isinstance(audio, (bytes, bytearray)):
+            files = {"audio": ("audio.wav", io.BytesIO(audio), "audio/wav")}
             result = call_n8n_workflow(N8N_VOICE_TO_TEXT_URL, files=files)
+        else:
+            with open(audio, "rb") as audio_file:
+                files = {"audio": audio_file}
+                result = call_n8n_workflow(N8N_VOICE_TO_TEXT_URL, files=files)
         if result:
             print(result)
             say(f"I heard: {result}")
@@ -56,12 +205,29 @@ def handle_voice_to_text(audio_path):
     say("Sorry, I couldn't transcribe the audio.")
     return None
 
+def call_image_workflow(webhook_url, image_path, limiter=None):
+    """
+    Send an image to an n8n workflow. Results are cached by the image's content
+    hash, so a picture already processed is not uploaded again; oversized
+    images are downscaled first. limiter, if given, paces the uploads.
+    """
+    image = prepare_image(image_path)
+    cache_key = None
+    if CACHED_WORKFLOWS.get(webhook_url):
+        cache_key = make_key(webhook_url, f"sha256:{image.digest}")
+        cached = image_cache.get(cache_key)
+        if cached is not None:
+            print(f"[DEBUG] Answering {os.path.basename(image_path)} from the image cache.")
+            return cached
+    if limiter is not None:
+        limiter.acquire()
+    files = {"image": (image.filename, io.BytesIO(image.data), image.mimetype)}
+    return _post_workflow(webhook_url, None, files, cache_key, image_cache)
+
 def handle_image_to_text(image_path):
     """Handle image-to-text extraction via n8n workflow."""
     try:
-        with open(image_path, "rb") as image_file:
-            files = {"image": image_file}
-            result = call_n8n_workflow(N8N_IMAGE_TO_TEXT_URL, files=files)
+        result = call_image_workflow(N8N_IMAGE_TO_TEXT_URL, image_path)
         if result:
             print(result)
             say(f"Text in image: {result}")
@@ -74,9 +240,7 @@ def handle_image_to_text(image_path):
 def handle_multimodal_image_caption(image_path):
     """Handle image captioning via n8n workflow."""
     try:
-        with open(image_path, "rb") as image_file:
-            files = {"image": image_file}
-            result = call_n8n_workflow(N8N_IMAGE_CAPTION_URL, files=files)
+        result = call_image_workflow(N8N_IMAGE_CAPTION_URL, image_path)
         if result:
             print(result)
             say(f"Image description: {result}")
@@ -84,4 +248,55 @@ def handle_multimodal_image_caption(image_path):
     except Exception as e:
         print(f"[ERROR] Image captioning failed: {e}")
     say("Sorry, I couldn't describe the image.")
-    return None
\ No newline at end of file
+    return None
+
+def extract_text_from_images(image_paths, on_result=None, max_workers=IMAGE_BATCH_WORKERS, rate=IMAGE_BATCH_RATE,
+                             cancel_event=None):
+    """
+    Extract text from many images at once, on a bounded pool with uploads paced
+    at `rate` per second. on_result(path, text) is called as each image
+    finishes (text is None on failure); returns {path: text}. Once
+    cancel_event is set, images not yet uploaded are skipped.
+    """
+    limiter = RateLimiter(rate)
+    results = {}
+
+    def extract(path):
+        if cancel_event is not None and cancel_event.is_set():
+            return None
+        try:
+            return call_image_workflow(N8N_IMAGE_TO_TEXT_URL, path, limiter)
+        except Exception as e:
+            print(f"[ERROR] Image to text failed for {path}: {e}")
+            return None
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="image-batch") as executor:
+        futures = {executor.submit(bind(extract), path): path for path in image_paths}
+        for future in as_completed(futures):
+            path = futures[future]
+            results[path] = future.result()
+            if on_result is not None:
+                on_result(path, results[path])
+    return results
+
+def handle_folder_image_text(folder, cancel_event=None):
+    """Extract text from every image in folder, speaking each result as it arrives."""
+    images = list_images(folder)
+    if not images:
+        say(f"I couldn't find any images in {os.path.basename(folder) or folder}.")
+        return None
+
+    def announce(path, text):
+        name = os.path.basename(path)
+        print(f"[RESULT] {name}: {text}")
+        if text:
+            say(f"{name}: {text}")
+
+    say(f"Extracting text from {len(images)} images.")
+    results = extract_text_from_images(images, on_result=announce, cancel_event=cancel_event)
+    done = sum(1 for text in results.values() if text)
+    if cancel_event is not None and cancel_event.is_set():
+        say(f"Stopped. Got text from {done} of {len(images)} images.")
+    else:
+        say(f"Finished. Got text from {done} of {len(images)} images.")
+    return results
\ No newline at end of file
@@ -1,19 +1,28 @@
 import os
+import ntpath
 import subprocess
 import csv
-import psutil
-from difflib import get_close_matches
+import threading
+from collections import Counter, namedtuple
+from difflib import SequenceMatcher
 from speech import say
+from catalog import get_catalog
+from process_index import get_process_index
+from resolution_cache import get_resolution_cache
 
 CSV_FILE = "installed_apps.csv"
+# Look apps up in the SQLite catalog (installed_apps.csv is imported into it
+# whenever the file changes); set to False to read the CSV directly.
+USE_CATALOG = True
 
-def load_installed_apps():
-    if not os.path.exists(CSV_FILE):
-        print(f"[WARN] {CSV_FILE} not found. Please run the app scanner first.")
+def load_installed_apps(csv_file=None):
+    csv_file = csv_file or CSV_FILE
+    if not os.path.exists(csv_file):
+        print(f"[WARN] {csv_file} not found. Please run the app scanner first.")
         return []
 
     apps = []
-    with open(CSV_FILE, mode='r', encoding='utf-8') as f:
+    with open(csv_file, mode='r', encoding='utf-8') as f:
         reader = csv.DictReader(f)
         for row in reader:
             apps.append((
@@ -24,32 +33,249 @@ def load_installed_apps():
             ))
     return apps
 
-def find_app_path(app_name, apps):
-    app_name = app_name.lower()
-    all_app_names = [name for name, _, _, _ in apps]
+def normalize_app_name(name):
+    return " ".join(name.lower().split())
 
-    for name, exe_path, shortcut_path, app_user_model_id in apps:
-        if app_name in name:
-            return exe_path or shortcut_path, app_user_model_id
+# The registry's list and indexes, published together so a lookup never mixes two builds.
+_AppIndex = namedtuple("_AppIndex", ["apps", "names", "by_name", "by_token", "by_trigram"])
 
-    close_matches = get_close_matches(app_name, all_app_names, n=1, cutoff=0.6)
-    if close_matches:
-        matched_name = close_matches[0]
-        for name, exe_path, shortcut_path, app_user_model_id in apps:
-            if name == matched_name:
-                return exe_path or shortcut_path, app_user_model_id
+def _trigrams(text, padded=False):
+    if padded:
+        text = f" {text} "
+    return {text[i:i + 3] for i in range(len(text) - 2)}
 
-    return None, None
+class AppRegistry:
+    """
+    In-memory view of the installed apps list with precomputed lookup indexes.
+    Names are normalized once and indexed by exact name, by word and by trigram.
+    """
+
+    # Fuzzy lookup counts trigram overlap over at most this many postings,
+    # taking the rarest (most selective) trigrams first.
+    FUZZY_POSTING_BUDGET = 2048
+    FUZZY_CANDIDATES = 32
+    FUZZY_CUTOFF = 0.6
+
+    def __init__(self, apps=()):
+        self._build(list(apps))
+
+    def _build(self, apps):
+        names = [normalize_app_name(name) for name, _, _, _ in apps]
+        by_name = {}
+        by_token = {}
+        by_trigram = {}
+        for i, name in enumerate(names):
+            by_name.setdefault(name, i)
+            for token in set(name.split()):
+                by_token.setdefault(token, []).append(i)
+            # Padded trigrams also cover word edges, which helps fuzzy lookup of
+            # short names; they are a superset of the name's inner trigrams.
+            for gram in _trigrams(name, padded=True):
+                by_trigram.setdefault(gram, []).append(i)
+        # One assignment, so a find() running on another thread sees either the
+        # old build or the new one, never a mix of both.
+        self._index = _AppIndex(apps, names, by_name, by_token, by_trigram)
+
+    def __len__(self):
+        return len(self._index.apps)
+
+    @property
+    def version(self):
+        """Changes whenever the app list does; None for a fixed list, which is not worth memoizing."""
+        return None
+
+    def _result(self, index, i):
+        _, exe_path, shortcut_path, app_user_model_id = index.apps[i]
+        return exe_path or shortcut_path, app_user_model_id
+
+    def _find_substring(self, index, query):
+        """Index of the first app (in list order) whose name contains query."""
+        if len(query) < 3:
+            # An app with query as a whole word bounds the scan, but an earlier
+            # app may still contain it inside a word.
+            words = index.by_token.get(query)
+            end = words[0] if words else len(index.names)
+            return next((i for i in range(end) if query in index.names[i]), words[0] if words else None)
+        postings = [index.by_trigram.get(gram) for gram in _trigrams(query)]
+        if not all(postings):
+            return None
+        # Posting lists are in list order, so the first verified hit is the earliest app.
+        for i in min(postings, key=len):
+            if query in index.names[i]:
+                return i
+        return None
+
+    def _find_fuzzy(self, index, query):
+        """Index of the closest app name by difflib ratio, scored over trigram candidates only."""
+        grams = _trigrams(query, padded=True)
+        postings = sorted((index.by_trigram[gram] for gram in grams if gram in index.by_trigram), key=len)
+        if not postings:
+            return None
+        overlap = Counter(postings[0])
+        budget = self.FUZZY_POSTING_BUDGET - len(postings[0])
+        for p in postings[1:]:
+            if len(p) > budget:
+                break
+            overlap.update(p)
+            budget -= len(p)
+
+        matcher = SequenceMatcher()
+        matcher.set_seq2(query)
+        best, best_ratio = None, self.FUZZY_CUTOFF
+        for i, _ in overlap.most_common(self.FUZZY_CANDIDATES):
+            matcher.set_seq1(index.names[i])
+            if (matcher.real_quick_ratio() >= best_ratio and matcher.quick_ratio() >= best_ratio):
+                ratio = matcher.ratio()
+                if ratio > best_ratio or (ratio == best_ratio and best is None):
+                    best, best_ratio = i, ratio
+        return best
+
+    def find(self, app_name):
+        """Resolve an app name to (path, AppUserModelID); (None, None) if nothing matches."""
+        query = normalize_app_name(app_name)
+        if not query:
+            return None, None
+        index = self._index
+        i = index.by_name.get(query)
+        if i is None:
+            i = self._find_substring(index, query)
+        if i is None:
+            i = self._find_fuzzy(index, query)
+        return self._result(index, i) if i is not None else (None, None)
+
+class _CsvAppRegistry(AppRegistry):
+    """AppRegistry backed by a CSV file, reloaded only when the file changes."""
+
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+        self._version = None
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def refresh(self):
+        try:
+            stat = os.stat(self.csv_file)
+            version = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            version = None
+        with self._lock:
+            if version != self._version or version is None:
+                self._build(load_installed_apps(self.csv_file))
+                self._version = version
+        return self
+
+    @property
+    def version(self):
+        return self._version
+
+class _CatalogAppRegistry(AppRegistry):
+    """
+    AppRegistry backed by the catalog. Exact names are answered by an indexed
+    query; the in-memory indexes for substring and fuzzy lookup are only built
+    when such a lookup is needed, and rebuilt when the apps table changes.
+    """
+
+    def __init__(self, catalog, csv_file):
+        self.catalog = catalog
+        self.csv_file = csv_file
+        self._generation = None
+        self._source = None
+        self._built_generation = None
+        self._count = (None, 0)  # (generation, number of apps)
+        self._lock = threading.Lock()
+        super().__init__()
+
+    def refresh(self):
+        try:
+            self.catalog.import_csv_if_changed("apps", self.csv_file)
+        except Exception as e:
+            print(f"[WARN] Failed to import {self.csv_file} into the catalog: {e}")
+        self._generation = self.catalog.generation("apps")
+        self._source = self.catalog.get_meta("apps_source")
+        return self
+
+    def __len__(self):
+        # count(*) walks the whole table, so it is only redone when the table changes.
+        generation, count = self._count
+        if generation != self._generation:
+            generation = self._generation
+            count = self.catalog.count("apps")
+            self._count = (generation, count)
+        return count
+
+    @property
+    def version(self):
+        # The generation alone restarts at 1 in a new catalog file; the imported CSV version does not.
+        return f"{self._generation}|{self._source}"
+
+    def _ensure_built(self):
+        with self._lock:
+            if self._built_generation != self._generation:
+                self._build([(name.lower(), exe, shortcut, app_id)
+                             for name, exe, shortcut, app_id in self.catalog.all_apps()])
+                self._built_generation = self._generation
+
+    def find(self, app_name):
+        row = self.catalog.find_app(app_name)
+        if row is not None:
+            return row[1] or row[2], row[3]
+        self._ensure_built()
+        return super().find(app_name)
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+def get_app_registry(csv_file=None):
+    """
+    Return the process-wide app registry, reloading it if its source changed.
+    Uses the catalog unless an explicit csv_file is given or USE_CATALOG is off.
+    """
+    if csv_file is None and USE_CATALOG:
+        catalog = get_catalog()
+        key = (catalog.path, CSV_FILE)
+        factory = lambda: _CatalogAppRegistry(catalog, CSV_FILE)
+    else:
+        key = csv_file = csv_file or CSV_FILE
+        factory = lambda: _CsvAppRegistry(csv_file)
+    with _registries_lock:
+        registry = _registries.get(key)
+        if registry is None:
+            registry = _registries[key] = factory()
+    return registry.refresh()
+
+def find_app_path(app_name, apps=None):
+    """Resolve app_name against the installed apps registry, or an explicit apps list."""
+    registry = get_app_registry() if apps is None else AppRegistry(apps)
+    return registry.find(app_name)
+
+def resolve_app(app_name, registry=None):
+    """
+    registry.find(app_name), memoized in the resolution cache for as long as
+    the app list is unchanged. Returns (app_path, app_user_model_id).
+    """
+    if registry is None:
+        registry = get_app_registry()
+    version = registry.version
+    if version is None:
+        return registry.find(app_name)
+    cache = get_resolution_cache()
+    cached = cache.get("app", app_name, version)
+    if cached is not None:
+        return tuple(cached)
+    # Misses are remembered too: "open youtube" should not search the apps every time.
+    app_path, app_user_model_id = registry.find(app_name)
+    cache.put("app", app_name, version, [app_path, app_user_model_id])
+    return app_path, app_user_model_id
 
 def open_app(query):
     app_name = query.lower().replace("open", "").strip()
 
-    apps = load_installed_apps()
-    if not apps:
+    registry = get_app_registry()
+    if not len(registry):
         say("I don't have the list of installed applications. Please update the app list first.")
         return False
 
-    app_path, app_user_model_id = find_app_path(app_name, apps)
+    app_path, app_user_model_id = resolve_app(app_name, registry)
 
     if app_user_model_id:
         try:
@@ -77,28 +303,37 @@ def open_app(query):
         say(f"I couldn't find {app_name} on your system.")
         return False
 
-def close_app(query):
-    app_name = query.lower().replace("close", "").strip()
-    matched_processes = []
+def _executable_name(app_name):
+    """Basename of the installed app's executable for app_name, if it resolves to one."""
+    try:
+        app_path, _ = resolve_app(app_name)
+    except Exception as e:
+        print(f"[WARN] Could not look up {app_name} in the installed apps: {e}")
+        return None
+    if app_path and app_path.lower().endswith(".exe"):
+        return ntpath.basename(app_path)
+    return None
 
-    for proc in psutil.process_iter(['pid', 'name']):
-        try:
-            pname = proc.info['name'].lower()
-            if app_name in pname:
-                matched_processes.append(proc)
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            continue
+def close_app(query, processes=None):
+    app_name = query.lower().replace("close", "").strip()
+    if processes is None:
+        processes = get_process_index()
+    matched_processes = processes.find(app_name, resolve_executable=_executable_name)
 
     if not matched_processes:
         say(f"I couldn't find any running app named {app_name}.")
         return False
 
     for proc in matched_processes:
-        try:
-            print(f"[DEBUG] Terminating process: {proc.name()} (PID: {proc.pid})")
-            proc.terminate()
-        except Exception as e:
-            print(f"[ERROR] Failed to terminate {proc.name()}: {e}")
+        print(f"[DEBUG] Terminating process: {proc.name()} (PID: {proc.pid})")
+    gone, alive = processes.terminate(matched_processes)
 
+    if alive:
+        print(f"[ERROR] Failed to close PIDs: {', '.join(str(proc.pid) for proc in alive)}")
+        if not gone:
+            say(f"Sorry, I couldn't close {app_name}.")
+            return False
+        say(f"Closed {app_name}, but {len(alive)} of its processes are still running.")
+        return True
     say(f"Closed {app_name}.")
     return True
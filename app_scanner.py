@@ -3,13 +3,16 @@ import csv
 import subprocess
 import json
 import glob
-import win32com.client
+from lnk_parser import ShortcutCache, resolve_shortcuts
+from catalog import get_catalog
 
 CSV_FILE = "installed_apps.csv"
+# Parsed shortcuts by path and mtime, so rescans only re-read changed .lnk files
+SHORTCUT_CACHE_FILE = "shortcut_cache.json"
 
 START_MENU_DIRS = [
-    os.path.join(os.environ["PROGRAMDATA"], r"Microsoft\Windows\Start Menu\Programs"),
-    os.path.join(os.environ["APPDATA"], r"Microsoft\Windows\Start Menu\Programs")
+    os.path.join(os.environ.get("PROGRAMDATA", r"C:\ProgramData"), r"Microsoft\Windows\Start Menu\Programs"),
+    os.path.join(os.environ.get("APPDATA", ""), r"Microsoft\Windows\Start Menu\Programs")
 ]
 
 PROGRAM_FILES_DIRS = [
@@ -30,17 +33,40 @@ def process_shortcut(file, root, shell):
         print(f"[ERROR] Failed to read shortcut {file}: {e}")
         return None
 
+def _com_shell():
+    try:
+        import win32com.client
+        return win32com.client.Dispatch("WScript.Shell")
+    except Exception as e:
+        print(f"[WARN] COM shortcut resolution unavailable: {e}")
+        return None
+
 def scan_shortcuts():
     print("[DEBUG] Scanning Start Menu shortcuts...")
-    apps = []
-    shell = win32com.client.Dispatch("WScript.Shell")
+    paths = []
     for directory in START_MENU_DIRS:
         if os.path.exists(directory):
             for root, _, files in os.walk(directory):
-                for file in files:
-                    result = process_shortcut(file, root, shell)
-                    if result:
-                        apps.append(result)
+                paths.extend(os.path.join(root, file) for file in files if file.lower().endswith(".lnk"))
+
+    cache = ShortcutCache(SHORTCUT_CACHE_FILE)
+    links = resolve_shortcuts(paths, cache)
+    cache.prune(paths)
+    cache.save()
+
+    apps = []
+    shell = None
+    for path in paths:
+        link = links[path]
+        if link is not None and (link.target or link.app_id):
+            apps.append((os.path.splitext(os.path.basename(path))[0], link.target, path, link.app_id))
+            continue
+        # The parser could not resolve it (e.g. an advertised installer shortcut): ask the shell.
+        if shell is None:
+            shell = _com_shell() or False
+        result = process_shortcut(os.path.basename(path), os.path.dirname(path), shell) if shell else None
+        if result:
+            apps.append(result)
     return apps
 
 def process_executable(file, root):
@@ -127,6 +153,12 @@ def scan_and_save():
     all_apps = shortcuts + executables + uwp_apps + discord_app
     unique_apps = deduplicate_apps(all_apps)
     write_to_csv(unique_apps)
+    try:
+        catalog = get_catalog()
+        catalog.replace_apps(unique_apps)
+        catalog.mark_imported("apps", CSV_FILE)
+    except Exception as e:
+        print(f"[ERROR] Failed to update the app catalog: {e}")
     print(f"Scan complete. {len(unique_apps)} unique apps saved to {CSV_FILE}")
 
 if __name__ == "__main__":
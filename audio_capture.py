@@ -0,0 +1,262 @@
+import io
+import sys
+import math
+import wave
+import warnings
+from array import array
+from tracing import traced
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore", DeprecationWarning)
+    try:
+        import audioop  # removed in Python 3.13; rms() falls back to pure Python
+    except ImportError:
+        audioop = None
+
+SAMPLE_RATE = 16000  # Whisper expects 16kHz audio
+SAMPLE_WIDTH = 2     # 16-bit PCM
+CHANNELS = 1
+FRAME_MS = 30
+FRAME_SAMPLES = SAMPLE_RATE * FRAME_MS // 1000
+
+# Longest utterance kept, audio kept from before speech started, trailing
+# silence that ends an utterance, and how long to wait for speech at all.
+MAX_SECONDS = 15
+PRE_ROLL_MS = 300
+END_SILENCE_MS = 800
+NO_SPEECH_TIMEOUT = 5.0
+
+# A frame is speech when its RMS exceeds the noise floor by ENERGY_RATIO (and
+# MIN_ENERGY in absolute terms). The floor adapts to non-speech frames.
+ENERGY_RATIO = 3.0
+MIN_ENERGY = 300
+NOISE_ADAPT_RATE = 0.05
+# Consecutive speech frames required before an utterance is considered started.
+SPEECH_START_FRAMES = 3
+
+
+def rms(frame, sample_width=SAMPLE_WIDTH):
+    """Root-mean-square energy of a 16-bit PCM frame."""
+    if not frame:
+        return 0
+    if audioop is not None:
+        return audioop.rms(frame, sample_width)
+    samples = array("h")
+    samples.frombytes(frame[:len(frame) - len(frame) % 2])
+    if sys.byteorder != "little":
+        samples.byteswap()
+    if not samples:
+        return 0
+    return int(math.sqrt(sum(s * s for s in samples) / len(samples)))
+
+
+class RingBuffer:
+    """
+    Fixed-size byte buffer allocated once. Writes past capacity overwrite the
+    oldest bytes; getvalue() returns the retained bytes oldest first.
+    """
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self._buffer = bytearray(capacity)
+        self._end = 0     # next write position
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._size == self.capacity
+
+    def clear(self):
+        self._end = 0
+        self._size = 0
+
+    def write(self, data):
+        data = memoryview(data)
+        if len(data) >= self.capacity:
+            self._buffer[:] = data[len(data) - self.capacity:]
+            self._end = 0
+            self._size = self.capacity
+            return
+        first = min(len(data), self.capacity - self._end)
+        self._buffer[self._end:self._end + first] = data[:first]
+        rest = len(data) - first
+        if rest:
+            self._buffer[:rest] = data[first:]
+        self._end = (self._end + len(data)) % self.capacity
+        self._size = min(self.capacity, self._size + len(data))
+
+    def getvalue(self, last=None):
+        """The retained bytes (or only the most recent `last` bytes), oldest first."""
+        size = self._size if last is None else min(last, self._size)
+        start = (self._end - size) % self.capacity
+        if start + size <= self.capacity:
+            return bytes(self._buffer[start:start + size])
+        return bytes(self._buffer[start:]) + bytes(self._buffer[:self._end])
+
+
+class EnergyVAD:
+    """Energy-based voice activity detection with an adaptive noise floor."""
+
+    def __init__(self, ratio=ENERGY_RATIO, min_energy=MIN_ENERGY, noise_floor=None,
+                 adapt_rate=NOISE_ADAPT_RATE):
+        self.ratio = ratio
+        self.min_energy = min_energy
+        self.noise_floor = noise_floor
+        self.adapt_rate = adapt_rate
+
+    @property
+    def threshold(self):
+        return max(self.min_energy, (self.noise_floor or 0) * self.ratio)
+
+    def is_speech(self, frame):
+        energy = rms(frame)
+        if self.noise_floor is None:
+            # The first frame calibrates the floor; assume the user has not started talking yet.
+            self.noise_floor = energy
+            return False
+        speech = energy > self.threshold
+        if not speech:
+            self.noise_floor += (energy - self.noise_floor) * self.adapt_rate
+        return speech
+
+
+class MicrophoneSource:
+    """Reads fixed-size 16 kHz mono frames from the default microphone."""
+
+    def __init__(self, frame_samples=FRAME_SAMPLES, rate=SAMPLE_RATE):
+        import pyaudio
+        self.rate = rate
+        self.frame_samples = frame_samples
+        self._audio = pyaudio.PyAudio()
+        self._stream = self._audio.open(format=pyaudio.paInt16, channels=CHANNELS, rate=rate,
+                                        input=True, frames_per_buffer=frame_samples)
+
+    def read_frame(self):
+        return self._stream.read(self.frame_samples, exception_on_overflow=False)
+
+    def close(self):
+        self._stream.stop_stream()
+        self._stream.close()
+        self._audio.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class WavFileSource:
+    """Reads frames from a 16-bit mono WAV file (path or file object) in place of the microphone."""
+
+    def __init__(self, wav, frame_samples=FRAME_SAMPLES):
+        self._wave = wave.open(wav, "rb")
+        if self._wave.getnchannels() != CHANNELS or self._wave.getsampwidth() != SAMPLE_WIDTH:
+            self._wave.close()
+            raise ValueError("WAV input must be 16-bit mono")
+        self.rate = self._wave.getframerate()
+        self.frame_samples = frame_samples
+
+    def read_frame(self):
+        """The next frame, or None at the end of the file."""
+        frame = self._wave.readframes(self.frame_samples)
+        return frame or None
+
+    def close(self):
+        self._wave.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def encode_wav(pcm, rate=SAMPLE_RATE):
+    """Wrap raw 16-bit mono PCM in a WAV container, in memory."""
+    out = io.BytesIO()
+    with wave.open(out, "wb") as wf:
+        wf.setnchannels(CHANNELS)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(rate)
+        wf.writeframes(pcm)
+    return out.getvalue()
+
+
+def capture_utterance(source, vad=None, max_seconds=MAX_SECONDS, end_silence_ms=END_SILENCE_MS,
+                      no_speech_timeout=NO_SPEECH_TIMEOUT, pre_roll_ms=PRE_ROLL_MS, stop_on_silence=True,
+                      pre_roll=b""):
+    """
+    Read frames from source until the speaker stops and return the raw PCM, or
+    None when nobody spoke within no_speech_timeout seconds (or the source ran dry).
+
+    Frames go into a ring buffer sized for max_seconds, allocated up front. The
+    last pre_roll_ms of audio before speech started is kept, so the first
+    syllable is not clipped; pre_roll is audio the caller already captured
+    (e.g. the wake word) and is prepended to the result. With
+    stop_on_silence=False this simply records max_seconds of audio.
+    """
+    vad = vad or EnergyVAD()
+    rate = getattr(source, "rate", SAMPLE_RATE)
+    bytes_per_ms = rate * SAMPLE_WIDTH // 1000
+    limit = int(max_seconds * 1000) * bytes_per_ms
+    pre_roll_bytes = pre_roll_ms * bytes_per_ms
+    buffer = RingBuffer(limit + pre_roll_bytes)
+    silence_limit = end_silence_ms * bytes_per_ms
+    wait_limit = int(no_speech_timeout * 1000) * bytes_per_ms
+
+    started = not stop_on_silence
+    recorded = 0  # bytes of the utterance so far
+    voiced_run = 0
+    silence = 0
+    waited = 0
+    while recorded < limit:
+        frame = source.read_frame()
+        if not frame:
+            break
+        buffer.write(frame)
+        if not stop_on_silence:
+            recorded += len(frame)
+            continue
+        speech = vad.is_speech(frame)
+        if not started:
+            voiced_run = voiced_run + 1 if speech else 0
+            if voiced_run >= SPEECH_START_FRAMES:
+                started = True
+                recorded = min(len(buffer), pre_roll_bytes + len(frame) * voiced_run)
+                continue
+            waited += len(frame)
+            if waited >= wait_limit:
+                return None
+            continue
+        recorded += len(frame)
+        silence = 0 if speech else silence + len(frame)
+        if silence >= silence_limit:
+            break
+    if not started or not recorded:
+        return None
+    return bytes(pre_roll) + buffer.getvalue(recorded)
+
+
+@traced("record_speech")
+def record_speech(source=None, **options):
+    """
+    Capture one utterance from the microphone (or the given source) and return
+    it as in-memory WAV bytes, or None if nothing was said.
+    """
+    owned = source is None
+    if owned:
+        source = MicrophoneSource()
+    try:
+        print("Recording audio for transcription...")
+        pcm = capture_utterance(source, **options)
+        print("Finished recording.")
+    finally:
+        if owned:
+            source.close()
+    if not pcm:
+        return None
+    return encode_wav(pcm, getattr(source, "rate", SAMPLE_RATE))
@@ -0,0 +1,473 @@
+"""
+Benchmarks for the command dispatch and lookup hot paths, on synthetic fixtures.
+
+    python benchmark.py                                   # default size, print results
+    python benchmark.py --sizes 10000,100000 --only apps,domains
+    python benchmark.py --output bench.json --save-baseline bench_baseline.json
+    python benchmark.py --baseline bench_baseline.json --threshold 0.25
+
+Fixtures (apps CSV, domain CSV, directory trees, file index, an n8n stub
+server) are generated in a temporary directory from a fixed seed, so runs
+are reproducible. With --baseline, any benchmark whose median got slower
+by more than --threshold is reported and the exit status is 1.
+"""
+import os
+import io
+import sys
+import csv
+import json
+import time
+import random
+import itertools
+import argparse
+import platform
+import tempfile
+import threading
+import contextlib
+import statistics
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SIZES = [10000]
+DEFAULT_THRESHOLD = 0.2
+SEED = 1234
+GROUPS = ["dispatch", "apps", "domains", "files", "catalog", "ai"]
+
+_WORDS = ["budget", "report", "invoice", "holiday", "notes", "draft", "final", "meeting", "project",
+          "summary", "studio", "player", "office", "cloud", "music", "video", "photo", "game", "tube",
+          "mail", "news", "shop", "code", "data", "chat", "maps", "drive", "sync", "store", "tools"]
+
+
+def measure(fn, repeat=50, warmup=3, number=1):
+    """Time fn over `repeat` samples of `number` calls each; returns stats in milliseconds per call."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(warmup):
+            fn()
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            for _ in range(number):
+                fn()
+            samples.append((time.perf_counter() - started) * 1000 / number)
+    samples.sort()
+    return {
+        "median_ms": statistics.median(samples),
+        "mean_ms": statistics.fmean(samples),
+        "min_ms": samples[0],
+        "p95_ms": samples[min(len(samples) - 1, int(0.95 * (len(samples) - 1) + 0.5))],
+        "samples": len(samples),
+    }
+
+
+def measure_once(fn):
+    """Time a single (expensive) call."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        fn()
+        elapsed = (time.perf_counter() - started) * 1000
+    return {"median_ms": elapsed, "mean_ms": elapsed, "min_ms": elapsed, "p95_ms": elapsed, "samples": 1}
+
+
+def _name(rng, parts=2):
+    return "".join(rng.choice(_WORDS) for _ in range(parts))
+
+
+def make_apps_csv(path, size, rng):
+    """installed_apps.csv with the real entries first, padded with synthetic executables."""
+    real = os.path.join(os.path.dirname(os.path.abspath(__file__)), "installed_apps.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["AppName", "ExecutablePath", "ShortcutPath", "AppUserModelID"])
+        if os.path.exists(real):
+            with open(real, "r", encoding="utf-8") as src:
+                rows = list(csv.reader(src))[1:]
+            writer.writerows(rows)
+        for i in range(size):
+            name = f"{_name(rng)} {i}"
+            writer.writerow([name, f"C:\\Program Files\\{name}\\{name}.exe", "", ""])
+    return path
+
+
+def make_domains_csv(path, size, rng):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Rank", "Domain", "Open Page Rank"])
+        writer.writerow([1, "google.com", 10])
+        writer.writerow([2, "youtube.com", 10])
+        for rank in range(3, size + 1):
+            tld = rng.choice(["com", "net", "org", "io"])
+            writer.writerow([rank, f"{_name(rng)}{rank}.{tld}", 1])
+    return path
+
+
+def make_file_tree(root, size, rng, files_per_dir=50):
+    """A directory tree holding `size` files spread over nested folders."""
+    extensions = [".pdf", ".docx", ".xlsx", ".jpg", ".mp4", ".mp3", ".txt", ".bin"]
+    dirs = max(1, size // files_per_dir)
+    for d in range(dirs):
+        folder = os.path.join(root, f"d{d % 10}", f"{_name(rng, 1)}{d}")
+        os.makedirs(folder, exist_ok=True)
+        for i in range(files_per_dir):
+            with open(os.path.join(folder, f"{_name(rng)}{i}{rng.choice(extensions)}"), "w"):
+                pass
+    return root
+
+
+def make_file_index(path, size, rng):
+    now = datetime.now()
+    extensions = [".pdf", ".docx", ".xlsx", ".jpg", ".mp4", ".mp3", ".txt"]
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Filename", "FullPath", "Extension", "ModifiedTime"])
+        for i in range(size):
+            ext = rng.choice(extensions)
+            name = f"{rng.choice(_WORDS)}_{rng.choice(_WORDS)}{i}{ext}"
+            folder = rng.choice(["Documents", "Downloads", "Desktop\\Work", "Pictures\\Trip"])
+            modified = now - timedelta(days=rng.random() * 365)
+            writer.writerow([name, f"C:\\Users\\me\\{folder}\\{name}", ext,
+                             modified.strftime("%Y-%m-%d %H:%M:%S")])
+    return path
+
+
+class _FakeProcess:
+    def __init__(self, pid, name):
+        self.pid = pid
+        self.info = {"pid": pid, "name": name}
+
+    def name(self):
+        return self.info["name"]
+
+    def is_running(self):
+        return True
+
+    def terminate(self):
+        pass
+
+    def kill(self):
+        pass
+
+
+class _FakePsutil:
+    """Minimal psutil stand-in exposing a process table; terminated processes exit at once but stay listed."""
+
+    NoSuchProcess = type("NoSuchProcess", (Exception,), {})
+    AccessDenied = type("AccessDenied", (Exception,), {})
+
+    def __init__(self, size, rng):
+        self.rng = rng
+        self.processes = {998: _FakeProcess(998, "chrome.exe"), 999: _FakeProcess(999, "notepad.exe")}
+        self.next_pid = 1000
+        self.spawn(size)
+
+    def spawn(self, count):
+        for _ in range(count):
+            self.processes[self.next_pid] = _FakeProcess(self.next_pid, f"{_name(self.rng, 1)}{self.next_pid}.exe")
+            self.next_pid += 1
+
+    def churn(self, count):
+        """Replace count processes (never chrome or notepad) with new ones, as between two commands."""
+        for pid in [pid for pid in self.processes if pid >= 1000][:count]:
+            del self.processes[pid]
+        self.spawn(count)
+
+    def pids(self):
+        return list(self.processes)
+
+    def Process(self, pid):
+        try:
+            return self.processes[pid]
+        except KeyError:
+            raise self.NoSuchProcess(pid) from None
+
+    def process_iter(self, attrs=None):
+        return iter(list(self.processes.values()))
+
+    def wait_procs(self, procs, timeout=None):
+        return list(procs), []
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps({"result": "stub answer"}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@contextlib.contextmanager
+def stub_n8n_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_port}/webhook/"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@contextlib.contextmanager
+def patched(target, name, value):
+    saved = getattr(target, name)
+    setattr(target, name, value)
+    try:
+        yield
+    finally:
+        setattr(target, name, saved)
+
+
+def bench_apps(size, workdir, rng, results):
+    import app_launcher
+    import catalog
+    from process_index import ProcessIndex
+    path = make_apps_csv(os.path.join(workdir, f"apps_{size}.csv"), size, rng)
+    queries = [("exact", "google chrome"), ("substring", "chrome"), ("fuzzy", "crome"), ("miss", "zzzzqq")]
+    # The catalog-backed registry is what get_app_registry() returns while
+    # USE_CATALOG is on; the CSV-backed one is measured alongside for comparison.
+    catalog_path = os.path.join(workdir, f"apps_catalog_{size}.db")
+    with patched(app_launcher, "CSV_FILE", path), patched(catalog, "DEFAULT_CATALOG_PATH", catalog_path):
+        results[f"apps.registry_load[{size}]"] = measure_once(app_launcher.get_app_registry)
+        registry = app_launcher.get_app_registry()
+        for label, query in queries:
+            results[f"apps.find_app_path.{label}[{size}]"] = measure(lambda: registry.find(query), repeat=200)
+        results[f"apps.get_app_registry.unchanged[{size}]"] = measure(app_launcher.get_app_registry, repeat=200)
+    results[f"apps.registry_load.csv[{size}]"] = measure_once(lambda: app_launcher.get_app_registry(path))
+    csv_registry = app_launcher.get_app_registry(path)
+    for label, query in queries:
+        results[f"apps.find_app_path.csv.{label}[{size}]"] = measure(lambda: csv_registry.find(query), repeat=200)
+
+    procs = size // 10 or 1
+    fake = _FakePsutil(procs, rng)
+    processes = ProcessIndex(fake)
+    results[f"apps.process_index_build[{procs} procs]"] = measure_once(processes.refresh)
+    results[f"apps.process_index_refresh[{procs} procs]"] = measure(processes.refresh, repeat=200)
+    results[f"apps.process_index_refresh_churn10[{procs} procs]"] = measure(
+        lambda: (fake.churn(10), processes.refresh()), repeat=100)
+    with patched(app_launcher, "say", lambda text: None), patched(app_launcher, "get_app_registry", lambda: registry):
+        results[f"apps.close_app[{procs} procs]"] = measure(
+            lambda: app_launcher.close_app("close notepad", processes=processes))
+        results[f"apps.close_app.by_executable[{procs} procs]"] = measure(
+            lambda: app_launcher.close_app("close google chrome", processes=processes))
+    catalog.get_catalog(catalog_path).close()
+
+
+def bench_domains(size, workdir, rng, results):
+    import domain_loader
+    path = make_domains_csv(os.path.join(workdir, f"domains_{size}.csv"), size, rng)
+    results[f"domains.index_build[{size}]"] = measure_once(lambda: domain_loader.warm_up(path))
+    results[f"domains.load_domains_top10k[{size}]"] = measure(
+        lambda: domain_loader.load_domains(path, top_n=10000), repeat=20)
+    for label, query in [("popular", "open tube"), ("exact", "open google"), ("rare", "open studiotools"),
+                         ("miss", "open qqqzzz"), ("short", "open yo")]:
+        results[f"domains.search_domains.{label}[{size}]"] = measure(
+            lambda: domain_loader.search_domains(query, top_k=1, file_path=path), repeat=100)
+    top = domain_loader.load_domains(path, top_n=10000)
+    results[f"domains.find_best_match_top10k[{size}]"] = measure(
+        lambda: domain_loader.find_best_match("open studio", top), repeat=20)
+
+
+def bench_files(size, workdir, rng, results):
+    import file_scanner
+    import file_search
+    root = make_file_tree(os.path.join(workdir, f"tree_{size}"), size, rng)
+    extensions = {".pdf", ".docx", ".xlsx", ".jpg", ".mp4", ".mp3", ".txt"}
+    out = os.path.join(workdir, f"scan_{size}.csv")
+    results[f"files.scan_directories[{size}]"] = measure(
+        lambda: file_scanner.scan_directories([root], extensions, out), repeat=3, warmup=1)
+    first_scans = itertools.count()
+    results[f"files.scan_incremental_first[{size}]"] = measure(
+        lambda: file_scanner.scan_directories_incremental(
+            [root], extensions, os.path.join(workdir, f"first_{size}_{next(first_scans)}.csv")), repeat=3, warmup=1)
+    inc = os.path.join(workdir, f"inc_{size}.csv")
+    file_scanner.scan_directories_incremental([root], extensions, inc)
+    results[f"files.scan_incremental_unchanged[{size}]"] = measure(
+        lambda: file_scanner.scan_directories_incremental([root], extensions, inc), repeat=3, warmup=1)
+    # What the file watcher applies for a change in one folder.
+    folder = os.path.dirname(next(row[1] for row in file_scanner.iter_files([root], extensions)))
+    results[f"files.update_one_folder[{size}]"] = measure(
+        lambda: file_scanner.update_directories([folder], extensions, inc), repeat=10, warmup=1)
+
+    index_path = make_file_index(os.path.join(workdir, f"index_{size}.csv"), size, rng)
+    results[f"files.search_index_load[{size}]"] = measure_once(lambda: file_search.get_file_index(index_path))
+    index = file_search.get_file_index(index_path)
+    for label, query in [("kind_and_time", "open the budget spreadsheet from last week"),
+                         ("two_terms", "find meeting notes"), ("miss", "find qqqzzz")]:
+        results[f"files.search.{label}[{size}]"] = measure(lambda: index.search(query), repeat=20)
+
+
+def bench_catalog(size, workdir, rng, results):
+    from catalog import Catalog
+    catalog = Catalog(os.path.join(workdir, f"catalog_{size}.db"))
+    apps = make_apps_csv(os.path.join(workdir, f"catalog_apps_{size}.csv"), size, rng)
+    index = make_file_index(os.path.join(workdir, f"catalog_index_{size}.csv"), size, rng)
+    results[f"catalog.import_apps[{size}]"] = measure_once(lambda: catalog.import_csv("apps", apps))
+    results[f"catalog.import_files[{size}]"] = measure_once(lambda: catalog.import_csv("files", index))
+    for label, query in [("exact", "google chrome"), ("miss", "zzzzqq")]:
+        results[f"catalog.find_app.{label}[{size}]"] = measure(lambda: catalog.find_app(query), repeat=200)
+    name = next(catalog.iter_files())[0]
+    results[f"catalog.files_named[{size}]"] = measure(lambda: catalog.files_named(name), repeat=200)
+    results[f"catalog.files_with_prefix[{size}]"] = measure(lambda: catalog.files_with_prefix("budget"), repeat=200)
+    rows = [(f"bench_{i}.txt", os.path.join(workdir, f"bench_{i}.txt"), ".txt", "2024-01-01 00:00:00")
+            for i in range(100)]
+    results["catalog.apply_file_changes_x100"] = measure(lambda: catalog.apply_file_changes(rows, []), repeat=20)
+    catalog.close()
+
+
+def bench_ai(workdir, results):
+    import ai_handler
+    from response_cache import ResponseCache
+    with stub_n8n_server() as base:
+        url = base + "text-query-workflow"
+        with patched(ai_handler, "response_cache", ResponseCache()), \
+                patched(ai_handler, "CACHED_WORKFLOWS", {}):
+            results["ai.call_n8n_workflow"] = measure(
+                lambda: ai_handler.call_n8n_workflow(url, {"prompt": "hello"}), repeat=100)
+
+            def concurrent_batch():
+                futures = [ai_handler.call_n8n_workflow_async(url, {"prompt": str(i)}) for i in range(8)]
+                for future in futures:
+                    future.result()
+            results["ai.call_n8n_workflow_async_x8"] = measure(concurrent_batch, repeat=20)
+        with patched(ai_handler, "response_cache", ResponseCache()), \
+                patched(ai_handler, "CACHED_WORKFLOWS", {url: True}):
+            results["ai.call_n8n_workflow_cached"] = measure(
+                lambda: ai_handler.call_n8n_workflow(url, {"prompt": "hello"}), repeat=200)
+
+
+# One representative command per intent.
+DISPATCH_COMMANDS = {
+    "time": "what is the time",
+    "index_status": "indexing status",
+    "jobs": "job status",
+    "find_file": "find meeting notes",
+    "file_or_folder": "open project folder",
+    "app": "open chrome",
+    "text_ai": "what is a black hole using artificial intelligence",
+    "code": "write code for fizzbuzz",
+    "website": "open tube",
+    "unknown": "sing me a song",
+}
+
+
+def bench_dispatch(size, workdir, rng, results):
+    import app_launcher
+    import domain_loader
+    import file_search
+    import command_handler
+    import resolution_cache
+    from text_frontend import Recorder, recording_side_effects
+    apps = make_apps_csv(os.path.join(workdir, f"dispatch_apps_{size}.csv"), size, rng)
+    domains = make_domains_csv(os.path.join(workdir, f"dispatch_domains_{size}.csv"), size, rng)
+    index = make_file_index(os.path.join(workdir, f"dispatch_index_{size}.csv"), size, rng)
+    # DEFAULT_FILENAME is joined onto the module directory; an absolute path replaces it.
+    # The stubs also give the run its own scratch catalog and resolution cache.
+    with patched(app_launcher, "CSV_FILE", apps), patched(domain_loader, "DEFAULT_FILENAME", domains), \
+            patched(file_search, "DEFAULT_INDEX_PATH", index), recording_side_effects(Recorder()):
+        cache = resolution_cache.get_resolution_cache()
+        domain_loader.warm_up()
+        for intent, command in DISPATCH_COMMANDS.items():
+            # Including the background job the command starts, if any.
+            results[f"dispatch.{intent}[{size}]"] = measure(
+                lambda: command_handler.handle_command(command) and command_handler.scheduler.wait_idle(), repeat=30)
+        for intent in ("app", "website"):
+            # The same commands resolved from scratch each time.
+            results[f"dispatch.{intent}.uncached[{size}]"] = measure(
+                lambda: (cache.invalidate(), command_handler.handle_command(DISPATCH_COMMANDS[intent])), repeat=30)
+
+
+def run(sizes, groups):
+    import resolution_cache
+    results = {}
+    rng = random.Random(SEED)
+    # Every group resolves apps and domains against a scratch cache, never the user's.
+    with tempfile.TemporaryDirectory(prefix="jarvis_bench_") as workdir, \
+            patched(resolution_cache, "DEFAULT_CACHE_PATH", os.path.join(workdir, "resolutions.json")):
+        for size in sizes:
+            if "apps" in groups:
+                bench_apps(size, workdir, rng, results)
+            if "domains" in groups:
+                bench_domains(size, workdir, rng, results)
+            if "files" in groups:
+                bench_files(size, workdir, rng, results)
+            if "catalog" in groups:
+                bench_catalog(size, workdir, rng, results)
+            if "dispatch" in groups:
+                bench_dispatch(size, workdir, rng, results)
+        if "ai" in groups:
+            bench_ai(workdir, results)
+        resolution_cache.get_resolution_cache().flush()
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "sizes": sizes,
+            "groups": sorted(groups),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return [(name, baseline ms, current ms, change)] for benchmarks slower by more than threshold."""
+    regressions = []
+    for name, stats in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if not base or not base.get("median_ms"):
+            continue
+        change = stats["median_ms"] / base["median_ms"] - 1
+        if change > threshold:
+            regressions.append((name, base["median_ms"], stats["median_ms"], change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark JARVIS dispatch and lookup hot paths.")
+    parser.add_argument("--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+                        help="Comma-separated fixture sizes (apps, domains, files)")
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"Comma-separated groups: {', '.join(GROUPS)}")
+    parser.add_argument("--output", help="Write results to this JSON file")
+    parser.add_argument("--baseline", help="Compare against this results JSON")
+    parser.add_argument("--save-baseline", help="Also write the results here as the new baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Allowed slowdown of the median before it counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",") if size]
+    groups = {group.strip() for group in args.only.split(",") if group.strip()}
+    unknown = groups - set(GROUPS)
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(sorted(unknown))}")
+
+    report = run(sizes, groups)
+    for name, stats in report["results"].items():
+        print(f"{name:<55} median {stats['median_ms']:10.3f} ms   p95 {stats['p95_ms']:10.3f} ms")
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        for name, before, after, change in regressions:
+            print(f"[REGRESSION] {name}: {before:.3f} ms -> {after:.3f} ms (+{change:.0%})")
+        if regressions:
+            return 1
+        print(f"[INFO] No regressions beyond {args.threshold:.0%} against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
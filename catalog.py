@@ -0,0 +1,357 @@
+"""
+Embedded catalog of apps, indexed files and domains: one SQLite database in
+WAL mode with indexed tables, upserts for the scanners and prepared lookups.
+
+The CSV files remain the interchange format:
+
+    python catalog.py import apps installed_apps.csv
+    python catalog.py export files file_index.csv
+    python catalog.py import domains top10milliondomains.csv
+"""
+import os
+import csv
+import sys
+import sqlite3
+import threading
+
+DEFAULT_CATALOG_PATH = os.path.join(os.path.expanduser('~'), '.jarvis_catalog.db')
+SCHEMA_VERSION = 2
+# Rows per executemany batch when importing large CSV files.
+IMPORT_BATCH = 10000
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS apps (
+    name TEXT PRIMARY KEY,
+    name_key TEXT NOT NULL,
+    executable_path TEXT NOT NULL DEFAULT '',
+    shortcut_path TEXT NOT NULL DEFAULT '',
+    app_id TEXT NOT NULL DEFAULT '',
+    position INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS apps_by_key_position ON apps (name_key, position);
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    extension TEXT NOT NULL,
+    modified TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS files_by_name ON files (name_key);
+CREATE INDEX IF NOT EXISTS files_by_extension ON files (extension, modified);
+CREATE TABLE IF NOT EXISTS domains (
+    rank INTEGER PRIMARY KEY,
+    domain TEXT NOT NULL UNIQUE
+);
+"""
+
+# CSV layouts shared with app_scanner, file_scanner and the domain list.
+CSV_HEADERS = {
+    "apps": ["AppName", "ExecutablePath", "ShortcutPath", "AppUserModelID"],
+    "files": ["Filename", "FullPath", "Extension", "ModifiedTime"],
+    "domains": ["Rank", "Domain", "Open Page Rank"],
+}
+
+# Prepared statements: sqlite3 caches compiled statements per connection, keyed by SQL text.
+# An app's position is its place in the imported list; an existing app keeps its
+# position on upsert, and replace_apps moves it explicitly.
+UPSERT_APP = ("INSERT INTO apps (name, name_key, executable_path, shortcut_path, app_id, position) "
+              "VALUES (?, ?, ?, ?, ?, ?) "
+              "ON CONFLICT (name) DO UPDATE SET name_key = excluded.name_key, "
+              "executable_path = excluded.executable_path, shortcut_path = excluded.shortcut_path, "
+              "app_id = excluded.app_id")
+MOVE_APP = "UPDATE apps SET position = ? WHERE name = ? AND position != ?"
+# Apps sharing a name_key resolve to the one listed first, as in the in-memory registry.
+FIND_APP = ("SELECT name, executable_path, shortcut_path, app_id FROM apps WHERE name_key = ? "
+            "ORDER BY position LIMIT 1")
+APPS_WITH_PREFIX = ("SELECT name, executable_path, shortcut_path, app_id FROM apps "
+                    "WHERE name_key >= ? AND name_key < ? ORDER BY name_key, position LIMIT ?")
+ALL_APPS = "SELECT name, executable_path, shortcut_path, app_id FROM apps ORDER BY position"
+UPSERT_FILE = ("INSERT INTO files (path, name, name_key, extension, modified) VALUES (?, ?, ?, ?, ?) "
+               "ON CONFLICT (path) DO UPDATE SET name = excluded.name, name_key = excluded.name_key, "
+               "extension = excluded.extension, modified = excluded.modified")
+DELETE_FILE = "DELETE FROM files WHERE path = ?"
+FILES_NAMED = "SELECT name, path, extension, modified FROM files WHERE name_key = ? ORDER BY modified DESC LIMIT ?"
+FILES_WITH_PREFIX = ("SELECT name, path, extension, modified FROM files "
+                     "WHERE name_key >= ? AND name_key < ? ORDER BY modified DESC LIMIT ?")
+RECENT_FILES = ("SELECT name, path, extension, modified FROM files WHERE extension = ? AND modified >= ? "
+                "ORDER BY modified DESC LIMIT ?")
+ALL_FILES = "SELECT name, path, extension, modified FROM files"
+INSERT_DOMAIN = "INSERT OR REPLACE INTO domains (rank, domain) VALUES (?, ?)"
+DOMAIN_RANK = "SELECT rank FROM domains WHERE domain = ?"
+TOP_DOMAINS = "SELECT domain FROM domains ORDER BY rank LIMIT ?"
+
+
+def name_key(name):
+    """Lookup key for app and file names: lowercase with collapsed whitespace."""
+    return " ".join(name.lower().split())
+
+
+def _prefix_bounds(prefix):
+    prefix = name_key(prefix)
+    return prefix, prefix + "\U0010ffff"
+
+
+def _first_apps(apps):
+    """(name, executable_path, shortcut_path, app_id) rows, keeping only the first row of each name."""
+    seen = set()
+    rows = []
+    for name, exe, shortcut, app_id in apps:
+        if name not in seen:
+            seen.add(name)
+            rows.append((name, name_key(name), exe or "", shortcut or "", app_id or ""))
+    return rows
+
+
+def _source_version(csv_path):
+    stat = os.stat(csv_path)
+    return f"{os.path.abspath(csv_path)}|{stat.st_mtime_ns}|{stat.st_size}"
+
+
+class Catalog:
+    """
+    SQLite-backed catalog. Each thread gets its own connection (WAL lets
+    readers run alongside a writer); every write runs in one transaction and
+    bumps the table's generation, which caches use to know when to reload.
+    """
+
+    def __init__(self, path=DEFAULT_CATALOG_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        with self._write_lock, self._conn() as conn:
+            self._migrate(conn)
+            conn.executescript(SCHEMA)
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('schema_version', ?)", (SCHEMA_VERSION,))
+
+    def _migrate(self, conn):
+        columns = [row[1] for row in conn.execute("PRAGMA table_info(apps)")]
+        if columns and "position" not in columns:
+            # Schema 1 ordered apps by rowid, which upserts do not keep in list order.
+            conn.execute("ALTER TABLE apps ADD COLUMN position INTEGER NOT NULL DEFAULT 0")
+            conn.execute("UPDATE apps SET position = rowid")
+            conn.execute("DROP INDEX IF EXISTS apps_by_key")
+            # Re-import the CSV so positions follow it again.
+            conn.execute("DELETE FROM meta WHERE key = 'apps_source'")
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, cached_statements=64)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def _bump(self, conn, table):
+        conn.execute("INSERT INTO meta (key, value) VALUES (?, 1) "
+                     "ON CONFLICT (key) DO UPDATE SET value = value + 1", (f"{table}_generation",))
+
+    def generation(self, table):
+        """Counter bumped by every write to table; 0 if it was never written."""
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (f"{table}_generation",)).fetchone()
+        return int(row[0]) if row else 0
+
+    def count(self, table):
+        if table not in CSV_HEADERS:
+            raise ValueError(f"unknown catalog table: {table}")
+        return self._conn().execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+
+    def get_meta(self, key):
+        row = self._conn().execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self._write_lock, self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    # Apps
+
+    def upsert_apps(self, apps):
+        """
+        Insert or update (name, executable_path, shortcut_path, app_id) rows.
+        New apps are listed after the existing ones; a name given twice keeps its first row.
+        """
+        rows = _first_apps(apps)
+        with self._write_lock, self._conn() as conn:
+            start = conn.execute("SELECT coalesce(max(position) + 1, 0) FROM apps").fetchone()[0]
+            conn.executemany(UPSERT_APP, (row + (start + i,) for i, row in enumerate(rows)))
+            self._bump(conn, "apps")
+        return len(rows)
+
+    def replace_apps(self, apps):
+        """
+        Make the apps table hold exactly these rows, in this order, touching only
+        what changed. A name given twice keeps its first row, as in the app registry.
+        """
+        rows = _first_apps(apps)
+        with self._write_lock, self._conn() as conn:
+            conn.execute("CREATE TEMP TABLE IF NOT EXISTS incoming_apps (name TEXT PRIMARY KEY)")
+            conn.execute("DELETE FROM incoming_apps")
+            conn.executemany("INSERT INTO incoming_apps (name) VALUES (?)", ((row[0],) for row in rows))
+            conn.execute("DELETE FROM apps WHERE name NOT IN (SELECT name FROM incoming_apps)")
+            conn.executemany(UPSERT_APP, (row + (i,) for i, row in enumerate(rows)))
+            conn.executemany(MOVE_APP, ((i, row[0], i) for i, row in enumerate(rows)))
+            self._bump(conn, "apps")
+
+    def find_app(self, name):
+        """Exact (normalized) name lookup: (name, executable_path, shortcut_path, app_id) or None."""
+        return self._conn().execute(FIND_APP, (name_key(name),)).fetchone()
+
+    def apps_with_prefix(self, prefix, limit=10):
+        return self._conn().execute(APPS_WITH_PREFIX, (*_prefix_bounds(prefix), limit)).fetchall()
+
+    def all_apps(self):
+        return self._conn().execute(ALL_APPS).fetchall()
+
+    # Files
+
+    def apply_file_changes(self, upserts=(), removed_paths=()):
+        """Apply a scan delta: upsert (name, path, extension, modified) rows and delete removed paths."""
+        with self._write_lock, self._conn() as conn:
+            conn.executemany(DELETE_FILE, ((path,) for path in removed_paths))
+            conn.executemany(UPSERT_FILE, ((path, name, name_key(name), ext, modified)
+                                           for name, path, ext, modified in upserts))
+            self._bump(conn, "files")
+
+    def replace_files(self, rows):
+        with self._write_lock, self._conn() as conn:
+            conn.execute("DELETE FROM files")
+            conn.executemany(UPSERT_FILE, ((path, name, name_key(name), ext, modified)
+                                           for name, path, ext, modified in rows))
+            self._bump(conn, "files")
+
+    def files_named(self, name, limit=5):
+        """Files whose name is exactly name (case-insensitive), newest first."""
+        return self._conn().execute(FILES_NAMED, (name_key(name), limit)).fetchall()
+
+    def files_with_prefix(self, prefix, limit=10):
+        return self._conn().execute(FILES_WITH_PREFIX, (*_prefix_bounds(prefix), limit)).fetchall()
+
+    def recent_files(self, extension, since="", limit=10):
+        """Files with extension modified at or after since ('YYYY-mm-dd HH:MM:SS'), newest first."""
+        return self._conn().execute(RECENT_FILES, (extension.lower(), since, limit)).fetchall()
+
+    def iter_files(self):
+        """All file rows as (name, path, extension, modified)."""
+        return self._conn().execute(ALL_FILES)
+
+    # Domains
+
+    def replace_domains(self, ranked_domains):
+        """Load (rank, domain) pairs, replacing the table, in batches; returns the row count."""
+        count = 0
+        with self._write_lock, self._conn() as conn:
+            conn.execute("DELETE FROM domains")
+            batch = []
+            for rank, domain in ranked_domains:
+                batch.append((rank, domain.lower()))
+                if len(batch) >= IMPORT_BATCH:
+                    conn.executemany(INSERT_DOMAIN, batch)
+                    count += len(batch)
+                    batch.clear()
+            conn.executemany(INSERT_DOMAIN, batch)
+            count += len(batch)
+            self._bump(conn, "domains")
+        return count
+
+    def domain_rank(self, domain):
+        row = self._conn().execute(DOMAIN_RANK, (domain.lower(),)).fetchone()
+        return row[0] if row else None
+
+    def top_domains(self, limit):
+        return [row[0] for row in self._conn().execute(TOP_DOMAINS, (limit,))]
+
+    # CSV compatibility
+
+    def import_csv(self, table, csv_path):
+        """Load a CSV in the scanners' layout into table (replacing its rows); returns the row count."""
+        with open(csv_path, "r", newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            if table == "apps":
+                rows = [tuple(row[:4]) + ("",) * (4 - len(row)) for row in reader if row]
+                self.replace_apps(rows)
+                count = len(rows)
+            elif table == "files":
+                rows = [row for row in reader if len(row) == 4]
+                self.replace_files(rows)
+                count = len(rows)
+            elif table == "domains":
+                count = self.replace_domains((int(row[0]), row[1]) for row in reader
+                                             if len(row) >= 2 and row[0].isdigit())
+            else:
+                raise ValueError(f"unknown catalog table: {table}")
+        self.mark_imported(table, csv_path)
+        return count
+
+    def mark_imported(self, table, csv_path):
+        """Record that table already matches this version of csv_path (e.g. a scanner wrote both)."""
+        self.set_meta(f"{table}_source", _source_version(csv_path))
+
+    def import_csv_if_changed(self, table, csv_path):
+        """Import csv_path unless this exact version of it was imported already; returns True if it was."""
+        try:
+            version = _source_version(csv_path)
+        except OSError:
+            return False
+        if self.get_meta(f"{table}_source") == version:
+            return False
+        self.import_csv(table, csv_path)
+        return True
+
+    def export_csv(self, table, csv_path):
+        if table == "apps":
+            rows = self.all_apps()
+        elif table == "files":
+            rows = self.iter_files()
+        elif table == "domains":
+            rows = ((rank, domain, "") for rank, domain in
+                    self._conn().execute("SELECT rank, domain FROM domains ORDER BY rank"))
+        else:
+            raise ValueError(f"unknown catalog table: {table}")
+        tmp_path = csv_path + ".tmp"
+        with open(tmp_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            writer.writerow(CSV_HEADERS[table])
+            writer.writerows(rows)
+        os.replace(tmp_path, csv_path)
+
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path=None):
+    """Return the process-wide Catalog for path (the default catalog unless given)."""
+    path = path or DEFAULT_CATALOG_PATH
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = _catalogs[path] = Catalog(path)
+        return catalog
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] not in ("import", "export") or argv[1] not in CSV_HEADERS:
+        print("usage: python catalog.py import|export apps|files|domains PATH")
+        return 2
+    action, table, path = argv
+    catalog = get_catalog()
+    if action == "import":
+        print(f"[INFO] Imported {catalog.import_csv(table, path)} rows into {table}.")
+    else:
+        catalog.export_csv(table, path)
+        print(f"[INFO] Exported {catalog.count(table)} {table} to {path}.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,12 @@
 import os
-import csv
 import sys
 from datetime import datetime
-from speech import say, record_audio
-from app_launcher import open_app, close_app
-from file_scanner import scan_directories  # Import from file_scanner.py
-import ai_handler  # Import the n8n-based AI handler module
+from speech import say, wait_for_speech
+from audio_capture import record_speech
+from intent_router import IntentRouter
+from resolution_cache import get_resolution_cache
+from tracing import span
+from job_scheduler import JobScheduler, BULK
 
 # Voice commands that will trigger shutdown
 SHUTDOWN_COMMANDS = ["power off", "shutdown", "quit", "exit", "stop listening", "turn off"]
@@ -13,6 +14,43 @@ SHUTDOWN_COMMANDS = ["power off", "shutdown", "quit", "exit", "stop listening",
 # Define a constant for the "open " literal
 OPEN_COMMAND_PREFIX = "open "
 
+# File types tracked by the startup scan and "scan files"
+FILE_TYPES = {'.txt', '.pdf', '.docx', '.xlsx', '.jpg', '.png', '.mp4', '.mp3'}
+
+# Voice commands that query or cancel the background file indexing
+INDEX_STATUS_COMMANDS = ["indexing status", "index status", "scan status"]
+INDEX_CANCEL_COMMANDS = ["cancel indexing", "stop indexing", "cancel scan"]
+
+# Voice commands about the background jobs ("cancel job 2", "cancel the last job")
+JOB_STATUS_COMMANDS = ["job status", "jobs status", "status of job", "what are you working on"]
+JOB_CANCEL_COMMANDS = ["cancel job", "cancel the job", "cancel last job", "cancel the last job", "stop job"]
+NUMBER_WORDS = {"one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8,
+                "nine": 9, "ten": 10, "to": 2, "too": 2, "for": 4}
+
+# Spoken folder names and where they live
+FOLDER_MAPPING = {
+    "downloads": os.path.join(os.path.expanduser("~"), "Downloads"),
+    "documents": os.path.join(os.path.expanduser("~"), "Documents"),
+    "desktop": os.path.join(os.path.expanduser("~"), "Desktop"),
+    "music": os.path.join(os.path.expanduser("~"), "Music"),
+    "pictures": os.path.join(os.path.expanduser("~"), "Pictures"),
+    "videos": os.path.join(os.path.expanduser("~"), "Videos"),
+    "project folder": "C:/Users/srika/Desktop/Project/J.A.R.V.I.S AI",
+}
+
+# Prefixes that ask for a file search; "open ..." also searches when it names a file kind
+FIND_FILE_PREFIXES = ("find ", "search for ", "where is ")
+FILE_CUE_WORDS = {"file", "files"}
+
+# Slow commands (scans, n8n calls, OCR) run here so the listener stays free.
+# Announcements go through say() looked up at call time, so it can be replaced.
+scheduler = JobScheduler(announce=lambda text: say(text))
+# The latest file scan (a FileScanJob) and the scheduler job running it
+file_scan = None
+file_scan_job = None
+# Keeps the index up to date once the startup scan is done
+file_watcher = None
+
 def handle_time_query(query):
     """Handle time queries."""
     if "the time" in query:
@@ -23,9 +61,8 @@ def handle_time_query(query):
 
 def handle_website_query(query):
     """Handle website opening queries."""
-    from domain_loader import load_domains, find_best_match, open_website  # Moved imports here
-    domains = load_domains(top_n=10000)  # Load domains inside function
-    matches = find_best_match(query, domains)
+    from domain_loader import find_best_match, open_website  # Moved imports here
+    matches = find_best_match(query)  # Ranked search over the full domain index
     if matches:
         open_website(matches[0])
         say(f"Opening {matches[0]}")
@@ -47,11 +84,96 @@ def handle_file_scan_query(query):
             os.path.join(os.environ.get('SystemDrive', 'C:'), 'Program Files (x86)'),
             os.environ.get('SystemDrive', 'C:') + '\\',
         ]
-        file_types = {'.txt', '.pdf', '.docx', '.xlsx', '.jpg', '.png', '.mp4', '.mp3'}  # Consistent with initialize_file_scan
-        output_csv = os.path.join(home, 'file_index.csv')
-        num_files_scanned = scan_directories(directories_to_scan, file_types, output_csv)
-        say(f"Scanned {num_files_scanned} files and saved the index.")
-        print(f"[INFO] Scanned {num_files_scanned} files and saved to {output_csv}")
+        # Both scans write the same index; this one covers the startup folders too.
+        _cancel_file_scan()
+        job = _submit_file_scan("file scan", directories_to_scan, announce=_scan_announcement)
+        say(f"Scanning files in the background as job {job.id}.")
+        return True
+    return False
+
+def _scan_announcement(delta):
+    if delta is None:
+        return None  # cancelled before anything was saved
+    print(f"[INFO] Indexed {delta.total} files "
+          f"({len(delta.added)} added, {len(delta.removed)} removed, {len(delta.modified)} modified)")
+    return f"Scanned {delta.total} files and saved the index."
+
+def _submit_file_scan(name, directories, announce=None, on_complete=None):
+    """Queue a FileScanJob over directories as a bulk job; returns the scheduler Job."""
+    global file_scan, file_scan_job
+    # The scanner and the catalog (sqlite) load on the first scan, not at startup
+    from file_scanner import FileScanJob
+    from catalog import get_catalog
+    output_csv = os.path.join(os.path.expanduser('~'), 'file_index.csv')
+    scan = FileScanJob(directories, FILE_TYPES, output_csv, on_complete=on_complete, catalog=get_catalog())
+    file_scan = scan
+    file_scan_job = scheduler.submit(name, lambda job: scan.run(), kind=BULK, announce=announce,
+                                     on_cancel=scan.cancel, progress=scan.status)
+    return file_scan_job
+
+def _cancel_file_scan():
+    """Cancel the running or queued file scan, if any, and wait for it to stop."""
+    if file_scan_job is not None and not file_scan_job.done:
+        scheduler.cancel(file_scan_job.id)
+        file_scan_job.wait()
+
+def handle_index_status_query(query):
+    """Handle status and cancel queries for the background file indexing."""
+    if any(cmd in query for cmd in INDEX_STATUS_COMMANDS):
+        if file_scan is None:
+            say("File indexing has not been started.")
+        elif file_watcher is not None and file_watcher.running:
+            say(f"{file_scan.status()} {file_watcher.status()}")
+        else:
+            say(file_scan.status())
+        return True
+    if any(cmd in query for cmd in INDEX_CANCEL_COMMANDS):
+        if file_scan_job is None or file_scan_job.done:
+            say("File indexing is not running.")
+        else:
+            scheduler.cancel(file_scan_job.id)
+            say("Cancelling file indexing.")
+        return True
+    return False
+
+def _job_number(query):
+    """The job number spoken in query ("cancel job 2", "cancel job two"), or None."""
+    words = query.split()
+    for i, word in enumerate(words):
+        if word == "job" and i + 1 < len(words):
+            following = words[i + 1].lstrip("#")
+            if following.isdigit():
+                return int(following)
+            return NUMBER_WORDS.get(following)
+    return None
+
+def handle_job_query(query):
+    """Handle status and cancel queries for background jobs."""
+    if any(cmd in query for cmd in JOB_CANCEL_COMMANDS):
+        active = scheduler.active_jobs()
+        job_id = _job_number(query)
+        if job_id is None and "last" in query and active:
+            job_id = active[-1].id
+        if job_id is None:
+            say("Which job should I cancel?" if active else "No jobs are running.")
+            return True
+        job = scheduler.cancel(job_id)
+        if job is None:
+            say(f"Job {job_id} is not running.")
+        else:
+            say(f"Cancelling job {job.id}, {job.name}.")
+        return True
+    if any(cmd in query for cmd in JOB_STATUS_COMMANDS):
+        job_id = _job_number(query)
+        if job_id is not None:
+            job = scheduler.get(job_id)
+            say(job.status() if job is not None else f"I don't know a job {job_id}.")
+            return True
+        active = scheduler.active_jobs()
+        if not active:
+            say("No jobs are running.")
+        else:
+            say(" ".join(job.status() for job in active))
         return True
     return False
 
@@ -60,26 +182,17 @@ def handle_shutdown(query):
     if any(cmd in query for cmd in SHUTDOWN_COMMANDS):
         print("[INFO] Shutting down by voice command.")
         say("Shutting down JARVIS A.I. Goodbye.")
+        wait_for_speech()
         sys.exit(0)
     return False
 
 def handle_file_or_folder(query):
     """Handle file or folder opening commands."""
-    folder_mapping = {
-        "downloads": os.path.join(os.path.expanduser("~"), "Downloads"),
-        "documents": os.path.join(os.path.expanduser("~"), "Documents"),
-        "desktop": os.path.join(os.path.expanduser("~"), "Desktop"),
-        "music": os.path.join(os.path.expanduser("~"), "Music"),
-        "pictures": os.path.join(os.path.expanduser("~"), "Pictures"),
-        "videos": os.path.join(os.path.expanduser("~"), "Videos"),
-        "project folder": "C:/Users/srika/Desktop/Project/J.A.R.V.I.S AI",
-    }
-
     query = query.replace("folder", "").strip()
 
     if query.startswith(OPEN_COMMAND_PREFIX):
         target = query.replace(OPEN_COMMAND_PREFIX, "").strip()
-        target_path = folder_mapping.get(target.lower(), target)
+        target_path = FOLDER_MAPPING.get(target.lower(), target)
 
         if os.path.exists(target_path):
             try:
@@ -94,15 +207,81 @@ def handle_file_or_folder(query):
             except Exception as e:
                 say("Sorry, I couldn't open it.")
                 print(f"[ERROR] Failed to open {target_path}: {e}")
-                return False
-        else:
+                return True
+        elif any(sep in target_path for sep in ("/", "\\", ":")):
+            # A known folder or an explicit path: the user has been told, so the
+            # app intent must not go on to launch something else by that name.
             say("The specified file or folder does not exist.")
             print(f"[ERROR] File or folder not found: {target_path}")
-            return False
+            return True
+        # Not a known folder or a path: stay quiet so the app and website intents can try.
     return False
 
+def handle_find_file_query(query):
+    """Handle 'find ...' queries and 'open the <kind> ...' queries against the file index."""
+    is_find = query.startswith(FIND_FILE_PREFIXES)
+    is_open = query.startswith(OPEN_COMMAND_PREFIX)
+    if not (is_find or is_open):
+        return False
+    from file_search import search_files, parse_query, KIND_EXTENSIONS, tokenize, file_index_version
+    if is_open and not any(word in FILE_CUE_WORDS or word in KIND_EXTENSIONS or
+                           (word.endswith("s") and word[:-1] in KIND_EXTENSIONS) for word in tokenize(query)):
+        return False
+    if is_open and not parse_query(query)[0]:
+        # "open pictures" names a folder, not a file.
+        return False
+    if is_open and _open_cached_file(query):
+        return True
+
+    matches = search_files(query)
+    if not matches:
+        if is_find:
+            say("I couldn't find any matching files.")
+            print(f"[INFO] No indexed files match: '{query}'")
+            return True
+        return False
+
+    for match in matches:
+        print(f"[INFO] {match.score:6.2f}  {match.modified}  {match.path}")
+    best = matches[0]
+    if is_open:
+        try:
+            os.startfile(best.path)
+            say(f"Opening file {best.name}")
+            print(f"[INFO] Opened file: {best.path}")
+            version = file_index_version()
+            if version is not None:
+                get_resolution_cache().put("file", query, version, best.path)
+            return True
+        except Exception as e:
+            say("Sorry, I couldn't open it.")
+            print(f"[ERROR] Failed to open {best.path}: {e}")
+            return False
+    if len(matches) == 1:
+        say(f"I found {best.name}.")
+    else:
+        say(f"I found {len(matches)} files. The best match is {best.name}.")
+    return True
+
+def _open_cached_file(query):
+    """Open the file this query resolved to last time, if the file index has not changed since."""
+    from file_search import file_index_version
+    version = file_index_version()
+    path = get_resolution_cache().get("file", query, version) if version is not None else None
+    if path is None or not os.path.isfile(path):
+        return False
+    try:
+        os.startfile(path)
+    except Exception as e:
+        print(f"[ERROR] Failed to open {path}: {e}")
+        return False
+    say(f"Opening file {os.path.basename(path)}")
+    print(f"[INFO] Opened file: {path}")
+    return True
+
 def handle_app_commands(query):
     """Handle app launcher and closer commands."""
+    from app_launcher import open_app, close_app  # The app registry and process index load on first use
     if query.startswith("open ") and open_app(query):
         return True
     if query.startswith("close ") and close_app(query):
@@ -113,7 +292,9 @@ def handle_code_query(query):
     """Handle code generation or debugging queries."""
     if "debug code" in query or "write code" in query:
         try:
-            ai_handler.handle_code_query(query)
+            import ai_handler  # The n8n-based AI handler (requests, Pillow) loads on first use
+            scheduler.submit("code query", lambda job: ai_handler.handle_code_query(query),
+                             error_message="Sorry, I couldn't assist with the code.")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to process code query: {e}")
@@ -125,7 +306,9 @@ def handle_text_ai_query(query):
     """Handle text-based AI queries."""
     if "using artificial intelligence" in query:
         try:
-            ai_handler.handle_text_query(query)
+            import ai_handler
+            scheduler.submit("AI query", lambda job: ai_handler.handle_text_query(query, cancel_event=job.cancel_event),
+                             error_message="Sorry, I encountered an error while processing your AI request.")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to process text AI query: {e}")
@@ -137,11 +320,15 @@ def handle_voice_to_text_query(query):
     """Handle voice-to-text transcription queries."""
     if "transcribe audio" in query:
         try:
-            temp_audio_path = os.path.join(os.path.expanduser('~'), 'temp_audio.wav')
-            record_audio(temp_audio_path, duration=5)
-            ai_handler.handle_voice_to_text(temp_audio_path)
-            if os.path.exists(temp_audio_path):
-                os.remove(temp_audio_path)
+            # Records until the speaker stops; the WAV never touches the disk. Recording
+            # stays in the foreground (it needs the microphone); the upload does not.
+            audio = record_speech()
+            if not audio:
+                say("I didn't hear anything to transcribe.")
+                return True
+            import ai_handler
+            scheduler.submit("transcription", lambda job: ai_handler.handle_voice_to_text(audio),
+                             error_message="Sorry, I couldn't transcribe the audio.")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to transcribe audio: {e}")
@@ -153,12 +340,22 @@ def get_image_path_from_query(query, base_dir=os.path.join(os.path.expanduser('~
     """Extract the image filename from the query and return the full path."""
     query_parts = query.lower().split("image")
     if len(query_parts) > 1:
+        from catalog import get_catalog
+        from file_search import search_files
         image_name = query_parts[-1].strip()
         if not image_name.endswith(('.jpg', '.jpeg', '.png')):
             image_name += '.jpg'
         image_path = os.path.join(base_dir, image_name)
         if os.path.exists(image_path):
             return image_path
+        # Then an exact name anywhere in the index (an indexed catalog lookup)...
+        for _, path, _, _ in get_catalog().files_named(image_name):
+            if os.path.exists(path):
+                return path
+        # ...and finally a fuzzy search of the file index.
+        matches = search_files(f"{os.path.splitext(image_name)[0]} image", limit=1)
+        if matches:
+            return matches[0].path
     return None
 
 def handle_image_to_text_query(query):
@@ -170,7 +367,9 @@ def handle_image_to_text_query(query):
             print("[ERROR] Image file not found.")
             return False
         try:
-            ai_handler.handle_image_to_text(image_path)
+            import ai_handler
+            scheduler.submit("text extraction", lambda job: ai_handler.handle_image_to_text(image_path),
+                             error_message="Sorry, I couldn't extract text from the image.")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to extract text from image: {e}")
@@ -178,6 +377,34 @@ def handle_image_to_text_query(query):
             return False
     return False
 
+def handle_folder_image_text_query(query):
+    """Handle "extract text from all images in <folder>" queries."""
+    if "extract text from all images" not in query:
+        return False
+    _, _, folder = query.partition(" in ")
+    folder = folder.replace("folder", "").strip()
+    for article in ("the ", "my "):
+        if folder.startswith(article):
+            folder = folder[len(article):].strip()
+    if not folder:
+        say("Which folder should I read the images from?")
+        return True
+    folder_path = FOLDER_MAPPING.get(folder, folder)
+    if not os.path.isdir(folder_path):
+        say(f"I couldn't find the folder {folder}.")
+        print(f"[ERROR] Folder not found: {folder_path}")
+        return True
+    try:
+        import ai_handler
+        job = scheduler.submit(f"text extraction from {folder}",
+                               lambda job: ai_handler.handle_folder_image_text(folder_path, cancel_event=job.cancel_event),
+                               kind=BULK, error_message="Sorry, I couldn't extract text from those images.")
+        say(f"Reading the images in {folder} as job {job.id}.")
+    except Exception as e:
+        print(f"[ERROR] Failed to extract text from images in {folder_path}: {e}")
+        say("Sorry, I couldn't extract text from those images.")
+    return True
+
 def handle_multimodal_query(query):
     """Handle multimodal (e.g., image captioning) queries."""
     if "describe image" in query:
@@ -187,7 +414,9 @@ def handle_multimodal_query(query):
             print("[ERROR] Image file not found.")
             return False
         try:
-            ai_handler.handle_multimodal_image_caption(image_path)
+            import ai_handler
+            scheduler.submit("image description", lambda job: ai_handler.handle_multimodal_image_caption(image_path),
+                             error_message="Sorry, I couldn't describe the image.")
             return True
         except Exception as e:
             print(f"[ERROR] Failed to describe image: {e}")
@@ -203,37 +432,43 @@ def handle_command(query):
     query = query.lower().strip()
     print(f"[DEBUG] Processing query in command_handler.py: '{query}'")
 
-    if handle_shutdown(query):
-        return True
-    if handle_file_or_folder(query):
-        return True
-    if handle_app_commands(query):
-        return True
-    if handle_text_ai_query(query):
-        return True
-    if handle_voice_to_text_query(query):
-        return True
-    if handle_image_to_text_query(query):
-        return True
-    if handle_multimodal_query(query):
-        return True
-    if handle_code_query(query):
-        return True
-    if handle_website_query(query):
-        return True
-    if handle_file_scan_query(query):
-        return True
-    if handle_time_query(query):
+    with span("dispatch") as s:
+        intent = router.dispatch(query)
+        s.set(intent=intent or "unknown")
+    if intent:
         return True
 
     say("I'm not sure what you mean. Please try again.")
     print(f"[ERROR] Unknown command: '{query}'")
     return False
 
-def initialize_file_scan():
-    """Scans specific folders like Downloads and Desktop during initialization."""
+def intent_stats():
+    """Per-intent match/handle counts and handler time from the command router."""
+    return router.stats()
+
+# Intents in dispatch order. Only intents whose triggers occur in the query are
+# tried; the website lookup is the fallback, run only when nothing else claims it.
+router = IntentRouter()
+router.register("shutdown", handle_shutdown, phrases=SHUTDOWN_COMMANDS)
+router.register("index_status", handle_index_status_query, phrases=INDEX_STATUS_COMMANDS + INDEX_CANCEL_COMMANDS)
+router.register("jobs", handle_job_query, phrases=JOB_STATUS_COMMANDS + JOB_CANCEL_COMMANDS)
+router.register("time", handle_time_query, phrases=["the time"])
+router.register("file_scan", handle_file_scan_query, phrases=["scan files"])
+router.register("find_file", handle_find_file_query, prefixes=FIND_FILE_PREFIXES + (OPEN_COMMAND_PREFIX,))
+router.register("file_or_folder", handle_file_or_folder, prefixes=[OPEN_COMMAND_PREFIX])
+router.register("app", handle_app_commands, prefixes=[OPEN_COMMAND_PREFIX, "close "])
+router.register("text_ai", handle_text_ai_query, phrases=["using artificial intelligence"])
+router.register("voice_to_text", handle_voice_to_text_query, phrases=["transcribe audio"])
+router.register("folder_image_text", handle_folder_image_text_query, phrases=["extract text from all images"])
+router.register("image_to_text", handle_image_to_text_query, phrases=["extract text from image"])
+router.register("describe_image", handle_multimodal_query, phrases=["describe image"])
+router.register("code", handle_code_query, phrases=["debug code", "write code"])
+router.register("website", handle_website_query, fallback=True)
+router.compile()
+
+def _startup_scan_directories():
     home = os.path.expanduser('~')
-    directories_to_scan = [
+    return [
         os.path.join(home, 'Documents'),
         os.path.join(home, 'Desktop'),
         os.path.join(home, 'Videos'),
@@ -241,14 +476,52 @@ def initialize_file_scan():
         os.path.join(home, 'Downloads'),
         os.path.join(home, 'Music'),
     ]
-    file_types = {'.txt', '.pdf', '.docx', '.xlsx', '.jpg', '.png', '.mp4', '.mp3'}
-    output_csv = os.path.join(home, 'file_index.csv')
+
+def initialize_file_scan():
+    """Scans specific folders like Downloads and Desktop during initialization."""
+    from file_scanner import scan_directories_incremental
+    from catalog import get_catalog
+    directories_to_scan = _startup_scan_directories()
+    file_types = FILE_TYPES
+    output_csv = os.path.join(os.path.expanduser('~'), 'file_index.csv')
 
     say("Scanning specific folders on startup...")
     try:
-        num_files_scanned = scan_directories(directories_to_scan, file_types, output_csv)
-        print(f"[INFO] Scanned {num_files_scanned} files and saved to {output_csv}")
-        say(f"Startup file scan complete. {num_files_scanned} files indexed.")
+        delta = scan_directories_incremental(directories_to_scan, file_types, output_csv,
+                                             catalog=get_catalog())
+        print(f"[INFO] Indexed {delta.total} files in {output_csv} "
+              f"({len(delta.added)} added, {len(delta.removed)} removed, {len(delta.modified)} modified)")
+        say(f"Startup file scan complete. {delta.total} files indexed.")
     except Exception as e:
         print(f"[ERROR] Failed to scan files: {e}")
-        say("An error occurred while scanning files.")
\ No newline at end of file
+        say("An error occurred while scanning files.")
+
+def _report_startup_scan(job):
+    if job.delta is not None:
+        delta = job.delta
+        print(f"[INFO] Startup file scan finished in {job.finished_at - job.started_at:.1f}s: "
+              f"{delta.total} files indexed ({len(delta.added)} added, {len(delta.removed)} removed, "
+              f"{len(delta.modified)} modified)")
+        # Warm the search index now rather than on the first "find" command.
+        from file_search import get_file_index
+        get_file_index(job.csv_path)
+        start_file_watcher(job.csv_path)
+
+def start_file_watcher(csv_path):
+    """Keep the index fresh from filesystem events on the startup folders; returns the FileWatcher."""
+    global file_watcher
+    from file_watcher import FileWatcher
+    from file_search import get_file_index
+    from catalog import get_catalog
+    if file_watcher is None or not file_watcher.running:
+        # Reloading the search index after each batch keeps the next "find" fast.
+        file_watcher = FileWatcher(_startup_scan_directories(), FILE_TYPES, csv_path, catalog=get_catalog(),
+                                   on_update=lambda delta: get_file_index(csv_path)).start()
+        print("[INFO] Watching the indexed folders for changes.")
+    return file_watcher
+
+def start_background_file_scan():
+    """Queue the startup file scan as a background job and return its FileScanJob."""
+    _submit_file_scan("startup file scan", _startup_scan_directories(), on_complete=_report_startup_scan)
+    print("[INFO] Startup file scan running in the background.")
+    return file_scan
\ No newline at end of file
@@ -0,0 +1,400 @@
+import os
+import csv
+import mmap
+import bisect
+import shutil
+import struct
+from array import array
+
+# On-disk layout (little endian):
+#   header  : magic, format version, source mtime (ns), source size, domain count,
+#             count of domains whose CSV spelling is not all lowercase
+#   offsets : (count + 1) uint64 offsets into the blob, in rank order
+#   cased   : uint64 positions of those domains, ascending, then (cased + 1)
+#             uint64 offsets of their CSV spellings into the blob, past the domains
+#   blob    : lowercased domains, then the CSV spellings, utf-8 encoded, concatenated
+INDEX_MAGIC = b'JDIX'
+INDEX_VERSION = 2
+INDEX_HEADER_FORMAT = '<4sHxxqqQQ'
+INDEX_HEADER_SIZE = struct.calcsize(INDEX_HEADER_FORMAT)
+HEADER_FORMAT = '<4sHxxqqQ'
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+OFFSET_SIZE = 8
+
+# Trigram postings file (little endian):
+#   header   : magic, format version, index mtime (ns), index size, slot count
+#   offsets  : (slots + 1) uint64 offsets into the postings; one slot per
+#              trigram, then one per trigram a domain's label starts with
+#   postings : uint32 domain positions, ascending (i.e. best rank first)
+TRIGRAM_MAGIC = b'JTRI'
+TRIGRAM_VERSION = 2
+TRIGRAM_ALPHABET = b'abcdefghijklmnopqrstuvwxyz0123456789.-'
+TRIGRAM_BASE = len(TRIGRAM_ALPHABET) + 1  # last symbol catches everything else
+TRIGRAM_CODES = TRIGRAM_BASE ** 3
+TRIGRAM_SLOTS = 2 * TRIGRAM_CODES
+POSTING_SIZE = 4
+# Domains per sorted run while building; bounds the build's memory.
+TRIGRAM_RUN_DOMAINS = 250000
+
+_SYMBOLS = bytes(
+    TRIGRAM_ALPHABET.index(b) if b in TRIGRAM_ALPHABET else TRIGRAM_BASE - 1 for b in range(256))
+
+
+def default_index_path(source_path):
+    """Return the index file path used for a given domain CSV."""
+    return os.path.splitext(source_path)[0] + '.idx'
+
+
+def default_trigram_path(index_path):
+    """Return the trigram postings path used for a given domain index."""
+    return os.path.splitext(index_path)[0] + '.tri'
+
+
+def trigram_codes(text):
+    """Return the set of trigram slot numbers for a lowercased string."""
+    symbols = text.encode('utf-8').translate(_SYMBOLS)
+    base = TRIGRAM_BASE
+    return {(symbols[i] * base + symbols[i + 1]) * base + symbols[i + 2] for i in range(len(symbols) - 2)}
+
+
+def label_start_code(text):
+    """
+    Return the slot for the trigram a lowercased domain (or query) starts with,
+    ignoring a leading 'www.', or None if what is left is shorter than that.
+    """
+    if text.startswith('www.'):
+        text = text[4:]
+    symbols = text.encode('utf-8')[:3].translate(_SYMBOLS)
+    if len(symbols) < 3:
+        return None
+    base = TRIGRAM_BASE
+    return TRIGRAM_CODES + (symbols[0] * base + symbols[1]) * base + symbols[2]
+
+
+def _source_version(source_path):
+    stat = os.stat(source_path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def build_domain_index(source_path, index_path=None):
+    """
+    Convert the domain CSV into a compact, rank-ordered index file.
+
+    The CSV is streamed with the csv module straight into a temporary blob
+    file, so the build needs no pandas and memory stays flat for the usual
+    already-ranked list; an out-of-order CSV is sorted in memory instead.
+    Domains are matched lowercased; the few spelled otherwise in the CSV
+    keep that spelling for display.
+    :return: Path of the written index file.
+    """
+    if index_path is None:
+        index_path = default_index_path(source_path)
+    mtime_ns, size = _source_version(source_path)
+
+    tmp_path = index_path + '.tmp'
+    blob_path = index_path + '.blob'
+    ranks = array('q')
+    offsets = array('Q', [0])
+    cased = {}  # CSV row order -> spelling, for domains that are not all lowercase
+    total = 0
+    with open(source_path, 'r', newline='', encoding='utf-8') as f, open(blob_path, 'wb') as blob:
+        reader = csv.DictReader(f)
+        for row in reader:
+            spelling = (row.get('Domain') or '').strip()
+            if not spelling:
+                continue
+            try:
+                rank = int(float(row.get('Rank') or 0))
+            except ValueError:
+                continue
+            domain = spelling.lower()
+            if domain != spelling:
+                cased[len(ranks)] = spelling
+            encoded = domain.encode('utf-8')
+            blob.write(encoded)
+            total += len(encoded)
+            ranks.append(rank)
+            offsets.append(total)
+
+    count = len(ranks)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(struct.pack(INDEX_HEADER_FORMAT, INDEX_MAGIC, INDEX_VERSION, mtime_ns, size, count, len(cased)))
+            # The published list is normally already in rank order; only sort if not.
+            if all(ranks[i] <= ranks[i + 1] for i in range(count - 1)):
+                f.write(offsets.tobytes())
+                spellings = sorted(cased.items())
+                f.write(_cased_table(spellings))
+                with open(blob_path, 'rb') as blob:
+                    shutil.copyfileobj(blob, f)
+            else:
+                with open(blob_path, 'rb') as blob:
+                    data = blob.read()
+                order = sorted(range(count), key=ranks.__getitem__)
+                sorted_offsets = array('Q', [0])
+                total = 0
+                for i in order:
+                    total += offsets[i + 1] - offsets[i]
+                    sorted_offsets.append(total)
+                f.write(sorted_offsets.tobytes())
+                spellings = [(position, cased[i]) for position, i in enumerate(order) if i in cased]
+                f.write(_cased_table(spellings))
+                for i in order:
+                    f.write(data[offsets[i]:offsets[i + 1]])
+            for _, spelling in spellings:
+                f.write(spelling.encode('utf-8'))
+    finally:
+        os.remove(blob_path)
+    os.replace(tmp_path, index_path)
+    print(f"[INFO] Built domain index with {count} domains at {index_path}")
+    return index_path
+
+
+def _cased_table(spellings):
+    """Pack the positions and spelling offsets of the (position, spelling) pairs, positions ascending."""
+    positions = array('Q', (position for position, _ in spellings))
+    offsets = array('Q', [0])
+    total = 0
+    for _, spelling in spellings:
+        total += len(spelling.encode('utf-8'))
+        offsets.append(total)
+    return positions.tobytes() + offsets.tobytes()
+
+
+class DomainIndex:
+    """Read-only, memory-mapped view over a domain index file."""
+
+    def __init__(self, index_path):
+        self.path = index_path
+        self._file = open(index_path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty file; mmap refuses zero-length maps.
+            self._file.close()
+            raise ValueError(f"Domain index {index_path} is empty")
+        magic, version = struct.unpack_from('<4sH', self._mm, 0)
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"Unsupported domain index format in {index_path}")
+        _, _, self.source_mtime_ns, self.source_size, self.count, self.cased_count = struct.unpack_from(
+            INDEX_HEADER_FORMAT, self._mm, 0)
+        self._view = memoryview(self._mm)
+        start = INDEX_HEADER_SIZE
+        self._offsets = self._view[start:start + (self.count + 1) * OFFSET_SIZE].cast('Q')
+        start += (self.count + 1) * OFFSET_SIZE
+        self._cased_positions = self._view[start:start + self.cased_count * OFFSET_SIZE].cast('Q')
+        start += self.cased_count * OFFSET_SIZE
+        self._cased_offsets = self._view[start:start + (self.cased_count + 1) * OFFSET_SIZE].cast('Q')
+        self._blob_start = start + (self.cased_count + 1) * OFFSET_SIZE
+        self._cased_start = self._blob_start + self._offsets[self.count]
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, position):
+        if position < 0:
+            position += self.count
+        if not 0 <= position < self.count:
+            raise IndexError(position)
+        start = self._blob_start + self._offsets[position]
+        end = self._blob_start + self._offsets[position + 1]
+        return self._mm[start:end].decode('utf-8')
+
+    def display(self, position):
+        """Return the domain at position as the CSV spells it; index[position] is its lowercased form."""
+        domain = self[position]
+        if self.cased_count:
+            position %= self.count
+            i = bisect.bisect_left(self._cased_positions, position)
+            if i < self.cased_count and self._cased_positions[i] == position:
+                start = self._cased_start + self._cased_offsets[i]
+                end = self._cased_start + self._cased_offsets[i + 1]
+                return self._mm[start:end].decode('utf-8')
+        return domain
+
+    def top(self, n=None):
+        """Return the n best-ranked domains as a list, as the CSV spells them."""
+        if n is None or n > self.count:
+            n = self.count
+        get = self.display if self.cased_count else self.__getitem__
+        return [get(i) for i in range(n)]
+
+    def matches_source(self, source_path):
+        """True if the index was built from the current version of source_path."""
+        try:
+            return (self.source_mtime_ns, self.source_size) == _source_version(source_path)
+        except OSError:
+            # Source CSV removed; the index is still the best data we have.
+            return True
+
+    def close(self):
+        self._offsets.release()
+        self._cased_positions.release()
+        self._cased_offsets.release()
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+
+def open_domain_index(source_path, index_path=None):
+    """
+    Open the index for source_path, building or rebuilding it when it is
+    missing or was built from a different version of the CSV.
+    """
+    if index_path is None:
+        index_path = default_index_path(source_path)
+    if os.path.exists(index_path):
+        try:
+            index = DomainIndex(index_path)
+            if index.matches_source(source_path):
+                return index
+            index.close()
+            print(f"[INFO] Domain index {index_path} is stale, rebuilding...")
+        except ValueError as e:
+            print(f"[WARN] {e}, rebuilding...")
+    build_domain_index(source_path, index_path)
+    return DomainIndex(index_path)
+
+
+def build_trigram_index(index, trigram_path=None, run_domains=TRIGRAM_RUN_DOMAINS):
+    """
+    Build the trigram inverted index for an open DomainIndex.
+
+    Domains are walked in rank order, run_domains at a time; each run's
+    postings are grouped by trigram and written to a scratch file next to the
+    output, so memory stays bounded by one run however long the list is. The
+    runs are then merged slot by slot, run after run, which keeps every
+    posting list sorted best-rank first without a sort pass.
+    :return: Path of the written postings file.
+    """
+    if trigram_path is None:
+        trigram_path = default_trigram_path(index.path)
+    mtime_ns, size = _source_version(index.path)
+
+    tmp_path = trigram_path + '.tmp'
+    counts = array('Q', bytes(TRIGRAM_SLOTS * OFFSET_SIZE))
+    runs = []  # (scratch path, per-slot posting counts of the run)
+    try:
+        for start in range(0, index.count, run_domains):
+            postings = [None] * TRIGRAM_SLOTS
+            for position in range(start, min(start + run_domains, index.count)):
+                domain = index[position]
+                codes = trigram_codes(domain)
+                anchor = label_start_code(domain)
+                if anchor is not None:
+                    codes.add(anchor)
+                for code in codes:
+                    bucket = postings[code]
+                    if bucket is None:
+                        bucket = postings[code] = array('I')
+                    bucket.append(position)
+            run_path = f"{trigram_path}.run{len(runs)}"
+            run_counts = array('I', bytes(TRIGRAM_SLOTS * POSTING_SIZE))
+            runs.append((run_path, run_counts))
+            with open(run_path, 'wb') as f:
+                for code, bucket in enumerate(postings):
+                    if bucket is not None:
+                        run_counts[code] = len(bucket)
+                        counts[code] += len(bucket)
+                        f.write(bucket.tobytes())
+            del postings
+
+        offsets = array('Q', [0])
+        total = 0
+        for count in counts:
+            total += count
+            offsets.append(total)
+
+        readers = []
+        try:
+            for run_path, _ in runs:
+                readers.append(open(run_path, 'rb'))
+            with open(tmp_path, 'wb') as f:
+                f.write(struct.pack(HEADER_FORMAT, TRIGRAM_MAGIC, TRIGRAM_VERSION, mtime_ns, size, TRIGRAM_SLOTS))
+                f.write(offsets.tobytes())
+                for code in range(TRIGRAM_SLOTS):
+                    if not counts[code]:
+                        continue
+                    for reader, (_, run_counts) in zip(readers, runs):
+                        if run_counts[code]:
+                            f.write(reader.read(run_counts[code] * POSTING_SIZE))
+        finally:
+            for reader in readers:
+                reader.close()
+    finally:
+        for run_path, _ in runs:
+            if os.path.exists(run_path):
+                os.remove(run_path)
+    os.replace(tmp_path, trigram_path)
+    print(f"[INFO] Built trigram index with {total} postings at {trigram_path}")
+    return trigram_path
+
+
+class TrigramIndex:
+    """Read-only, memory-mapped trigram postings for a domain index."""
+
+    def __init__(self, trigram_path):
+        self.path = trigram_path
+        self._file = open(trigram_path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.index_mtime_ns, self.index_size, slots = struct.unpack_from(
+            HEADER_FORMAT, self._mm, 0)
+        if magic != TRIGRAM_MAGIC or version != TRIGRAM_VERSION or slots != TRIGRAM_SLOTS:
+            self._mm.close()
+            self._file.close()
+            raise ValueError(f"Unsupported trigram index format in {trigram_path}")
+        postings_start = HEADER_SIZE + (TRIGRAM_SLOTS + 1) * OFFSET_SIZE
+        self._view = memoryview(self._mm)
+        self._offsets = self._view[HEADER_SIZE:postings_start].cast('Q')
+        self._postings = self._view[postings_start:].cast('I')
+
+    def postings(self, code):
+        """Return the domain positions containing trigram `code`, best rank first."""
+        return self._postings[self._offsets[code]:self._offsets[code + 1]]
+
+    def matches_index(self, index):
+        try:
+            return (self.index_mtime_ns, self.index_size) == _source_version(index.path)
+        except OSError:
+            return False
+
+    def close(self):
+        self._postings.release()
+        self._offsets.release()
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+
+def open_trigram_index(index, trigram_path=None, build=True):
+    """
+    Open the trigram postings for `index`, building them when missing or stale.
+    With build=False a missing or stale file gives None instead, for callers
+    that cannot afford the build.
+    """
+    if trigram_path is None:
+        trigram_path = default_trigram_path(index.path)
+    if os.path.exists(trigram_path):
+        try:
+            trigrams = TrigramIndex(trigram_path)
+            if trigrams.matches_index(index):
+                return trigrams
+            trigrams.close()
+            if build:
+                print(f"[INFO] Trigram index {trigram_path} is stale, rebuilding...")
+        except ValueError as e:
+            print(f"[WARN] {e}, rebuilding..." if build else f"[WARN] {e}")
+    if not build:
+        return None
+    build_trigram_index(index, trigram_path)
+    return TrigramIndex(trigram_path)
+
+
+if __name__ == "__main__":
+    import sys
+    source = sys.argv[1] if len(sys.argv) > 1 else os.path.join(os.path.dirname(__file__), 'top10milliondomains.csv')
+    index = open_domain_index(source)
+    build_trigram_index(index)
+    index.close()
@@ -1,38 +1,283 @@
-import pandas as pd
 import os
+import math
+import heapq
+import threading
 import webbrowser
+from domain_index import (INDEX_VERSION, DomainIndex, build_trigram_index, label_start_code, open_domain_index,
+                          open_trigram_index, trigram_codes)
+from catalog import get_catalog
+from resolution_cache import get_resolution_cache
 
 DEFAULT_FILENAME = 'top10milliondomains.csv'
 
-def load_domains(file_path=None, top_n=10000):
+# Match-quality bonuses added on top of the rank score (which lies in (0, 1]).
+# Label bonuses are deliberately small so a very popular domain that merely
+# contains the query ("tube" -> youtube.com) still beats an obscure exact label
+# ("tube.com"); typing the full domain always wins.
+FULL_DOMAIN_BONUS = 2.0
+EXACT_MATCH_BONUS = 0.6
+PREFIX_MATCH_BONUS = 0.35
+LABEL_MATCH_BONUS = 0.2
+SUBSTRING_MATCH_BONUS = 0.1
+
+# Substring walks stop after this many verified matches or scanned candidates.
+# Exact and prefix matches come from their own, uncapped walk.
+MAX_VERIFIED_MATCHES = 64
+MAX_SCANNED_CANDIDATES = 20000
+# Queries shorter than a trigram are matched against this many top domains.
+SHORT_QUERY_SCAN = 10000
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+_index_builds = {}  # file_path -> lock held while its domain index is opened or built
+_trigram_builds = {}  # file_path -> thread building its trigram index
+
+def get_domain_index(file_path=None):
     """
-    Load domains from CSV file, sorted by 'Rank', returning top N domains as a list.
+    Return the memory-mapped domain index for file_path, opening it once per process.
+    The index is (re)built from the CSV only when it is missing or out of date.
     """
+    return _get_indexes(file_path)[0]
+
+def _default_path(file_path):
     if file_path is None:
-        file_path = os.path.join(os.path.dirname(__file__), DEFAULT_FILENAME)
+        return os.path.join(os.path.dirname(__file__), DEFAULT_FILENAME)
+    return file_path
+
+def _get_indexes(file_path=None, with_trigrams=False):
+    """
+    Return (domain index, trigram index) for file_path. The trigram index is
+    never built here: when it is missing or stale a background build is
+    started and None is returned until it is ready.
+    """
+    file_path = _default_path(file_path)
+    with _indexes_lock:
+        index, _ = _indexes.get(file_path, (None, None))
+        fresh = index is not None and index.matches_source(file_path)
+        build_lock = None if fresh else _index_builds.setdefault(file_path, threading.Lock())
+    opened = None
+    if build_lock is not None:
+        # Opened (and built, if need be) outside _indexes_lock, which only
+        # guards the table: a build no longer holds up every other lookup.
+        # Queries racing on the same list wait here for the one build.
+        with build_lock:
+            opened = open_domain_index(file_path)
+    with _indexes_lock:
+        index, trigrams = _indexes.get(file_path, (None, None))
+        if opened is not None:
+            if index is not None and index.matches_source(file_path):
+                opened.close()  # another query got there first
+            else:
+                if trigrams is not None:
+                    trigrams.close()
+                if index is not None:
+                    index.close()
+                index, trigrams = opened, None
+        if with_trigrams and trigrams is None:
+            trigrams = open_trigram_index(index, build=False)
+            if trigrams is None:
+                _start_trigram_build(file_path, index)
+        _indexes[file_path] = (index, trigrams)
+        return index, trigrams
+
+def _start_trigram_build(file_path, index):
+    """Start building the trigram index for file_path unless a build is already running."""
+    build = _trigram_builds.get(file_path)
+    if build is None or not build.is_alive():
+        build = threading.Thread(target=_build_trigrams, args=(index.path,), name="trigram-build", daemon=True)
+        _trigram_builds[file_path] = build
+        build.start()
+
+def _build_trigrams(index_path):
+    # A handle of its own, so a concurrent rebuild of the domain index cannot close it mid-build.
     try:
-        df = pd.read_csv(file_path)
-        df_sorted = df.sort_values('Rank').head(top_n)
-        domains = df_sorted['Domain'].tolist()
-        return domains
+        index = DomainIndex(index_path)
+        try:
+            build_trigram_index(index)
+        finally:
+            index.close()
+    except Exception as e:
+        print(f"[ERROR] Failed to build trigram index for {index_path}: {e}")
+
+def warm_up(file_path=None):
+    """Open (building them if needed) the domain and trigram indexes ahead of the first search."""
+    file_path = _default_path(file_path)
+    _get_indexes(file_path, with_trigrams=True)
+    build = _trigram_builds.get(file_path)
+    if build is not None:
+        build.join()
+        _get_indexes(file_path, with_trigrams=True)
+
+def load_domains(file_path=None, top_n=10000):
+    """
+    Load domains from the domain index, sorted by 'Rank', returning top N domains as a list.
+    The default list comes from the catalog instead when domains have been imported into it.
+    """
+    try:
+        if file_path is None:
+            catalog = get_catalog()
+            if catalog.count('domains'):
+                return catalog.top_domains(top_n)
+        return get_domain_index(file_path).top(top_n)
     except Exception as e:
         print(f"[ERROR] Failed to load domains from {file_path}: {e}")
         return []
 
-def find_best_match(query, domains):
+def normalize_query(query):
+    """Strip the command word from a query like 'open tube', leaving the domain fragment."""
+    return query.lower().replace("open ", "").strip()
+
+def _rank_score(position):
+    return 1.0 / (1.0 + math.log10(1 + position))
+
+def _match_bonus(query, domain):
+    label = domain[4:] if domain.startswith("www.") else domain
+    label = label.split(".", 1)[0]
+    if query == domain:
+        return FULL_DOMAIN_BONUS
+    if query == label:
+        return EXACT_MATCH_BONUS
+    if label.startswith(query) or domain.startswith(query):
+        return PREFIX_MATCH_BONUS
+    if query in label:
+        return LABEL_MATCH_BONUS
+    return SUBSTRING_MATCH_BONUS
+
+def score_domain(query, domain, position):
+    """Score a domain that contains `query`; higher is better."""
+    return _rank_score(position) + _match_bonus(query, domain)
+
+def _candidates(query, index, trigrams):
+    """Yield positions of domains containing `query`, best rank first."""
+    if trigrams is None or len(query) < 3:
+        for position in range(min(SHORT_QUERY_SCAN, len(index))):
+            if query in index[position]:
+                yield position
+        return
+
+    lists = sorted((trigrams.postings(code) for code in trigram_codes(query)), key=len)
+    if not lists or not len(lists[0]):
+        return
+    scanned = 0
+    for position in lists[0]:
+        if query in index[position]:
+            yield position
+        scanned += 1
+        if scanned >= MAX_SCANNED_CANDIDATES:
+            return
+
+def _prefix_candidates(query, index, trigrams, code):
+    """Yield positions of domains that start with `query` (past any 'www.'), best rank first."""
+    stripped = query[4:] if query.startswith("www.") else query
+    # Such a domain is on the leading-trigram list and on every one of the
+    # query's trigram lists, so the shortest of them all will do.
+    postings = min([trigrams.postings(code)] + [trigrams.postings(c) for c in trigram_codes(query)], key=len)
+    for position in postings:
+        domain = index[position]
+        if (domain[4:] if domain.startswith("www.") else domain).startswith(stripped) and query in domain:
+            yield position
+
+def search_domains(query, top_k=5, file_path=None):
+    """
+    Return up to top_k (domain, score) pairs for the query from the full domain list,
+    best first. Uses the trigram index, so the whole list is searched, not a top-N slice;
+    while that index is still being built only the top domains are searched.
+    """
+    query = normalize_query(query)
+    if not query:
+        return []
+    try:
+        index, trigrams = _get_indexes(file_path, with_trigrams=True)
+    except Exception as e:
+        print(f"[ERROR] Failed to open domain index: {e}")
+        return []
+
+    # Every exact, prefix and full-domain match starts with the query's leading
+    # trigram, so when that slot can be used, an uncapped walk over it finds
+    # whatever the capped substring walk cut off. It runs second, so the matches
+    # found first usually let it stop after a few candidates. ("www" could still
+    # be the start of "www.", so it cannot be used.)
+    best_bonus = FULL_DOMAIN_BONUS if "." in query else EXACT_MATCH_BONUS
+    code = label_start_code(query) if trigrams is not None and not "www.".startswith(query) else None
+    walks = [(_candidates(query, index, trigrams), MAX_VERIFIED_MATCHES)]
+    if code is not None:
+        walks.append((_prefix_candidates(query, index, trigrams, code), None))
+
+    scored = []
+    seen = set()
+    top = []  # min-heap of the top_k best scores so far
+    for candidates, limit in walks:
+        verified = 0
+        for position in candidates:
+            rank_score = _rank_score(position)
+            # Candidates come best rank first, so once top_k matches beat the best
+            # score any later candidate could still reach, the walk can stop.
+            if top and len(top) == top_k and top[0] >= rank_score + best_bonus:
+                break
+            if position in seen:
+                continue
+            domain = index[position]
+            bonus = _match_bonus(query, domain)
+            if limit is not None and verified >= limit:
+                # Not marked seen: the prefix walk must still consider it.
+                if code is not None:
+                    break
+                # No prefix walk ran, so past the limit this walk still keeps
+                # the exact and prefix matches.
+                if bonus < PREFIX_MATCH_BONUS:
+                    continue
+            seen.add(position)
+            score = rank_score + bonus
+            scored.append((score, position))
+            if len(top) < top_k:
+                heapq.heappush(top, score)
+            elif score > top[0]:
+                heapq.heapreplace(top, score)
+            verified += 1
+    scored.sort(key=lambda item: (-item[0], item[1]))
+    return [(index.display(position), score) for score, position in scored[:top_k]]
+
+def find_best_match(query, domains=None):
     """
     Find the best matching domain for the user query using exact or partial match.
+    Searches the full domain index unless an explicit domains list is given.
     Returns a list of matched domain(s).
     """
-    query = query.lower().replace("open ", "").strip()
-    
-    # Fallback: exact or partial match in domains list
-    for domain in domains:
-        if query == domain.lower() or query in domain.lower():
-            return [domain]
-    
-    # No match found
-    return []
+    if domains is None:
+        return _cached_best_match(query)
+
+    query = normalize_query(query)
+    if not query:
+        return []
+    best = None
+    for position, domain in enumerate(domains):
+        lowered = domain.lower()
+        if query in lowered:
+            score = score_domain(query, lowered, position)
+            if best is None or score > best[0]:
+                best = (score, domain)
+    return [best[1]] if best else []
+
+def _cached_best_match(query):
+    """The full-index search for the best domain, memoized until the domain CSV changes."""
+    fragment = normalize_query(query)
+    if not fragment:
+        return []
+    try:
+        index = get_domain_index()  # reopened here if the CSV changed
+    except Exception as e:
+        print(f"[ERROR] Failed to open domain index: {e}")
+        return []
+    # Includes the index format, so domains cached before it kept their spelling are resolved again.
+    version = (index.source_mtime_ns, index.source_size, INDEX_VERSION)
+    cache = get_resolution_cache()
+    cached = cache.get("website", fragment, version)
+    if cached is not None:
+        return [cached]
+    matches = [domain for domain, _ in search_domains(fragment, top_k=1)]
+    if matches:
+        cache.put("website", fragment, version, matches[0])
+    return matches
 
 def open_website(domain):
     """
@@ -1,35 +1,552 @@
 import os
 import csv
+import json
+import queue
+import threading
+import time
+import functools
+from collections import namedtuple
 from datetime import datetime
 
-def scan_directories(directories, extensions, csv_path):
+CSV_HEADER = ['Filename', 'FullPath', 'Extension', 'ModifiedTime']
+SNAPSHOT_VERSION = 1
+# Directories visited between progress callbacks.
+PROGRESS_INTERVAL = 64
+
+# Result of an incremental scan: lists of CSV rows, plus the size of the updated index.
+ScanDelta = namedtuple('ScanDelta', ['added', 'removed', 'modified', 'total'])
+
+# Crawler threads; directory listing is syscall-bound, so this can exceed the core count.
+DEFAULT_SCAN_WORKERS = min(16, (os.cpu_count() or 1) * 2)
+# Upper bound on per-directory row batches waiting for the CSV writer.
+ROW_QUEUE_SIZE = 256
+
+# Held while an incremental scan or a watcher update reads and rewrites an index.
+_index_lock = threading.Lock()
+
+def _serialized(fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        with _index_lock:
+            return fn(*args, **kwargs)
+    return wrapper
+
+def _crawl_roots(directories):
+    """Normalize roots and drop any root nested in another, so no tree is crawled twice."""
+    roots = []
+    for directory in sorted({os.path.normpath(d) for d in directories}, key=len):
+        if not any(_is_within(directory, root) for root in roots):
+            roots.append(directory)
+    return roots
+
+def _is_within(path, root):
+    try:
+        return os.path.commonpath([path, root]) == root
+    except ValueError:
+        # Different drives on Windows.
+        return False
+
+def _under_any(path, roots):
+    """True if path is one of roots or lies below one (roots as returned by _crawl_roots)."""
+    for root in roots:
+        prefix = root if root.endswith(os.sep) else root + os.sep
+        if path == root or path.startswith(prefix):
+            return True
+    return False
+
+def _crawl(roots, visit, workers=DEFAULT_SCAN_WORKERS):
+    """
+    Call visit(directory) for each root and every subdirectory it reports, on
+    a bounded pool of threads, and yield visit's results as they arrive.
+
+    visit returns (subdirectory paths, result); empty results are not
+    yielded. Subdirectories found by one worker are fanned out to the others
+    through a shared queue, and results pass through a bounded queue, so
+    memory stays flat however large the tree is. Closing the generator early
+    stops the workers.
+    """
+    roots = list(roots)
+    if not roots:
+        return
+    dir_queue = queue.Queue()
+    results = queue.Queue(maxsize=ROW_QUEUE_SIZE)
+    stop = threading.Event()
+    pending = [len(roots)]
+    pending_lock = threading.Lock()
+    done = object()
+
+    def put_result(result):
+        while not stop.is_set():
+            try:
+                results.put(result, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def finish_directory():
+        with pending_lock:
+            pending[0] -= 1
+            finished = pending[0] == 0
+        if finished:
+            for _ in threads:
+                dir_queue.put(None)
+            put_result(done)
+
+    def worker():
+        while True:
+            directory = dir_queue.get()
+            if directory is None or stop.is_set():
+                return
+            try:
+                subdirs, result = visit(directory)
+            except Exception as e:
+                print(f"[WARN] Failed to scan {directory}: {e}")
+                subdirs, result = (), None
+            if subdirs:
+                with pending_lock:
+                    pending[0] += len(subdirs)
+                for path in subdirs:
+                    dir_queue.put(path)
+            if result:
+                put_result(result)
+            finish_directory()
+
+    for root in roots:
+        dir_queue.put(root)
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, workers))]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            result = results.get()
+            if result is done:
+                return
+            yield result
+    finally:
+        # Also reached when the consumer stops early: release any blocked workers.
+        stop.set()
+        for _ in threads:
+            dir_queue.put(None)
+
+def iter_files(directories, extensions, workers=DEFAULT_SCAN_WORKERS):
+    """
+    Crawl directories with a bounded pool of os.scandir threads and yield a CSV
+    row per matching file as results arrive. File mtimes come from the cached
+    DirEntry stat (free on Windows).
+    """
+    extensions = {ext.lower() for ext in extensions}
+
+    def visit(directory):
+        subdirs = []
+        batch = []
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            subdirs.append(entry.path)
+                        elif os.path.splitext(entry.name)[1].lower() in extensions:
+                            batch.append(_file_record(entry.name, entry.path, entry.stat().st_mtime_ns))
+                    except OSError:
+                        continue
+        except OSError:
+            pass
+        return subdirs, batch
+
+    roots = [root for root in _crawl_roots(directories) if os.path.isdir(root)]
+    for batch in _crawl(roots, visit, workers):
+        yield from batch
+
+def scan_directories(directories, extensions, csv_path, workers=DEFAULT_SCAN_WORKERS):
     """
     Scan given directories for files with specified extensions and save info to CSV.
 
     :param directories: List of directory paths to scan.
     :param extensions: Set of file extensions to include (e.g. {'.pdf', '.docx'}).
     :param csv_path: Path to output CSV file.
+    :param workers: Number of crawler threads.
     :return: Number of files scanned.
     """
-    file_records = []
-
-    for directory in directories:
-        for root, _, files in os.walk(directory):
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext in extensions:
-                    full_path = os.path.join(root, file)
-                    mod_time = os.path.getmtime(full_path)
-                    mod_time_str = datetime.fromtimestamp(mod_time).strftime('%Y-%m-%d %H:%M:%S')
-                    file_records.append([file, full_path, ext, mod_time_str])
-
-    # Write to CSV
+    count = 0
+    # Rows are streamed from the crawler straight into the CSV writer.
     with open(csv_path, 'w', newline='', encoding='utf-8') as csvfile:
         writer = csv.writer(csvfile)
-        writer.writerow(['Filename', 'FullPath', 'Extension', 'ModifiedTime'])
-        writer.writerows(file_records)
+        writer.writerow(CSV_HEADER)
+        for record in iter_files(directories, extensions, workers):
+            writer.writerow(record)
+            count += 1
+
+    return count
+
+def default_snapshot_path(csv_path):
+    """Return the directory snapshot path kept alongside an index CSV."""
+    return os.path.splitext(csv_path)[0] + '.snapshot.json'
+
+def _file_record(name, full_path, mtime_ns):
+    mod_time_str = datetime.fromtimestamp(mtime_ns / 1e9).strftime('%Y-%m-%d %H:%M:%S')
+    return [name, full_path, os.path.splitext(name)[1].lower(), mod_time_str]
+
+def _load_snapshot(snapshot_path, extensions):
+    try:
+        with open(snapshot_path, 'r', encoding='utf-8') as f:
+            snapshot = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if snapshot.get('version') != SNAPSHOT_VERSION or set(snapshot.get('extensions', [])) != set(extensions):
+        return None
+    return snapshot.get('dirs', {})
+
+def _list_directory(directory, extensions):
+    """Return ({filename: mtime_ns} for matching files, [subdirectory names])."""
+    files = {}
+    subdirs = []
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.name)
+                elif os.path.splitext(entry.name)[1].lower() in extensions:
+                    files[entry.name] = entry.stat().st_mtime_ns
+            except OSError:
+                continue
+    return files, subdirs
+
+def _read_index(csv_path):
+    rows = {}
+    try:
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            for row in reader:
+                if len(row) == len(CSV_HEADER):
+                    rows[row[1]] = row
+    except OSError:
+        pass
+    return rows
+
+def _write_atomic(path, write):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+        write(f)
+    os.replace(tmp_path, path)
+
+def _write_index(csv_path, index):
+    def write(f):
+        writer = csv.writer(f)
+        writer.writerow(CSV_HEADER)
+        writer.writerows(index.values())
+    _write_atomic(csv_path, write)
+
+def _write_snapshot(snapshot_path, extensions, dirs):
+    _write_atomic(snapshot_path, lambda f: json.dump(
+        {'version': SNAPSHOT_VERSION, 'extensions': sorted(extensions), 'dirs': dirs}, f))
+
+def _relist(directory, mtime_ns, extensions, old, index, added, removed, modified):
+    """
+    List directory afresh, recording how its files differ from its snapshot
+    entry old; returns the new entry. index is only read.
+    """
+    files, subdirs = _list_directory(directory, extensions)
+    old_files = old['files'] if old is not None else {}
+    for name, file_mtime in files.items():
+        full_path = os.path.join(directory, name)
+        if name not in old_files:
+            added.append(_file_record(name, full_path, file_mtime))
+        elif old_files[name] != file_mtime:
+            modified.append(_file_record(name, full_path, file_mtime))
+    for name in old_files.keys() - files.keys():
+        full_path = os.path.join(directory, name)
+        removed.append(index.get(full_path) or _file_record(name, full_path, old_files[name]))
+    return {'mtime': mtime_ns, 'files': files, 'subdirs': subdirs}
+
+def _drop_directory(directory, entry, index, removed):
+    """Record every file of a directory that left the index as removed."""
+    for name, file_mtime in entry['files'].items():
+        full_path = os.path.join(directory, name)
+        removed.append(index.get(full_path) or _file_record(name, full_path, file_mtime))
+
+def _sync_catalog(catalog, csv_path, delta=None):
+    """Bring the catalog's files table up to date with the index CSV, incrementally when it was in sync."""
+    try:
+        if delta is None:
+            # Before scanning: catch up if the CSV was written without the catalog.
+            catalog.import_csv_if_changed('files', csv_path)
+            return
+        catalog.apply_file_changes(delta.added + delta.modified, [row[1] for row in delta.removed])
+        catalog.mark_imported('files', csv_path)
+    except Exception as e:
+        print(f"[WARN] Failed to update the file catalog: {e}")
+
+@_serialized
+def scan_directories_incremental(directories, extensions, csv_path, snapshot_path=None,
+                                 progress=None, cancel_event=None, catalog=None, workers=DEFAULT_SCAN_WORKERS):
+    """
+    Rescan directories against the snapshot left by the previous scan and patch the CSV.
+
+    A directory whose mtime is unchanged is not listed again: its files and
+    subdirectories are taken from the snapshot. Its subdirectories are still
+    visited (one stat each), because a change deep in a tree does not update
+    the mtime of its ancestors. Files modified in place inside an unchanged
+    directory are therefore only picked up once that directory changes.
+    Directories are stat'ed and listed on the same thread pool as iter_files.
+
+    Scans of different root sets may share one CSV and snapshot (the startup
+    folders and "scan files" both use file_index.csv): only directories under
+    the roots being scanned are pruned, and everything else in the snapshot
+    and the index is carried over untouched.
+
+    :param directories: List of directory paths to scan.
+    :param extensions: Set of file extensions to include (e.g. {'.pdf', '.docx'}).
+    :param csv_path: Path to the index CSV to update.
+    :param snapshot_path: Where to persist the directory snapshot (defaults next to the CSV).
+    :param progress: Optional callback(dirs_done, dirs_expected, files_seen); dirs_expected
+                     is the directory count of the previous snapshot, or None on a first scan.
+    :param cancel_event: Optional threading.Event; when set, the scan stops without writing.
+    :param catalog: Optional catalog.Catalog whose files table receives the same changes.
+    :param workers: Number of crawler threads.
+    :return: ScanDelta with the added, removed and modified CSV rows, or None if cancelled.
+    """
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(csv_path)
+    extensions = {ext.lower() for ext in extensions}
+    if catalog is not None and os.path.exists(csv_path):
+        _sync_catalog(catalog, csv_path)
+    old_dirs = _load_snapshot(snapshot_path, extensions)
+    if old_dirs is None or not os.path.exists(csv_path):
+        old_dirs = {}
+        index = {}
+    else:
+        index = _read_index(csv_path)
+
+    def visit(directory):
+        """Reuse the snapshot entry of an unchanged directory, else list it; runs on a crawler thread."""
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError:
+            return (), None
+        old = old_dirs.get(directory)
+        changes = None
+        if old is not None and old['mtime'] == mtime_ns:
+            entry = old
+        else:
+            changes = ([], [], [])
+            try:
+                entry = _relist(directory, mtime_ns, extensions, old, index, *changes)
+            except OSError:
+                return (), None
+        return [os.path.join(directory, name) for name in entry['subdirs']], (directory, entry, changes)
+
+    new_dirs = {}
+    relisted = 0
+    added, removed, modified = [], [], []
+    roots = _crawl_roots(directories)
+    dirs_expected = sum(1 for directory in old_dirs if _under_any(directory, roots)) or None
+    files_seen = 0
+    crawl = _crawl(roots, visit, workers)
+    try:
+        for directory, entry, changes in crawl:
+            if cancel_event is not None and cancel_event.is_set():
+                print("[INFO] File scan cancelled.")
+                return None
+            if progress is not None and len(new_dirs) % PROGRESS_INTERVAL == 0:
+                progress(len(new_dirs), dirs_expected, files_seen)
+            new_dirs[directory] = entry
+            files_seen += len(entry['files'])
+            if changes is not None:
+                relisted += 1
+                added.extend(changes[0])
+                removed.extend(changes[1])
+                modified.extend(changes[2])
+    finally:
+        crawl.close()
+    if cancel_event is not None and cancel_event.is_set():
+        print("[INFO] File scan cancelled.")
+        return None
+    if progress is not None:
+        progress(len(new_dirs), dirs_expected, files_seen)
+
+    # Directories under the roots that disappeared take their files with them;
+    # the ones outside belong to scans of other roots and are kept.
+    for directory in old_dirs.keys() - new_dirs.keys():
+        if _under_any(directory, roots):
+            _drop_directory(directory, old_dirs[directory], index, removed)
+        else:
+            new_dirs[directory] = old_dirs[directory]
+
+    for row in removed:
+        index.pop(row[1], None)
+    for row in added + modified:
+        index[row[1]] = row
+
+    if added or removed or modified or not os.path.exists(csv_path):
+        _write_index(csv_path, index)
+    if relisted or len(new_dirs) != len(old_dirs):
+        _write_snapshot(snapshot_path, extensions, new_dirs)
+    delta = ScanDelta(added, removed, modified, len(index))
+    if catalog is not None and (added or removed or modified or not catalog.generation('files')):
+        _sync_catalog(catalog, csv_path, delta)
+    return delta
+
+@_serialized
+def update_directories(directories, extensions, csv_path, snapshot_path=None, catalog=None):
+    """
+    Patch the index for just the given directories, e.g. the ones a file
+    watcher saw change. Each is listed again and compared with the snapshot
+    (so files modified in place are caught too); subdirectories new to the
+    snapshot are crawled in full, and directories that are gone drop out
+    together with everything below them.
+
+    :return: ScanDelta, or None when there is no snapshot to patch yet (run
+             scan_directories_incremental first).
+    """
+    if snapshot_path is None:
+        snapshot_path = default_snapshot_path(csv_path)
+    extensions = {ext.lower() for ext in extensions}
+    dirs = _load_snapshot(snapshot_path, extensions)
+    if dirs is None or not os.path.exists(csv_path):
+        return None
+    if catalog is not None:
+        _sync_catalog(catalog, csv_path)
+    # Removed rows are rebuilt from the snapshot, so the CSV is only read when there is something to write.
+    index = {}
+    added, removed, modified = [], [], []
+    dirs_changed = False
+
+    def drop_tree(top):
+        nonlocal dirs_changed
+        prefix = top + os.sep
+        for path in [path for path in dirs if path == top or path.startswith(prefix)]:
+            _drop_directory(path, dirs.pop(path), index, removed)
+            dirs_changed = True
+
+    stack = [os.path.normpath(directory) for directory in directories]
+    visited = set()
+    while stack:
+        directory = stack.pop()
+        if directory in visited:
+            continue
+        visited.add(directory)
+        old = dirs.get(directory)
+        try:
+            mtime_ns = os.stat(directory).st_mtime_ns
+            entry = _relist(directory, mtime_ns, extensions, old, index, added, removed, modified)
+        except OSError:
+            drop_tree(directory)
+            continue
+        if entry != old:
+            dirs[directory] = entry
+            dirs_changed = True
+        if old is not None:
+            for name in set(old['subdirs']).difference(entry['subdirs']):
+                drop_tree(os.path.join(directory, name))
+        stack.extend(path for path in (os.path.join(directory, name) for name in entry['subdirs'])
+                     if path not in dirs)
+
+    if added or removed or modified:
+        index = _read_index(csv_path)
+        for row in removed:
+            index.pop(row[1], None)
+        for row in added + modified:
+            index[row[1]] = row
+        _write_index(csv_path, index)
+        total = len(index)
+    else:
+        total = sum(len(entry['files']) for entry in dirs.values())
+    if dirs_changed:
+        _write_snapshot(snapshot_path, extensions, dirs)
+    delta = ScanDelta(added, removed, modified, total)
+    if catalog is not None and (added or removed or modified):
+        _sync_catalog(catalog, csv_path, delta)
+    return delta
+
+def snapshot_directories(csv_path, extensions, snapshot_path=None):
+    """Return {directory: mtime_ns} from the snapshot kept alongside csv_path ({} if there is none)."""
+    dirs = _load_snapshot(snapshot_path or default_snapshot_path(csv_path), {ext.lower() for ext in extensions})
+    return {directory: entry['mtime'] for directory, entry in (dirs or {}).items()}
+
+class FileScanJob:
+    """
+    Incremental scan with progress and cancellation, run on its own thread
+    (start) or by whoever calls run, e.g. a job_scheduler worker.
+    """
+
+    def __init__(self, directories, extensions, csv_path, on_complete=None, catalog=None):
+        self.directories = directories
+        self.extensions = extensions
+        self.csv_path = csv_path
+        self.catalog = catalog
+        self.on_complete = on_complete
+        self.dirs_done = 0
+        self.dirs_expected = None
+        self.files_seen = 0
+        self.delta = None
+        self.error = None
+        self.started_at = None
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+
+    def start(self):
+        threading.Thread(target=self.run, name="file-scan", daemon=True).start()
+        return self
+
+    def _progress(self, dirs_done, dirs_expected, files_seen):
+        self.dirs_done, self.dirs_expected, self.files_seen = dirs_done, dirs_expected, files_seen
+
+    def run(self):
+        self.started_at = time.monotonic()
+        try:
+            self.delta = scan_directories_incremental(self.directories, self.extensions, self.csv_path,
+                                                      progress=self._progress, cancel_event=self._cancel,
+                                                      catalog=self.catalog)
+        except Exception as e:
+            print(f"[ERROR] Background file scan failed: {e}")
+            self.error = e
+        self.finished_at = time.monotonic()
+        self._finished.set()
+        if self.on_complete is not None:
+            self.on_complete(self)
+        return self.delta
+
+    def cancel(self):
+        self._cancel.set()
+
+    def wait(self, timeout=None):
+        """Wait for the scan to finish; returns True if it has."""
+        return self._finished.wait(timeout)
+
+    @property
+    def done(self):
+        return self.finished_at is not None
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def percent_done(self):
+        """Progress estimate based on the previous scan's directory count, or None."""
+        if self.done:
+            return 100
+        if not self.dirs_expected:
+            return None
+        return min(99, int(100 * self.dirs_done / self.dirs_expected))
+
+    def status(self):
+        """Short human-readable description of the scan's state."""
+        if self.error is not None:
+            return "File indexing failed."
+        if self.done and self.cancelled and self.delta is None:
+            return "File indexing was cancelled."
+        if self.done:
+            return f"File indexing is complete. {self.delta.total} files indexed."
+        if self.started_at is None:
+            return "File indexing is waiting to start."
+        percent = self.percent_done()
+        if percent is None:
+            return f"File indexing is running. {self.dirs_done} folders and {self.files_seen} files scanned so far."
+        return f"File indexing is {percent} percent done. {self.files_seen} files scanned so far."
 
-    return len(file_records)
 
 if __name__ == "__main__":
     # Example directories to scan - adjust as needed
@@ -56,8 +573,4 @@ if __name__ == "__main__":
     num_files_scanned = scan_directories(directories_to_scan, file_types, output_csv)
     print(f"Scanned {num_files_scanned} files and saved to {output_csv}")
 
-    # Optional: Uncomment below to update periodically every N seconds (e.g., 1 hour)
-    # while True:
-    #     num_files_scanned = scan_directories(directories_to_scan, file_types, output_csv)
-    #     print(f"Scanned {num_files_scanned} files and saved to {output_csv}")
-    #     time.sleep(3600)  # sleep for 1 hour
+    # To keep the index fresh afterwards, run file_watcher.py instead of rescanning periodically.
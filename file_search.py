@@ -0,0 +1,310 @@
+import os
+import re
+import csv
+import math
+import bisect
+import heapq
+import threading
+from array import array
+from collections import namedtuple
+from datetime import datetime, timedelta
+
+DEFAULT_INDEX_PATH = os.path.join(os.path.expanduser('~'), 'file_index.csv')
+
+# One search result; modified is a datetime.
+FileMatch = namedtuple('FileMatch', ['path', 'name', 'extension', 'modified', 'score'])
+
+# Spoken file kinds and the extensions they stand for.
+KIND_EXTENSIONS = {
+    'spreadsheet': {'.xlsx', '.xls', '.csv'},
+    'excel': {'.xlsx', '.xls'},
+    'document': {'.docx', '.doc', '.pdf', '.txt'},
+    'doc': {'.docx', '.doc'},
+    'pdf': {'.pdf'},
+    'picture': {'.jpg', '.jpeg', '.png'},
+    'photo': {'.jpg', '.jpeg', '.png'},
+    'image': {'.jpg', '.jpeg', '.png'},
+    'video': {'.mp4'},
+    'movie': {'.mp4'},
+    'song': {'.mp3'},
+    'audio': {'.mp3'},
+    'presentation': {'.pptx', '.ppt'},
+}
+_ALL_EXTENSIONS = set().union(*KIND_EXTENSIONS.values())
+
+# Words that carry no search meaning in a spoken file query.
+STOPWORDS = {
+    'open', 'find', 'search', 'for', 'show', 'me', 'the', 'a', 'an', 'my', 'file', 'files',
+    'called', 'named', 'from', 'in', 'of', 'on', 'with', 'that', 'i', 'edited', 'saved',
+    'modified', 'made', 'please', 'folder',
+}
+
+# Weights: a filename token counts more than a parent-folder token, and a
+# whole-token hit more than a prefix hit.
+NAME_WEIGHT = 2.0
+FOLDER_WEIGHT = 0.5
+PREFIX_FACTOR = 0.6
+# Small tie-breaker so newer files win between equally good names.
+RECENCY_WEIGHT = 0.3
+# Parent folders (nearest first) whose names are indexed for each file.
+FOLDER_DEPTH = 2
+
+_TOKEN_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|[0-9]+')
+
+
+def tokenize(text):
+    """Split a filename or folder name into lowercase word and number tokens, splitting camelCase too."""
+    return [token.lower() for token in _TOKEN_RE.findall(text)]
+
+
+def _singular(word):
+    return word[:-1] if len(word) > 3 and word.endswith('s') and not word.endswith('ss') else word
+
+
+def parse_time_filter(query, now=None):
+    """
+    Return (start, end) datetimes for time phrases like 'today', 'last week'
+    or 'this month' in the query, or (None, None) if there is none.
+    """
+    now = now or datetime.now()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    week_start = today - timedelta(days=today.weekday())
+    month_start = today.replace(day=1)
+    if 'yesterday' in query:
+        return today - timedelta(days=1), today
+    if 'today' in query:
+        return today, None
+    if 'last week' in query:
+        return week_start - timedelta(days=7), week_start
+    if 'this week' in query:
+        return week_start, None
+    if 'last month' in query:
+        previous = (month_start - timedelta(days=1)).replace(day=1)
+        return previous, month_start
+    if 'this month' in query:
+        return month_start, None
+    if 'recent' in query or 'latest' in query:
+        return today - timedelta(days=7), None
+    return None, None
+
+
+def parse_query(query):
+    """Split a spoken file query into (search terms, allowed extensions or None, time range)."""
+    query = query.lower()
+    start, end = parse_time_filter(query)
+    for phrase in ('yesterday', 'today', 'last week', 'this week', 'last month', 'this month',
+                   'recently', 'recent', 'latest'):
+        query = query.replace(phrase, ' ')
+
+    terms = []
+    extensions = None
+    for word in tokenize(query):
+        if word in STOPWORDS:
+            continue
+        kind = _singular(word)
+        if kind in KIND_EXTENSIONS:
+            extensions = (extensions or set()) | KIND_EXTENSIONS[kind]
+        elif '.' + word in _ALL_EXTENSIONS:
+            extensions = (extensions or set()) | {'.' + word}
+        else:
+            terms.append(word)
+    return terms, extensions, (start, end)
+
+
+class FileIndex:
+    """
+    Tokenized inverted index over file_index.csv.
+
+    Rows are kept column-wise and postings are arrays of row numbers, so an
+    index of millions of files stays compact. Filename stems, extensions and
+    the nearest parent folder names each get their own postings; a query is
+    answered with set intersections, and only the surviving rows are scored.
+    """
+
+    def __init__(self, rows=()):
+        self.names = []
+        self.paths = []
+        self.extensions = []
+        # 'YYYY-mm-dd HH:MM:SS' strings sort chronologically, so they are kept as-is.
+        self.modified = []
+        self.name_postings = {}
+        self.folder_postings = {}
+        self.ext_postings = {}
+        self._folder_cache = {}
+        for row in rows:
+            self._add(*row)
+        self._finish()
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        with open(csv_path, 'r', newline='', encoding='utf-8') as f:
+            reader = csv.reader(f)
+            next(reader, None)
+            return cls(row for row in reader if len(row) == 4)
+
+    def _folder_tokens(self, full_path):
+        # Index paths may come from Windows, so split on both separators.
+        folder = full_path.replace('\\', '/').rpartition('/')[0]
+        tokens = self._folder_cache.get(folder)
+        if tokens is None:
+            tokens = set()
+            for part in folder.split('/')[-FOLDER_DEPTH:]:
+                tokens.update(tokenize(part))
+            tokens = self._folder_cache[folder] = tuple(tokens)
+        return tokens
+
+    def _add(self, name, full_path, extension, modified):
+        row = len(self.paths)
+        self.names.append(name)
+        self.paths.append(full_path)
+        self.extensions.append(extension)
+        self.modified.append(modified)
+        for token in set(tokenize(os.path.splitext(name)[0])):
+            postings = self.name_postings.get(token)
+            if postings is None:
+                postings = self.name_postings[token] = array('I')
+            postings.append(row)
+        for token in self._folder_tokens(full_path):
+            postings = self.folder_postings.get(token)
+            if postings is None:
+                postings = self.folder_postings[token] = array('I')
+            postings.append(row)
+        postings = self.ext_postings.get(extension)
+        if postings is None:
+            postings = self.ext_postings[extension] = array('I')
+        postings.append(row)
+
+    def _finish(self):
+        self._folder_cache = {}
+        self._name_tokens = sorted(self.name_postings)
+        self._folder_token_list = sorted(self.folder_postings)
+        self._newest = _day_number(max(self.modified, default=''))
+        self._oldest = _day_number(min(self.modified, default=''))
+
+    def __len__(self):
+        return len(self.paths)
+
+    def _expand(self, term, postings, tokens):
+        """Return [(posting array, weight factor)] for a term: the exact token and tokens it prefixes."""
+        matches = []
+        exact = postings.get(term)
+        if exact is not None:
+            matches.append((exact, 1.0))
+        if len(term) >= 3:
+            i = bisect.bisect_right(tokens, term)
+            while i < len(tokens) and tokens[i].startswith(term):
+                matches.append((postings[tokens[i]], PREFIX_FACTOR))
+                i += 1
+        return matches
+
+    def search(self, query, limit=5):
+        """Return up to `limit` FileMatch results for a spoken query, best first."""
+        terms, extensions, (start, end) = parse_query(query)
+        if not terms and extensions is None and start is None:
+            return []
+        total = len(self.paths) or 1
+
+        # Candidate rows: every term must match, in the name or in a parent folder.
+        weighted_terms = []
+        candidates = None
+        for term in terms:
+            name_matches = self._expand(term, self.name_postings, self._name_tokens)
+            folder_matches = self._expand(term, self.folder_postings, self._folder_token_list)
+            term_rows = set()
+            for rows, _ in name_matches + folder_matches:
+                term_rows.update(rows)
+            candidates = term_rows if candidates is None else candidates & term_rows
+            if not candidates:
+                return []
+            weighted_terms.append((name_matches, folder_matches))
+
+        if extensions is not None:
+            ext_rows = set()
+            for ext in extensions:
+                ext_rows.update(self.ext_postings.get(ext, ()))
+            candidates = ext_rows if candidates is None else candidates & ext_rows
+        elif candidates is None:
+            candidates = range(len(self.paths))
+
+        start_str = start.strftime('%Y-%m-%d %H:%M:%S') if start else None
+        end_str = end.strftime('%Y-%m-%d %H:%M:%S') if end else None
+        if start_str or end_str:
+            modified = self.modified
+            candidates = [row for row in candidates
+                          if (start_str is None or modified[row] >= start_str)
+                          and (end_str is None or modified[row] < end_str)]
+
+        # Score only the surviving rows.
+        scores = dict.fromkeys(candidates, 0.0)
+        for name_matches, folder_matches in weighted_terms:
+            for matches, weight in ((folder_matches, FOLDER_WEIGHT), (name_matches, NAME_WEIGHT)):
+                for rows, factor in matches:
+                    bonus = weight * factor * math.log(1 + total / len(rows))
+                    for row in rows:
+                        if row in scores:
+                            scores[row] += bonus
+
+        span = (self._newest - self._oldest) or 1
+        modified = self.modified
+
+        def final_score(row):
+            return scores[row] + RECENCY_WEIGHT * (_day_number(modified[row]) - self._oldest) / span
+
+        best = heapq.nlargest(limit, scores, key=final_score)
+        return [FileMatch(self.paths[row], self.names[row], self.extensions[row],
+                          _parse_modified(modified[row]), final_score(row))
+                for row in best]
+
+
+def _day_number(modified):
+    """Approximate day count for a 'YYYY-mm-dd ...' string; only used to order by recency."""
+    try:
+        return int(modified[0:4]) * 372 + int(modified[5:7]) * 31 + int(modified[8:10])
+    except ValueError:
+        return 0
+
+
+def _parse_modified(modified):
+    try:
+        return datetime.strptime(modified, '%Y-%m-%d %H:%M:%S')
+    except ValueError:
+        return None
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_file_index(csv_path=None):
+    """Return the process-wide FileIndex for csv_path, reloading it when the CSV changes."""
+    csv_path = csv_path or DEFAULT_INDEX_PATH
+    try:
+        stat = os.stat(csv_path)
+    except OSError:
+        print(f"[WARN] {csv_path} not found. Please run a file scan first.")
+        return FileIndex()
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _indexes_lock:
+        cached = _indexes.get(csv_path)
+        if cached is None or cached[0] != version:
+            cached = (version, FileIndex.from_csv(csv_path))
+            _indexes[csv_path] = cached
+        return cached[1]
+
+
+def file_index_version(csv_path=None):
+    """(mtime_ns, size) of the index CSV, which changes whenever a scan or the watcher rewrites it; None if missing."""
+    try:
+        stat = os.stat(csv_path or DEFAULT_INDEX_PATH)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def search_files(query, limit=5, csv_path=None):
+    """Search the file index for a spoken query; returns a list of FileMatch."""
+    try:
+        return get_file_index(csv_path).search(query, limit)
+    except Exception as e:
+        print(f"[ERROR] File search failed: {e}")
+        return []
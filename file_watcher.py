@@ -0,0 +1,343 @@
+"""
+Keeps the file index fresh from filesystem change events instead of
+periodic rescans: inotify on Linux, and an adaptive directory-mtime poll
+elsewhere (or when inotify is unavailable). Events are coalesced per
+directory, debounced, and applied to the index in batches.
+
+    python file_watcher.py CSV_PATH EXTENSIONS DIRECTORY...
+    python file_watcher.py ~/file_index.csv .pdf,.docx ~/Documents ~/Downloads
+"""
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import threading
+from file_scanner import scan_directories_incremental, update_directories, snapshot_directories
+
+# A batch is applied once no event has arrived for DEBOUNCE_SECONDS, or
+# MAX_BATCH_DELAY after its first event while changes keep coming.
+DEBOUNCE_SECONDS = 1.0
+MAX_BATCH_DELAY = 5.0
+# Polling: the shortest interval between polls, and the largest share of
+# wall time polls may take (a 50 ms poll waits at least 5 s at 1%).
+POLL_INTERVAL = 5.0
+POLL_MAX_DUTY = 0.01
+
+# inotify(7)
+IN_ATTRIB = 0x4
+IN_CLOSE_WRITE = 0x8
+IN_MOVED_FROM = 0x40
+IN_MOVED_TO = 0x80
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_IGNORED = 0x8000
+IN_ONLYDIR = 0x01000000
+IN_DONT_FOLLOW = 0x02000000
+IN_EXCL_UNLINK = 0x04000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = (IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+              | IN_MOVE_SELF | IN_ONLYDIR | IN_DONT_FOLLOW | IN_EXCL_UNLINK)
+EVENT_HEADER = struct.Struct("iIII")
+READ_SIZE = 64 * 1024
+
+# Backends report (directory, name, is_dir) tuples; name is None when only the
+# directory itself is known to have changed. OVERFLOW means events were lost.
+OVERFLOW = "overflow"
+
+
+class InotifyBackend:
+    """One inotify watch per directory (inotify is not recursive), through ctypes."""
+
+    def __init__(self):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wake_r, self._wake_w = os.pipe()
+        self._paths = {}  # watch descriptor -> directory
+        self._wds = {}    # directory -> watch descriptor
+
+    def sync(self, directories):
+        """Watch exactly directories; returns the ones that were not watched before."""
+        directories = set(directories)
+        for directory in [directory for directory in self._wds if directory not in directories]:
+            wd = self._wds.pop(directory)
+            self._paths.pop(wd, None)
+            self._libc.inotify_rm_watch(self._fd, wd)
+        added = []
+        for directory in directories.difference(self._wds):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+            if wd < 0:
+                error = ctypes.get_errno()
+                if error == errno.ENOSPC:
+                    raise OSError(error, "inotify watch limit reached (see fs.inotify.max_user_watches)")
+                continue  # gone or unreadable
+            self._wds[directory] = wd
+            self._paths[wd] = directory
+            added.append(directory)
+        return added
+
+    def wait(self, timeout=None):
+        """Block until events arrive (or timeout, or wake()) and return them."""
+        ready, _, _ = select.select([self._fd, self._wake_r], [], [], timeout)
+        if self._wake_r in ready:
+            os.read(self._wake_r, 64)
+        events = []
+        while self._fd in ready:
+            try:
+                data = os.read(self._fd, READ_SIZE)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset + EVENT_HEADER.size <= len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+                offset += EVENT_HEADER.size + length
+                if mask & IN_Q_OVERFLOW:
+                    events.append(OVERFLOW)
+                    continue
+                directory = self._paths.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    # The kernel dropped the watch (directory deleted or unmounted).
+                    del self._paths[wd]
+                    if self._wds.get(directory) == wd:
+                        del self._wds[directory]
+                elif mask & (IN_DELETE_SELF | IN_MOVE_SELF) or not name:
+                    events.append((directory, None, True))
+                else:
+                    events.append((directory, os.fsdecode(name), bool(mask & IN_ISDIR)))
+        return events
+
+    def wake(self):
+        os.write(self._wake_w, b"\0")
+
+    def close(self):
+        for fd in (self._fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+class PollingBackend:
+    """
+    Compares directory mtimes on an interval. The interval stretches with the
+    time a poll takes, so a large tree costs at most POLL_MAX_DUTY of a core.
+    Like the incremental scan, it misses files modified in place until their
+    directory changes.
+    """
+
+    def __init__(self, interval=POLL_INTERVAL, max_duty=POLL_MAX_DUTY):
+        self.interval = interval
+        self.max_duty = max_duty
+        self._mtimes = {}
+        self._wake = threading.Event()
+        self._next_poll = time.monotonic() + interval
+
+    def sync(self, directories):
+        directories = set(directories)
+        for directory in [directory for directory in self._mtimes if directory not in directories]:
+            del self._mtimes[directory]
+        added = directories.difference(self._mtimes)
+        for directory in added:
+            self._mtimes[directory] = _mtime(directory)
+        return list(added)
+
+    def wait(self, timeout=None):
+        delay = self._next_poll - time.monotonic()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        if delay > 0:
+            self._wake.wait(delay)
+            self._wake.clear()
+        if time.monotonic() < self._next_poll:
+            return []
+        started = time.perf_counter()
+        events = []
+        for directory, mtime in self._mtimes.items():
+            current = _mtime(directory)
+            if current != mtime:
+                self._mtimes[directory] = current
+                events.append((directory, None, True))
+        elapsed = time.perf_counter() - started
+        self._next_poll = time.monotonic() + max(self.interval, elapsed / self.max_duty)
+        return events
+
+    def wake(self):
+        self._wake.set()
+
+    def close(self):
+        self._wake.set()
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def default_backend():
+    """inotify on Linux, polling elsewhere or if inotify cannot be set up."""
+    if sys.platform.startswith("linux"):
+        try:
+            return InotifyBackend()
+        except (OSError, AttributeError) as e:
+            print(f"[WARN] inotify is unavailable ({e}); polling for file changes instead.")
+    return PollingBackend()
+
+
+class FileWatcher:
+    """
+    Keeps the index CSV (and the catalog, if given) in step with changes under
+    directories, on a background thread. Change events are collected per
+    directory and applied with file_scanner.update_directories once they have
+    been quiet for debounce seconds, or max_delay after the first one during a
+    steady stream. Events for files with other extensions are ignored, and
+    lost events (a queue overflow) fall back to an incremental rescan.
+
+    Expects the snapshot of a previous incremental scan of the same CSV; any
+    directory that changed since the snapshot was written is caught up first.
+    """
+
+    def __init__(self, directories, extensions, csv_path, catalog=None, backend=None, on_update=None,
+                 debounce=DEBOUNCE_SECONDS, max_delay=MAX_BATCH_DELAY):
+        self.directories = [os.path.normpath(directory) for directory in directories]
+        self.extensions = {ext.lower() for ext in extensions}
+        self.csv_path = csv_path
+        self.catalog = catalog
+        self.backend = backend
+        self.on_update = on_update
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.events = 0
+        self.batches = 0
+        self.last_delta = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="file-watcher", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self.backend is not None:
+            self.backend.wake()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def _within_roots(self, path):
+        return any(path == root or path.startswith(root + os.sep) for root in self.directories)
+
+    def _subscribe(self):
+        """(Re)sync the watches with the snapshot; returns the newly watched directories changed since it."""
+        snapshot = snapshot_directories(self.csv_path, self.extensions)
+        directories = {directory for directory in snapshot if self._within_roots(directory)}
+        directories.update(root for root in self.directories if os.path.isdir(root))
+        try:
+            added = self.backend.sync(directories)
+        except OSError as e:
+            print(f"[WARN] {e}; polling for file changes instead.")
+            self.backend.close()
+            self.backend = PollingBackend()
+            added = self.backend.sync(directories)
+        return {directory for directory in added if _mtime(directory) != snapshot.get(directory)}
+
+    def _apply(self, directories, rescan):
+        started = time.monotonic()
+        delta = None
+        try:
+            if not rescan:
+                delta = update_directories(directories, self.extensions, self.csv_path, catalog=self.catalog)
+            if delta is None:
+                delta = scan_directories_incremental(self.directories, self.extensions, self.csv_path,
+                                                     catalog=self.catalog)
+        except Exception as e:
+            print(f"[ERROR] Failed to update the file index: {e}")
+            return
+        self.batches += 1
+        self.last_delta = delta
+        if delta.added or delta.removed or delta.modified:
+            print(f"[DEBUG] File index updated in {time.monotonic() - started:.2f}s from "
+                  f"{'a rescan' if rescan else f'{len(directories)} changed folders'}: {len(delta.added)} added, "
+                  f"{len(delta.removed)} removed, {len(delta.modified)} modified")
+            if self.on_update is not None:
+                self.on_update(delta)
+
+    def run(self):
+        if self.backend is None:
+            self.backend = default_backend()
+        pending = self._subscribe()
+        rescan = False
+        resubscribe = False
+        first = last = time.monotonic() if pending else None
+        try:
+            while not self._stop.is_set():
+                timeout = None
+                if first is not None:
+                    timeout = max(0.0, min(last + self.debounce, first + self.max_delay) - time.monotonic())
+                events = self.backend.wait(timeout)
+                now = time.monotonic()
+                for event in events:
+                    if event == OVERFLOW:
+                        rescan = resubscribe = True
+                    else:
+                        directory, name, is_dir = event
+                        if not (is_dir or name is None or os.path.splitext(name)[1].lower() in self.extensions):
+                            continue
+                        pending.add(directory)
+                        # Folders may have come or gone: the watched set needs refreshing after the batch.
+                        resubscribe = resubscribe or is_dir
+                    self.events += 1
+                    first = first or now
+                    last = now
+                if first is None or now < min(last + self.debounce, first + self.max_delay):
+                    continue
+                if self._stop.is_set():
+                    break
+                self._apply(pending, rescan)
+                pending, rescan = set(), False
+                first = last = None
+                if resubscribe:
+                    resubscribe = False
+                    pending = self._subscribe()
+                    if pending:
+                        first = last = time.monotonic()
+        finally:
+            self.backend.close()
+
+    def status(self):
+        return (f"Watching for file changes: {self.events} changes seen, "
+                f"{self.batches} index updates applied.")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 4:
+        print("usage: python file_watcher.py CSV_PATH EXTENSIONS DIRECTORY...")
+        sys.exit(2)
+    csv_path = os.path.expanduser(sys.argv[1])
+    extensions = {ext if ext.startswith('.') else '.' + ext for ext in sys.argv[2].split(',') if ext}
+    directories = [os.path.expanduser(directory) for directory in sys.argv[3:]]
+    delta = scan_directories_incremental(directories, extensions, csv_path)
+    print(f"Indexed {delta.total} files in {csv_path}; watching for changes (Ctrl+C to stop).")
+    try:
+        FileWatcher(directories, extensions, csv_path).run()
+    except KeyboardInterrupt:
+        pass
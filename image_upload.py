@@ -0,0 +1,75 @@
+import io
+import os
+import hashlib
+import mimetypes
+from collections import namedtuple
+
+try:
+    from PIL import Image  # optional: without Pillow images are uploaded as they are
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tif', '.tiff'}
+# Images larger than this (bytes or pixels on the long side) are downscaled before upload.
+MAX_UPLOAD_BYTES = 1024 * 1024
+MAX_DIMENSION = 2000
+JPEG_QUALITY = 85
+
+# digest is the SHA-256 of the original file, so it is stable whatever is uploaded.
+PreparedImage = namedtuple("PreparedImage", ["digest", "filename", "data", "mimetype", "original_size"])
+
+
+def is_image(path):
+    return os.path.splitext(path)[1].lower() in IMAGE_EXTENSIONS
+
+
+def list_images(folder):
+    """Image files directly inside folder, sorted by name."""
+    try:
+        entries = sorted(os.scandir(folder), key=lambda entry: entry.name.lower())
+    except OSError:
+        return []
+    return [entry.path for entry in entries if entry.is_file() and is_image(entry.name)]
+
+
+def _downscale(data, filename):
+    """Re-encode an oversized image at most MAX_DIMENSION on the long side; None if that does not help."""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            if max(image.size) <= MAX_DIMENSION and len(data) <= MAX_UPLOAD_BYTES:
+                return None
+            image.thumbnail((MAX_DIMENSION, MAX_DIMENSION))
+            # PNG keeps screenshots and scanned text crisp; everything else goes to JPEG.
+            if image.format == "PNG" or image.mode in ("RGBA", "LA") or "transparency" in image.info:
+                fmt, mimetype, ext = "PNG", "image/png", ".png"
+                options = {"optimize": True}
+            else:
+                fmt, mimetype, ext = "JPEG", "image/jpeg", ".jpg"
+                options = {"quality": JPEG_QUALITY, "optimize": True}
+                if image.mode not in ("RGB", "L"):
+                    image = image.convert("RGB")
+            out = io.BytesIO()
+            image.save(out, fmt, **options)
+    except Exception as e:
+        print(f"[WARN] Could not downscale {filename}: {e}")
+        return None
+    if out.tell() >= len(data):
+        return None
+    return out.getvalue(), os.path.splitext(filename)[0] + ext, mimetype
+
+
+def prepare_image(path):
+    """Read an image for upload: hash the original and, with Pillow, shrink it if it is oversized."""
+    with open(path, "rb") as f:
+        data = f.read()
+    filename = os.path.basename(path)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    digest = hashlib.sha256(data).hexdigest()
+    original_size = len(data)
+    # Small files are not worth decoding just to check their dimensions.
+    if Image is not None and len(data) > MAX_UPLOAD_BYTES // 4:
+        smaller = _downscale(data, filename)
+        if smaller is not None:
+            data, filename, mimetype = smaller
+            print(f"[DEBUG] Downscaled {os.path.basename(path)}: {original_size} -> {len(data)} bytes")
+    return PreparedImage(digest, filename, data, mimetype, original_size)
@@ -0,0 +1,155 @@
+import re
+import time
+import threading
+from collections import deque
+from tracing import span
+
+
+class Intent:
+    """A command handler plus the phrases, prefixes or regex patterns that trigger it."""
+
+    def __init__(self, name, handler, phrases=(), prefixes=(), patterns=(), fallback=False):
+        self.name = name
+        self.handler = handler
+        self.phrases = tuple(phrases)
+        self.prefixes = tuple(prefixes)
+        self.patterns = tuple(re.compile(p) if isinstance(p, str) else p for p in patterns)
+        # Fallback intents run only after every triggered intent has declined;
+        # one without any trigger runs for every such query.
+        self.fallback = fallback
+
+
+class _PhraseMatcher:
+    """Aho-Corasick automaton: finds every registered phrase in a query in one pass."""
+
+    def __init__(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]  # state -> [(phrase length, key)]
+
+    def add(self, phrase, key):
+        state = 0
+        for char in phrase:
+            next_state = self.goto[state].get(char)
+            if next_state is None:
+                next_state = len(self.goto)
+                self.goto.append({})
+                self.fail.append(0)
+                self.output.append([])
+                self.goto[state][char] = next_state
+            state = next_state
+        self.output[state].append((len(phrase), key))
+
+    def build(self):
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self.goto[state].items():
+                queue.append(next_state)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[next_state] = self.goto[fallback].get(char, 0) if state else 0
+                self.output[next_state] = self.output[next_state] + self.output[self.fail[next_state]]
+
+    def scan(self, text):
+        """Yield (start index, key) for every phrase occurrence in text."""
+        state = 0
+        for i, char in enumerate(text):
+            while state and char not in self.goto[state]:
+                state = self.fail[state]
+            state = self.goto[state].get(char, 0)
+            for length, key in self.output[state]:
+                yield i - length + 1, key
+
+
+class IntentRouter:
+    """
+    Declarative command dispatcher.
+
+    Intents are tried in registration order, but only those whose triggers
+    occur in the query; all phrase and prefix triggers are compiled into one
+    automaton, so picking candidates is a single pass over the query however
+    many intents there are. Per-intent statistics are kept for every dispatch.
+    """
+
+    def __init__(self):
+        self.intents = []
+        self._matcher = None
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, handler, phrases=(), prefixes=(), patterns=(), fallback=False):
+        intent = Intent(name, handler, phrases, prefixes, patterns, fallback)
+        self.intents.append(intent)
+        self._stats[name] = {"matched": 0, "handled": 0, "declined": 0, "errors": 0, "total_time": 0.0}
+        self._matcher = None
+        return intent
+
+    def intent(self, name, **triggers):
+        """Decorator form of register()."""
+        def decorator(handler):
+            self.register(name, handler, **triggers)
+            return handler
+        return decorator
+
+    def compile(self):
+        matcher = _PhraseMatcher()
+        for order, intent in enumerate(self.intents):
+            for phrase in intent.phrases:
+                matcher.add(phrase, (order, False))
+            for prefix in intent.prefixes:
+                matcher.add(prefix, (order, True))
+        matcher.build()
+        self._matcher = matcher
+        return self
+
+    def match(self, query):
+        """Return the intents triggered by query, in dispatch order."""
+        if self._matcher is None:
+            self.compile()
+        triggered = set()
+        for start, (order, is_prefix) in self._matcher.scan(query):
+            if not is_prefix or start == 0:
+                triggered.add(order)
+        for order, intent in enumerate(self.intents):
+            if order not in triggered and any(p.search(query) for p in intent.patterns):
+                triggered.add(order)
+        primary = [self.intents[i] for i in sorted(triggered) if not self.intents[i].fallback]
+        fallbacks = [intent for order, intent in enumerate(self.intents) if intent.fallback and (
+            order in triggered or not (intent.phrases or intent.prefixes or intent.patterns))]
+        return primary + fallbacks
+
+    def dispatch(self, query):
+        """Run triggered handlers until one returns True; returns its intent name, or None."""
+        for intent in self.match(query):
+            started = time.perf_counter()
+            outcome = "declined"
+            try:
+                with span("handler", intent=intent.name):
+                    if intent.handler(query):
+                        outcome = "handled"
+            except SystemExit:
+                outcome = "handled"
+                raise
+            except Exception as e:
+                outcome = "errors"
+                print(f"[ERROR] Intent '{intent.name}' failed: {e}")
+            finally:
+                self._record(intent.name, outcome, time.perf_counter() - started)
+            if outcome == "handled":
+                return intent.name
+        return None
+
+    def _record(self, name, outcome, elapsed):
+        with self._lock:
+            stats = self._stats[name]
+            stats["matched"] += 1
+            stats[outcome] += 1
+            stats["total_time"] += elapsed
+
+    def stats(self):
+        """Per-intent counts (matched/handled/declined/errors) and time spent in the handler."""
+        with self._lock:
+            return {name: dict(stats, mean_time=stats["total_time"] / stats["matched"] if stats["matched"] else 0.0)
+                    for name, stats in self._stats.items()}
@@ -0,0 +1,214 @@
+"""
+Background jobs for slow commands (file scans, n8n calls, OCR batches), so
+the listener can take the next command while they run. Each job gets an ID
+the user can ask about ("job status", "cancel job 2"), and its outcome is
+announced when it finishes.
+"""
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+from tracing import span
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+# Worker threads, and how many of them bulk jobs may hold at once: the rest
+# stay free, so an interactive job never waits behind a long scan.
+DEFAULT_WORKERS = 3
+DEFAULT_BULK_WORKERS = 1
+# Finished jobs remembered for status queries.
+HISTORY_SIZE = 20
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+
+
+class Job:
+    """
+    A unit of background work. fn is called with the Job, so long-running
+    work can watch job.cancel_event; on_cancel is called as well when the job
+    is cancelled, and progress() may describe how far along it is.
+    """
+
+    def __init__(self, job_id, name, fn, kind=INTERACTIVE, announce=None, error_message=None, on_cancel=None,
+                 progress=None):
+        self.id = job_id
+        self.name = name
+        self.fn = fn
+        self.kind = kind
+        self.announce = announce
+        self.error_message = error_message
+        self.on_cancel = on_cancel
+        self.progress = progress
+        self.state = QUEUED
+        self.result = None
+        self.error = None
+        self.submitted_at = time.monotonic()
+        self.started_at = None
+        self.finished_at = None
+        self.cancel_event = threading.Event()
+        self._finished = threading.Event()
+        # Runs in the submitter's context, so tracing spans (and anything else
+        # kept in context variables) follow the command that started it.
+        self.context = contextvars.copy_context()
+
+    @property
+    def done(self):
+        return self._finished.is_set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the job to finish; returns True if it has."""
+        return self._finished.wait(timeout)
+
+    def status(self):
+        """Short human-readable description of the job's state."""
+        prefix = f"Job {self.id}, {self.name},"
+        if self.state == QUEUED:
+            return f"{prefix} is waiting to start."
+        if self.state == RUNNING:
+            detail = ""
+            if self.progress is not None:
+                try:
+                    detail = " " + self.progress()
+                except Exception:
+                    pass
+            return f"{prefix} has been running for {int(time.monotonic() - self.started_at)} seconds.{detail}"
+        return {DONE: f"{prefix} is done.", FAILED: f"{prefix} failed.",
+                CANCELLED: f"{prefix} was cancelled."}[self.state]
+
+
+class JobScheduler:
+    """
+    Bounded pool of worker threads fed by two queues. Interactive jobs (the
+    user is waiting for the answer) always start first; bulk jobs take at
+    most bulk_workers threads. Workers start on the first submit.
+
+    announce(text) is called when a job finishes: with the job's announce
+    text (or announce(result) if it is callable), or its error_message if it
+    failed. Jobs that speak their own results leave announce unset.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, bulk_workers=DEFAULT_BULK_WORKERS, announce=None):
+        self.workers = max(1, workers)
+        self.bulk_workers = max(1, min(bulk_workers, self.workers - 1))
+        self.announce = announce
+        self._queues = {INTERACTIVE: deque(), BULK: deque()}
+        self._jobs = {}
+        self._history = deque()
+        self._ids = itertools.count(1)
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running_bulk = 0
+        self._unfinished = 0
+
+    def submit(self, name, fn, kind=INTERACTIVE, announce=None, error_message=None, on_cancel=None, progress=None):
+        """Queue fn(job) to run in the background and return its Job."""
+        if kind not in self._queues:
+            raise ValueError(f"unknown job kind: {kind}")
+        with self._cond:
+            job = Job(next(self._ids), name, fn, kind, announce, error_message, on_cancel, progress)
+            self._jobs[job.id] = job
+            self._queues[kind].append(job)
+            self._unfinished += 1
+            if not self._threads:
+                for i in range(self.workers):
+                    thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+                    thread.start()
+                    self._threads.append(thread)
+            self._cond.notify()
+        print(f"[DEBUG] Job {job.id} queued ({kind}): {name}")
+        return job
+
+    def _next_job(self):
+        if self._queues[INTERACTIVE]:
+            return self._queues[INTERACTIVE].popleft()
+        if self._queues[BULK] and self._running_bulk < self.bulk_workers:
+            self._running_bulk += 1
+            return self._queues[BULK].popleft()
+        return None
+
+    def _work(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                job.state = RUNNING
+                job.started_at = time.monotonic()
+            job.context.run(self._run, job)
+            with self._cond:
+                if job.kind == BULK:
+                    self._running_bulk -= 1
+                self._finish(job)
+                self._cond.notify_all()
+
+    def _run(self, job):
+        try:
+            with span("job", job=job.name, kind=job.kind):
+                if not job.cancelled:
+                    job.result = job.fn(job)
+            job.state = CANCELLED if job.cancelled else DONE
+        except Exception as e:
+            print(f"[ERROR] Job {job.id} ({job.name}) failed: {e}")
+            job.error = e
+            job.state = FAILED
+        job.finished_at = time.monotonic()
+        message = None
+        if job.state == DONE and job.announce is not None:
+            message = job.announce(job.result) if callable(job.announce) else job.announce
+        elif job.state == FAILED:
+            message = job.error_message or f"Sorry, {job.name} failed."
+        if message and self.announce is not None:
+            self.announce(message)
+
+    def _finish(self, job):
+        """Mark job finished and keep it in the bounded history; call with the lock held."""
+        job._finished.set()
+        self._unfinished -= 1
+        self._history.append(job.id)
+        while len(self._history) > HISTORY_SIZE:
+            self._jobs.pop(self._history.popleft(), None)
+
+    def get(self, job_id):
+        with self._cond:
+            return self._jobs.get(job_id)
+
+    def active_jobs(self):
+        """Queued and running jobs, oldest first."""
+        with self._cond:
+            return [job for job in sorted(self._jobs.values(), key=lambda job: job.id) if not job.done]
+
+    def recent_jobs(self):
+        """Finished jobs still remembered, oldest first."""
+        with self._cond:
+            return [self._jobs[job_id] for job_id in self._history if job_id in self._jobs]
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns the Job, or None if there is no such unfinished job."""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if job is None or job.done:
+                return None
+            job.cancel_event.set()
+            try:
+                self._queues[job.kind].remove(job)
+            except ValueError:
+                pass  # already running: it stops at its next cancellation check
+            else:
+                job.state = CANCELLED
+                job.finished_at = time.monotonic()
+                self._finish(job)
+                self._cond.notify_all()
+        if job.on_cancel is not None:
+            job.on_cancel()
+        return job
+
+    def wait_idle(self, timeout=None):
+        """Wait until no job is queued or running; returns True if that happened within timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: self._unfinished == 0, timeout)
@@ -0,0 +1,297 @@
+"""
+Reads Windows shortcut (.lnk) files directly, following the Shell Link binary
+format ([MS-SHLLINK]), so resolving a shortcut needs neither COM nor Windows.
+"""
+import os
+import json
+import struct
+import ntpath
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+HEADER_SIZE = 0x4C
+LINK_CLSID = bytes.fromhex("0114020000000000c000000000000046")
+
+# LinkFlags
+HAS_TARGET_ID_LIST = 0x1
+HAS_LINK_INFO = 0x2
+HAS_NAME = 0x4
+HAS_RELATIVE_PATH = 0x8
+HAS_WORKING_DIR = 0x10
+HAS_ARGUMENTS = 0x20
+HAS_ICON_LOCATION = 0x40
+IS_UNICODE = 0x80
+
+# LinkInfoFlags
+VOLUME_ID_AND_LOCAL_BASE_PATH = 0x1
+COMMON_NETWORK_RELATIVE_LINK = 0x2
+
+# ExtraData block signatures
+ENVIRONMENT_BLOCK = 0xA0000001
+PROPERTY_STORE_BLOCK = 0xA0000009
+
+# Serialized property storage: version tag, and PKEY_AppUserModel_ID (format ID, property ID).
+SPS_VERSION = 0x53505331
+APP_USER_MODEL_FMTID = bytes.fromhex("55284c9f799f394ba8d0e1d42de1d5f3")
+APP_USER_MODEL_ID_PID = 5
+VT_LPWSTR = 0x1F
+
+ANSI_CODEPAGE = "mbcs" if os.name == "nt" else "cp1252"
+DEFAULT_WORKERS = min(8, (os.cpu_count() or 1) * 2)
+CACHE_VERSION = 1
+
+ShellLink = namedtuple("ShellLink", ["target", "arguments", "working_dir", "icon_location", "description",
+                                     "relative_path", "app_id"])
+
+
+class LnkParseError(ValueError):
+    """Raised for data that is not a well-formed shell link."""
+
+
+def _u16(data, offset):
+    return struct.unpack_from("<H", data, offset)[0]
+
+
+def _u32(data, offset):
+    return struct.unpack_from("<I", data, offset)[0]
+
+
+def _c_string(data, offset):
+    end = data.find(b"\0", offset)
+    return data[offset:end if end != -1 else len(data)].decode(ANSI_CODEPAGE, "replace")
+
+
+def _w_string(data, offset):
+    end = offset
+    while end + 1 < len(data) and data[end:end + 2] != b"\0\0":
+        end += 2
+    return data[offset:end].decode("utf-16-le", "replace")
+
+
+def _parse_id_list(data):
+    """Best-effort path from the target ID list: a drive item followed by file entry items."""
+    parts = []
+    offset = 0
+    while offset + 2 <= len(data):
+        size = _u16(data, offset)
+        if size < 2:
+            break
+        item = data[offset:offset + size]
+        offset += size
+        if len(item) < 3:
+            continue
+        kind = item[2] & 0x70
+        if kind == 0x20:  # volume, e.g. "C:\"
+            parts = [_c_string(item, 3).rstrip("\\") + "\\"]
+        elif kind == 0x30 and len(item) > 14:  # file entry: 8.3 name, long name in a 0xBEEF0004 extension
+            name = _c_string(item, 14)
+            ext = item.find(b"\x04\x00\xef\xbe")
+            if ext >= 4:
+                start = ext - 4
+                name_offset = _u16(item, start + 16)
+                if start + name_offset < len(item):
+                    name = _w_string(item, start + name_offset) or name
+            parts.append(name)
+    if not parts:
+        return ""
+    return ntpath.join(*parts)
+
+
+def _parse_link_info(data):
+    if len(data) < 0x1C:
+        raise LnkParseError("truncated LinkInfo")
+    header_size = _u32(data, 4)
+    flags = _u32(data, 8)
+    local_base_offset = _u32(data, 16)
+    network_offset = _u32(data, 20)
+    suffix_offset = _u32(data, 24)
+    unicode = header_size >= 0x24
+    suffix = ""
+    if unicode and _u32(data, 32):
+        suffix = _w_string(data, _u32(data, 32))
+    elif suffix_offset:
+        suffix = _c_string(data, suffix_offset)
+
+    if flags & VOLUME_ID_AND_LOCAL_BASE_PATH:
+        if unicode and _u32(data, 28):
+            base = _w_string(data, _u32(data, 28))
+        else:
+            base = _c_string(data, local_base_offset)
+        return base + suffix
+    if flags & COMMON_NETWORK_RELATIVE_LINK and network_offset:
+        net_name_offset = _u32(data, network_offset + 8)
+        if net_name_offset > 0x14:
+            net_name = _w_string(data, network_offset + _u32(data, network_offset + 20))
+        else:
+            net_name = _c_string(data, network_offset + net_name_offset)
+        return ntpath.join(net_name, suffix) if suffix else net_name
+    return ""
+
+
+def _parse_property_store(data):
+    """Return the AppUserModelID from a serialized property store, if present."""
+    offset = 0
+    while offset + 24 <= len(data):
+        storage_size = _u32(data, offset)
+        if storage_size == 0:
+            break
+        storage = data[offset:offset + storage_size]
+        offset += storage_size
+        if len(storage) < 24 or _u32(storage, 4) != SPS_VERSION:
+            continue
+        if storage[8:24] != APP_USER_MODEL_FMTID:
+            continue
+        pos = 24
+        while pos + 13 <= len(storage):
+            value_size = _u32(storage, pos)
+            if value_size == 0:
+                break
+            if _u32(storage, pos + 4) == APP_USER_MODEL_ID_PID and _u16(storage, pos + 9) == VT_LPWSTR:
+                length = _u32(storage, pos + 13)
+                return storage[pos + 17:pos + 17 + 2 * length].decode("utf-16-le", "replace").rstrip("\0")
+            pos += value_size
+    return ""
+
+
+def parse_lnk(data):
+    """Parse the bytes of a .lnk file into a ShellLink; raises LnkParseError if they are not one."""
+    if len(data) < HEADER_SIZE or _u32(data, 0) != HEADER_SIZE or data[4:20] != LINK_CLSID:
+        raise LnkParseError("not a shell link")
+    try:
+        flags = _u32(data, 20)
+        offset = HEADER_SIZE
+        id_list_target = ""
+        if flags & HAS_TARGET_ID_LIST:
+            size = _u16(data, offset)
+            id_list_target = _parse_id_list(data[offset + 2:offset + 2 + size])
+            offset += 2 + size
+        link_info_target = ""
+        if flags & HAS_LINK_INFO:
+            size = _u32(data, offset)
+            link_info_target = _parse_link_info(data[offset:offset + size])
+            offset += size
+
+        strings = {}
+        for flag in (HAS_NAME, HAS_RELATIVE_PATH, HAS_WORKING_DIR, HAS_ARGUMENTS, HAS_ICON_LOCATION):
+            if flags & flag:
+                count = _u16(data, offset)
+                offset += 2
+                if flags & IS_UNICODE:
+                    strings[flag] = data[offset:offset + 2 * count].decode("utf-16-le", "replace")
+                    offset += 2 * count
+                else:
+                    strings[flag] = data[offset:offset + count].decode(ANSI_CODEPAGE, "replace")
+                    offset += count
+
+        env_target = ""
+        app_id = ""
+        while offset + 8 <= len(data):
+            size = _u32(data, offset)
+            if size < 8:
+                break
+            signature = _u32(data, offset + 4)
+            block = data[offset:offset + size]
+            if signature == ENVIRONMENT_BLOCK and len(block) >= 788:
+                env_target = _w_string(block, 268) or _c_string(block[:268], 8)
+            elif signature == PROPERTY_STORE_BLOCK:
+                app_id = app_id or _parse_property_store(block[8:])
+            offset += size
+    except struct.error as e:
+        raise LnkParseError(f"truncated shell link: {e}") from None
+
+    target = link_info_target or (ntpath.expandvars(env_target) if env_target else "") or id_list_target
+    return ShellLink(target, strings.get(HAS_ARGUMENTS, ""), strings.get(HAS_WORKING_DIR, ""),
+                     strings.get(HAS_ICON_LOCATION, ""), strings.get(HAS_NAME, ""),
+                     strings.get(HAS_RELATIVE_PATH, ""), app_id)
+
+
+def read_lnk(path):
+    with open(path, "rb") as f:
+        return parse_lnk(f.read())
+
+
+class ShortcutCache:
+    """
+    Parsed shortcuts keyed by path, valid while the file's mtime and size are
+    unchanged; optionally persisted as JSON so rescans skip unchanged files.
+    """
+
+    def __init__(self, persist_path=None):
+        self.persist_path = persist_path
+        self._entries = {}  # path -> [mtime_ns, size, ShellLink fields or None]
+        self._lock = threading.Lock()
+        self._dirty = False
+        if persist_path:
+            self._load()
+
+    def get(self, path, stat):
+        with self._lock:
+            entry = self._entries.get(path)
+        if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+            return False, None
+        return True, ShellLink(*entry[2]) if entry[2] is not None else None
+
+    def put(self, path, stat, link):
+        with self._lock:
+            self._entries[path] = [stat.st_mtime_ns, stat.st_size, list(link) if link is not None else None]
+            self._dirty = True
+
+    def prune(self, keep):
+        """Forget shortcuts that are no longer among the paths in keep."""
+        keep = set(keep)
+        with self._lock:
+            for path in [path for path in self._entries if path not in keep]:
+                del self._entries[path]
+                self._dirty = True
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        if stored.get("version") == CACHE_VERSION:
+            self._entries = stored.get("entries", {})
+
+    def save(self):
+        if not self.persist_path or not self._dirty:
+            return
+        tmp_path = self.persist_path + ".tmp"
+        with self._lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump({"version": CACHE_VERSION, "entries": self._entries}, f)
+                os.replace(tmp_path, self.persist_path)
+                self._dirty = False
+            except OSError as e:
+                print(f"[WARN] Failed to save shortcut cache to {self.persist_path}: {e}")
+
+
+def resolve_shortcut(path, cache=None):
+    """Return the ShellLink for path (from the cache when the file is unchanged), or None if unreadable."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if cache is not None:
+        hit, link = cache.get(path, stat)
+        if hit:
+            return link
+    try:
+        link = read_lnk(path)
+    except (OSError, LnkParseError) as e:
+        print(f"[WARN] Could not parse shortcut {path}: {e}")
+        link = None
+    if cache is not None:
+        cache.put(path, stat, link)
+    return link
+
+
+def resolve_shortcuts(paths, cache=None, workers=DEFAULT_WORKERS):
+    """Resolve many shortcuts on a thread pool; returns {path: ShellLink or None}."""
+    paths = list(paths)
+    if workers <= 1 or len(paths) < 2:
+        return {path: resolve_shortcut(path, cache) for path in paths}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="lnk") as executor:
+        return dict(zip(paths, executor.map(lambda path: resolve_shortcut(path, cache), paths)))
@@ -1,21 +1,56 @@
 import sys
-from speech import say
-from command_handler import handle_command as process_command
-from wake_listener import listen_for_wake_word
+import argparse
+from startup import StartupProfiler, start_warm_up, warm_up
 
-if __name__ == "__main__":
+# Longest the startup file scan may delay the greeting and the wake listener.
+STARTUP_BUDGET_SECONDS = 2.0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="JARVIS voice assistant.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Report import and initialization time per module, then exit")
+    parser.add_argument("--profile-output", help="With --profile-startup, also save the profile as JSON here")
+    args = parser.parse_args(argv)
+
+    profiler = StartupProfiler()
+    if args.profile_startup:
+        profiler.install()
+    # Heavy dependencies (speech_recognition, psutil, requests, Pillow) are not
+    # imported here; they load on first use or in the warm-up below.
+    with profiler.phase("imports"):
+        from speech import say, wait_for_speech
+        from command_handler import start_background_file_scan
+        from wake_listener import listen_for_wake_word
+
+    scan_job = None
     try:
-        from command_handler import initialize_file_scan
+        # Trigger file scan on startup, in the background so the listener is live right away
+        with profiler.phase("startup file scan"):
+            scan_job = start_background_file_scan()
+            scan_job.wait(STARTUP_BUDGET_SECONDS)
 
-        # Trigger file scan on startup
-        initialize_file_scan()
+        if args.profile_startup:
+            # Time what the background warm-up would load, task by task, instead of listening.
+            warm_up(profiler=profiler)
+            scan_job.cancel()
+            profiler.uninstall()
+            profiler.report()
+            if args.profile_output:
+                profiler.save(args.profile_output)
+            return 0
 
         say("Hello, I am JARVIS A.I.")
-        listen_for_wake_word()
+        listen_for_wake_word(on_ready=start_warm_up)
     except KeyboardInterrupt:
         print("\nInterrupted by user")
+        if scan_job is not None:
+            scan_job.cancel()
         say("Goodbye")
-        sys.exit(0)
+        wait_for_speech()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
         
         
 '''
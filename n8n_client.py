@@ -0,0 +1,284 @@
+import json
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+import requests
+from requests.adapters import HTTPAdapter
+from tracing import span, bind
+
+# (connect, read) timeouts in seconds for workflows without their own entry.
+DEFAULT_TIMEOUT = (3.05, 30)
+# Attempts per call (1 = no retry) and the base of the exponential backoff between them.
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF = 0.5
+# HTTP statuses that are worth retrying; anything else fails straight away.
+RETRY_STATUSES = {502, 503, 504}
+# Consecutive failures that open the circuit, and how long it stays open.
+FAILURE_THRESHOLD = 3
+RESET_TIMEOUT = 30.0
+# Keep-alive connections per host, and calls that may be in flight at once.
+POOL_SIZE = 8
+MAX_CONCURRENT_CALLS = 4
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling n8n while its circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast after repeated failures against one n8n host.
+
+    After FAILURE_THRESHOLD consecutive failures the circuit opens and calls
+    are rejected for reset_timeout seconds; then a single trial call is let
+    through, and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_timeout=RESET_TIMEOUT):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self.opened_at is None:
+            return "closed"
+        if time.monotonic() - self.opened_at >= self.reset_timeout:
+            return "half-open"
+        return "open"
+
+    def before_call(self):
+        """Raise CircuitOpenError if the call may not go ahead; returns True if it is the half-open trial."""
+        with self._lock:
+            state = self._state()
+            if state == "open" or (state == "half-open" and self._trial_running):
+                raise CircuitOpenError("n8n is unavailable; not calling it until the circuit resets")
+            if state == "half-open":
+                self._trial_running = True
+                return True
+            return False
+
+    def end_trial(self):
+        """Let another trial through if the current one ended without recording an outcome."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+class RateLimiter:
+    """Spaces calls at least 1/rate seconds apart across threads; acquire() blocks until a slot is free."""
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class N8nClient:
+    """
+    HTTP client for n8n webhooks: one pooled keep-alive session, per-workflow
+    timeouts, bounded retries with exponential backoff, and a circuit breaker
+    per host. submit() runs calls on a thread pool so several can be in flight.
+    """
+
+    def __init__(self, timeouts=None, default_timeout=DEFAULT_TIMEOUT, max_attempts=DEFAULT_MAX_ATTEMPTS,
+                 backoff=DEFAULT_BACKOFF, pool_size=POOL_SIZE, max_workers=MAX_CONCURRENT_CALLS):
+        self.timeouts = dict(timeouts or {})
+        self.default_timeout = default_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.backoff = backoff
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._breakers = {}
+        self._breakers_lock = threading.Lock()
+        self._max_workers = max_workers
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    def breaker_for(self, url):
+        host = urlsplit(url).netloc
+        with self._breakers_lock:
+            breaker = self._breakers.get(host)
+            if breaker is None:
+                breaker = self._breakers[host] = CircuitBreaker()
+            return breaker
+
+    def timeout_for(self, url):
+        return self.timeouts.get(url, self.default_timeout)
+
+    def post(self, url, data=None, files=None, stream=False):
+        """
+        POST to a workflow and return the response, retrying transient failures.
+        Raises CircuitOpenError while the host's circuit is open, otherwise the
+        last requests exception once attempts are used up.
+        """
+        with span("n8n", workflow=urlsplit(url).path.rsplit("/", 1)[-1], stream=stream) as s:
+            response = self._post(url, data, files, stream)
+            s.set(status=response.status_code)
+            return response
+
+    def _post(self, url, data, files, stream):
+        breaker = self.breaker_for(url)
+        trial = breaker.before_call()
+        try:
+            return self._attempt(url, data, files, stream, breaker)
+        finally:
+            if trial:
+                # E.g. rewinding the upload failed: the circuit must not stay stuck half-open.
+                breaker.end_trial()
+
+    def _attempt(self, url, data, files, stream, breaker):
+        for attempt in range(1, self.max_attempts + 1):
+            _rewind(files)
+            try:
+                response = self.session.post(url, json=data if not files else None, files=files,
+                                             timeout=self.timeout_for(url), stream=stream)
+                if response.status_code in RETRY_STATUSES and attempt < self.max_attempts:
+                    response.close()
+                    raise requests.HTTPError(f"{response.status_code} from {url}", response=response)
+                response.raise_for_status()
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                if isinstance(e, requests.HTTPError):
+                    status = e.response.status_code if e.response is not None else 500
+                    retryable = status in RETRY_STATUSES
+                    # Client errors mean a bad request, not an unhealthy n8n.
+                    unhealthy = status >= 500
+                else:
+                    # A read timeout means the workflow is slow, not unreachable;
+                    # retrying it would only multiply the wait.
+                    retryable = isinstance(e, requests.ConnectionError)
+                    unhealthy = True
+                if not retryable or attempt == self.max_attempts:
+                    if unhealthy:
+                        breaker.record_failure()
+                    else:
+                        breaker.record_success()
+                    raise
+                delay = self.backoff * (2 ** (attempt - 1))
+                print(f"[WARN] n8n call to {url} failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            except Exception:
+                breaker.record_failure()
+                raise
+            breaker.record_success()
+            return response
+
+    def post_json(self, url, data=None, files=None):
+        """POST and return the decoded JSON body."""
+        return self.post(url, data=data, files=files).json()
+
+    def stream_text(self, url, data=None):
+        """
+        POST to a streaming workflow and yield text fragments as they arrive.
+
+        Handles newline-delimited JSON (n8n's streaming webhook responses, one
+        object per line with the text in 'content'), plain chunked text, and a
+        regular JSON body from a non-streaming workflow ('result').
+        """
+        response = self.post(url, data=data, stream=True)
+        try:
+            content_type = response.headers.get("Content-Type", "")
+            if "json" in content_type and "ndjson" not in content_type and "stream" not in content_type:
+                yield response.json().get("result", "")
+                return
+            response.encoding = response.encoding or "utf-8"
+            mode = None
+            pending = ""
+            for chunk in response.iter_content(chunk_size=None, decode_unicode=True):
+                if mode is None:
+                    stripped = chunk.lstrip()
+                    if not stripped:
+                        continue
+                    mode = "ndjson" if stripped.startswith("{") else "text"
+                if mode == "text":
+                    yield chunk
+                    continue
+                pending += chunk
+                *lines, pending = pending.split("\n")
+                for line in lines:
+                    text = _ndjson_text(line)
+                    if text:
+                        yield text
+            if mode == "ndjson":
+                text = _ndjson_text(pending)
+                if text:
+                    yield text
+        finally:
+            response.close()
+
+    @property
+    def executor(self):
+        """Thread pool bounding how many calls may be in flight at once."""
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="n8n")
+            return self._executor
+
+    def submit(self, url, data=None, files=None):
+        """Run post_json on the client's thread pool; returns a concurrent.futures.Future."""
+        return self.executor.submit(bind(self.post_json), url, data, files)
+
+    def close(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+        self.session.close()
+
+
+def _rewind(files):
+    """Seek uploaded file objects back to the start so a retry resends the whole body."""
+    if not files:
+        return
+    for value in files.values():
+        fileobj = value[1] if isinstance(value, tuple) else value
+        if hasattr(fileobj, "seek"):
+            fileobj.seek(0)
+
+
+def _ndjson_text(line):
+    """Text carried by one line of a newline-delimited JSON stream, if any."""
+    line = line.strip()
+    if not line:
+        return ""
+    try:
+        item = json.loads(line)
+    except ValueError:
+        return line
+    if not isinstance(item, dict) or item.get("type") in ("begin", "end", "error"):
+        return ""
+    for field in ("content", "text", "delta", "result", "output"):
+        if isinstance(item.get(field), str):
+            return item[field]
+    return ""
@@ -0,0 +1,149 @@
+"""
+Running processes by executable name, for close_app. The index is refreshed
+by diffing the PID list, so only processes started since the last refresh
+have their names looked up.
+"""
+import threading
+
+# Seconds to wait for terminated processes to exit before killing them, and
+# for killed processes to go.
+TERMINATE_TIMEOUT = 3.0
+KILL_TIMEOUT = 2.0
+
+
+def process_stem(name):
+    """'Notepad.exe' -> 'notepad'."""
+    name = name.lower()
+    return name[:-4] if name.endswith(".exe") else name
+
+
+class ProcessIndex:
+    """
+    Maps lower-cased process names to PIDs. provider is the psutil module, or
+    anything offering the same pids(), Process(pid), wait_procs(), NoSuchProcess
+    and AccessDenied, such as a fake process table in the benchmarks.
+    """
+
+    def __init__(self, provider=None):
+        if provider is None:
+            import psutil  # imported here so app_launcher stays cheap to import
+            provider = psutil
+        self.provider = provider
+        self._procs = {}    # pid -> Process (None when its name could not be read)
+        self._names = {}    # pid -> lower-cased name
+        self._by_name = {}  # lower-cased name -> set of pids
+        self._by_stem = {}  # name without .exe -> set of pids
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._procs)
+
+    def _add(self, pid):
+        try:
+            proc = self.provider.Process(pid)
+            name = proc.name().lower()
+        except (self.provider.NoSuchProcess, self.provider.AccessDenied):
+            # Remembered anyway, so an unreadable process is not retried on every refresh.
+            self._procs[pid] = None
+            return
+        self._procs[pid] = proc
+        self._names[pid] = name
+        self._by_name.setdefault(name, set()).add(pid)
+        self._by_stem.setdefault(process_stem(name), set()).add(pid)
+
+    def _remove(self, pid):
+        self._procs.pop(pid, None)
+        name = self._names.pop(pid, None)
+        if name is None:
+            return
+        for table, key in ((self._by_name, name), (self._by_stem, process_stem(name))):
+            pids = table[key]
+            pids.discard(pid)
+            if not pids:
+                del table[key]
+
+    def refresh(self):
+        """Drop processes that have exited and add the ones started since the last refresh."""
+        with self._lock:
+            pids = set(self.provider.pids())
+            for pid in [pid for pid in self._procs if pid not in pids]:
+                self._remove(pid)
+            for pid in pids.difference(self._procs):
+                self._add(pid)
+        return self
+
+    def _live(self, pids):
+        """The processes for pids, dropping any whose PID has since been reused by another process."""
+        procs = []
+        for pid in sorted(pids):
+            proc = self._procs[pid]
+            if proc.is_running():
+                procs.append(proc)
+            else:
+                self._remove(pid)
+        return procs
+
+    def find(self, app_name, resolve_executable=None):
+        """
+        Running processes for app_name, most precise match first: a process
+        named app_name ("notepad" -> notepad.exe), then the executable that
+        resolve_executable(app_name) returns (e.g. from the installed-app
+        list: "word" -> WINWORD.EXE), then any process whose name contains
+        app_name.
+        """
+        query = " ".join(app_name.lower().split())
+        if not query:
+            return []
+        self.refresh()
+        with self._lock:
+            for stem in dict.fromkeys((query, query.replace(" ", ""))):
+                if stem in self._by_stem:
+                    return self._live(self._by_stem[stem])
+        executable = resolve_executable(app_name) if resolve_executable else None
+        with self._lock:
+            if executable and executable.lower() in self._by_name:
+                return self._live(self._by_name[executable.lower()])
+            return self._live({pid for name, pids in self._by_name.items() if query in name for pid in pids})
+
+    def terminate(self, procs, timeout=TERMINATE_TIMEOUT, kill_timeout=KILL_TIMEOUT):
+        """
+        Terminate procs together and wait for them; whatever is still running
+        after timeout is killed. Returns (gone, alive) lists of processes.
+        """
+        provider = self.provider
+        for proc in procs:
+            try:
+                proc.terminate()
+            except provider.NoSuchProcess:
+                pass
+            except provider.AccessDenied as e:
+                print(f"[ERROR] Failed to terminate {proc.pid}: {e}")
+        gone, alive = provider.wait_procs(procs, timeout=timeout)
+        if alive:
+            for proc in alive:
+                print(f"[DEBUG] Process {proc.pid} did not exit; killing it.")
+                try:
+                    proc.kill()
+                except provider.NoSuchProcess:
+                    pass
+                except provider.AccessDenied as e:
+                    print(f"[ERROR] Failed to kill {proc.pid}: {e}")
+            killed, alive = provider.wait_procs(alive, timeout=kill_timeout)
+            gone = list(gone) + list(killed)
+        with self._lock:
+            for proc in gone:
+                self._remove(proc.pid)
+        return gone, list(alive)
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_process_index():
+    """Return the process-wide ProcessIndex over psutil."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = ProcessIndex()
+        return _index
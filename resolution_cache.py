@@ -0,0 +1,181 @@
+"""
+Memo of what repeated commands resolve to ("open chrome" -> the app's path or
+AppUserModelID, "open tube" -> youtube.com, "open the budget pdf" -> a file),
+so a hot command skips the app lookup, domain search or file search.
+
+Every entry is stored with the version of the data it was resolved from (the
+apps table generation, the domain CSV or the file index); a lookup with a
+different version is a miss and drops the entry, so the memo never outlives
+a change to installed_apps.csv, the catalog or the file index.
+"""
+import os
+import json
+import atexit
+import itertools
+import threading
+
+DEFAULT_MAX_ENTRIES = 512
+DEFAULT_SAVE_DELAY = 5.0  # seconds a change may wait before it is written out
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser('~'), '.jarvis_resolution_cache.json')
+
+
+def normalize_query(query):
+    """Lowercase and collapse whitespace, so 'Open  Chrome' and 'open chrome' share an entry."""
+    return " ".join(str(query).lower().split())
+
+
+class ResolutionCache:
+    """
+    Thread-safe, bounded query -> resolution memo with optional JSON persistence.
+
+    When full, the least frequently used entry is evicted, the least recently
+    used one among equals. Use counts are halved when the memo is loaded, so
+    commands that were popular long ago gradually give way. With persist_path
+    set, the memo is loaded on creation and written back (atomically)
+    save_delay seconds after the first unsaved change; flush() writes at once
+    and also runs at interpreter exit.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, persist_path=None, save_delay=DEFAULT_SAVE_DELAY):
+        self.max_entries = max_entries
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self._entries = {}  # key -> [version, value, uses, last_used]
+        self._clock = itertools.count()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # orders writes; taken before _lock
+        self._dirty = False
+        self._save_timer = None
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    @staticmethod
+    def _key(kind, query):
+        return f"{kind}\n{normalize_query(query)}"
+
+    def get(self, kind, query, version):
+        """
+        Return what query resolved to as a kind ('app', 'website', 'file', ...),
+        or None if it is not cached or was resolved from another version of the data.
+        """
+        key = self._key(kind, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] != str(version):
+                del self._entries[key]
+                self.invalidations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            entry[2] += 1
+            entry[3] = next(self._clock)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, kind, query, version, value):
+        """Remember that query resolves to value (anything JSON-serializable) under this version of the data."""
+        key = self._key(kind, query)
+        with self._lock:
+            entry = self._entries.get(key)
+            uses = entry[2] if entry is not None else 1
+            self._entries[key] = [str(version), value, uses, next(self._clock)]
+            while len(self._entries) > self.max_entries:
+                del self._entries[min(self._entries, key=lambda k: self._entries[k][2:])]
+                self.evictions += 1
+            self._changed()
+
+    def invalidate(self, kind=None, query=None):
+        """Drop one entry, every entry of a kind, or everything when kind is None."""
+        with self._lock:
+            if kind is None:
+                self._entries.clear()
+            elif query is not None:
+                self._entries.pop(self._key(kind, query), None)
+            else:
+                prefix = f"{kind}\n"
+                for key in [key for key in self._entries if key.startswith(prefix)]:
+                    del self._entries[key]
+            self._changed()
+
+    def flush(self):
+        """Write unsaved changes to persist_path now."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                ordered = sorted(self._entries.items(), key=lambda item: item[1][3])
+                entries = [[key, version, value, uses] for key, (version, value, uses, _) in ordered]
+            # Serialized outside _lock, so lookups never wait on the disk.
+            if not self._save(entries):
+                with self._lock:
+                    self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        # Stored least recently used first, so the recency order carries over.
+        for key, version, value, uses in stored.get("entries", [])[-self.max_entries:]:
+            self._entries[key] = [version, value, max(1, uses // 2), next(self._clock)]
+
+    def _changed(self):
+        # Called with _lock held.
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self, entries):
+        tmp_path = self.persist_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.persist_path)
+            return True
+        except OSError as e:
+            print(f"[WARN] Failed to persist resolution cache to {self.persist_path}: {e}")
+            return False
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_resolution_cache(path=None):
+    """Return the process-wide ResolutionCache persisted at path (DEFAULT_CACHE_PATH unless given)."""
+    path = path or DEFAULT_CACHE_PATH
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = _caches[path] = ResolutionCache(persist_path=path)
+        return cache
@@ -0,0 +1,150 @@
+import os
+import json
+import time
+import atexit
+import hashlib
+import threading
+from collections import OrderedDict
+
+DEFAULT_MAX_ENTRIES = 256
+DEFAULT_TTL = 6 * 3600  # seconds
+DEFAULT_SAVE_DELAY = 5.0  # seconds a change may wait before it is written out
+
+
+def normalize_prompt(prompt):
+    """Lowercase, collapse whitespace and drop trailing punctuation so trivially different prompts share an entry."""
+    return " ".join(str(prompt).lower().split()).rstrip(" ?!.")
+
+
+def make_key(workflow_url, prompt):
+    """Cache key for a prompt sent to a workflow."""
+    return hashlib.sha256(f"{workflow_url}\n{normalize_prompt(prompt)}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """
+    Thread-safe LRU cache with per-entry expiry and optional JSON persistence.
+
+    Entries expire ttl seconds after they were stored; when full, the least
+    recently used entry is evicted. With persist_path set, the cache is loaded
+    on creation and written back (atomically) save_delay seconds after the
+    first unsaved change, so a burst of puts costs one write; flush() writes
+    at once and also runs at interpreter exit.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, ttl=DEFAULT_TTL, persist_path=None,
+                 save_delay=DEFAULT_SAVE_DELAY):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.persist_path = persist_path
+        self.save_delay = save_delay
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # orders writes; taken before _lock
+        self._dirty = False
+        self._save_timer = None
+        if persist_path:
+            self._load()
+            atexit.register(self.flush)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.time():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value, ttl=None):
+        with self._lock:
+            self._entries[key] = (time.time() + (self.ttl if ttl is None else ttl), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+            self._changed()
+
+    def invalidate(self, key=None):
+        """Drop one entry, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+            self._changed()
+
+    def flush(self):
+        """Write unsaved changes to persist_path now."""
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                self._dirty = False
+                entries = [[key, expires_at, value] for key, (expires_at, value) in self._entries.items()]
+            # Serialized outside _lock, so lookups never wait on the disk.
+            if not self._save(entries):
+                with self._lock:
+                    self._dirty = True
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+    def _load(self):
+        try:
+            with open(self.persist_path, "r", encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return
+        now = time.time()
+        for key, expires_at, value in stored.get("entries", []):
+            if expires_at > now:
+                self._entries[key] = (expires_at, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _changed(self):
+        # Called with _lock held.
+        if not self.persist_path:
+            return
+        self._dirty = True
+        if self._save_timer is None:
+            self._save_timer = threading.Timer(self.save_delay, self.flush)
+            self._save_timer.daemon = True
+            self._save_timer.start()
+
+    def _save(self, entries):
+        tmp_path = self.persist_path + ".tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f)
+            os.replace(tmp_path, self.persist_path)
+            return True
+        except OSError as e:
+            print(f"[WARN] Failed to persist response cache to {self.persist_path}: {e}")
+            return False
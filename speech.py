@@ -1,23 +1,21 @@
-import speech_recognition as sr
-import pyttsx3
-import pyaudio
-import wave
-import os
-
-def say(text):
-    engine = pyttsx3.init()  # pyttsx3 is a valid library for text-to-speech
-    engine.say(text)
-    engine.runAndWait()
+from audio_capture import record_speech
+from tracing import span, traced
+# Text-to-speech runs on a persistent worker thread; say() queues and returns.
+from speech_worker import (say, wait_for_speech, interrupt_speech, flush_speech, set_speech_backend,
+                           PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW)
 
 def take_command():  # Renamed to follow snake_case naming convention
+    import speech_recognition as sr  # slow to import; only needed once listening starts
     r = sr.Recognizer()
-    with sr.Microphone() as source:
+    with span("take_command"), sr.Microphone() as source:
         r.pause_threshold = 1
         print("Listening...")
-        audio = r.listen(source)
+        with span("listen"):
+            audio = r.listen(source)
         try:
             print("Recognizing...")
-            query = r.recognize_google(audio, language='en-in')
+            with span("recognize"):
+                query = r.recognize_google(audio, language='en-in')
             print(f"User said: {query}")
             return query
         except sr.UnknownValueError:
@@ -27,36 +25,10 @@ def take_command():  # Renamed to follow snake_case naming convention
             print(f"Could not request results from Google Speech Recognition service; {e}")
             return None
         
+@traced("record_audio")
 def record_audio(output_path, duration=5):
-    """Record audio from the microphone and save it as a .wav file."""
-    FORMAT = pyaudio.paInt16
-    CHANNELS = 1
-    RATE = 16000  # Whisper expects 16kHz audio
-    CHUNK = 1024
-
-    audio = pyaudio.PyAudio()
-    stream = audio.open(format=FORMAT, channels=CHANNELS,
-                        rate=RATE, input=True,
-                        frames_per_buffer=CHUNK)
-
-    print("Recording audio for transcription...")
-    frames = []
-
-    for _ in range(0, int(RATE / CHUNK * duration)):
-        data = stream.read(CHUNK)
-        frames.append(data)
-
-    print("Finished recording.")
-
-    stream.stop_stream()
-    stream.close()
-    audio.terminate()
-
-    # Save the recorded audio as a .wav file
-    with wave.open(output_path, 'wb') as wf:
-        wf.setnchannels(CHANNELS)
-        wf.setsampwidth(audio.get_sample_size(FORMAT))
-        wf.setframerate(RATE)
-        wf.writeframes(b''.join(frames))
-
+    """Record `duration` seconds from the microphone and save it as a .wav file."""
+    wav_bytes = record_speech(max_seconds=duration, stop_on_silence=False)
+    with open(output_path, 'wb') as f:
+        f.write(wav_bytes or b'')
     return output_path
\ No newline at end of file
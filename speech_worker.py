@@ -0,0 +1,209 @@
+import heapq
+import itertools
+import threading
+import time
+from tracing import span, current_span
+
+# Lower numbers are spoken first; equal priorities keep their queue order.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+
+class SpeechBackend:
+    """Interface for text-to-speech engines driven by a SpeechWorker."""
+
+    def speak(self, text, should_stop):
+        """Speak text, returning early once should_stop() is true."""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class Pyttsx3Backend(SpeechBackend):
+    """pyttsx3 engine, created once on the worker thread and reused for every utterance."""
+
+    def __init__(self):
+        import pyttsx3  # pyttsx3 is a valid library for text-to-speech
+        self.engine = pyttsx3.init()
+        self._should_stop = None
+        self.engine.connect('started-word', self._on_word)
+
+    def _on_word(self, name, location, length):
+        if self._should_stop is not None and self._should_stop():
+            self.engine.stop()
+
+    def speak(self, text, should_stop):
+        self._should_stop = should_stop
+        self.engine.say(text)
+        self.engine.runAndWait()
+        self._should_stop = None
+
+
+class SilentBackend(SpeechBackend):
+    """Discards all speech; for headless runs."""
+
+    def speak(self, text, should_stop):
+        pass
+
+
+class RecordingBackend(SpeechBackend):
+    """Records what would have been spoken, optionally taking `seconds_per_word` to 'speak' it."""
+
+    def __init__(self, seconds_per_word=0.0):
+        self.seconds_per_word = seconds_per_word
+        self.spoken = []
+        self.interrupted = []
+
+    def speak(self, text, should_stop):
+        for _ in text.split():
+            if should_stop():
+                self.interrupted.append(text)
+                return
+            if self.seconds_per_word:
+                time.sleep(self.seconds_per_word)
+        self.spoken.append(text)
+
+
+class SpeechWorker:
+    """
+    Long-lived thread that owns one speech engine and speaks queued utterances.
+
+    say() only enqueues and returns. Utterances are spoken by priority, and
+    interrupt() cuts off the current one (barge-in). The backend is built by
+    backend_factory on the worker thread, since engines like SAPI are bound to
+    the thread that created them.
+    """
+
+    def __init__(self, backend_factory=Pyttsx3Backend):
+        self._backend_factory = backend_factory
+        self._queue = []
+        self._counter = itertools.count()
+        self._cond = threading.Condition()
+        self._speaking = False
+        self._interrupt = False
+        self._closed = False
+        self.backend = None
+        self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+        self._thread.start()
+
+    def say(self, text, priority=PRIORITY_NORMAL, interrupt=False):
+        """Queue text to be spoken and return immediately."""
+        with self._cond:
+            if interrupt:
+                self._queue.clear()
+                self._interrupt = self._speaking
+            # The caller's span is carried along so the utterance is traced as its child.
+            heapq.heappush(self._queue, (priority, next(self._counter), text, current_span(), time.monotonic()))
+            self._cond.notify_all()
+
+    def interrupt(self):
+        """Stop the current utterance and drop everything queued."""
+        with self._cond:
+            self._queue.clear()
+            self._interrupt = self._speaking
+            self._cond.notify_all()
+
+    def flush(self):
+        """Drop queued utterances, letting the current one finish."""
+        with self._cond:
+            self._queue.clear()
+            self._cond.notify_all()
+
+    def wait(self, timeout=None):
+        """Block until everything queued has been spoken; returns False on timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queue and not self._speaking, timeout)
+
+    @property
+    def busy(self):
+        with self._cond:
+            return bool(self._queue) or self._speaking
+
+    def close(self, timeout=None):
+        """Finish the queue, then stop the worker thread."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _should_stop(self):
+        return self._interrupt
+
+    def _run(self):
+        try:
+            self.backend = self._backend_factory()
+        except Exception as e:
+            print(f"[ERROR] Failed to start speech engine: {e}")
+            self.backend = SilentBackend()
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queue or self._closed)
+                if not self._queue:
+                    break
+                _, _, text, parent, queued_at = heapq.heappop(self._queue)
+                self._speaking = True
+                self._interrupt = False
+            try:
+                with span("say", parent=parent, chars=len(text),
+                          queued_ms=round((time.monotonic() - queued_at) * 1000, 3)):
+                    self.backend.speak(text, self._should_stop)
+            except Exception as e:
+                print(f"[ERROR] Speech failed: {e}")
+            with self._cond:
+                self._speaking = False
+                self._interrupt = False
+                self._cond.notify_all()
+        self.backend.close()
+
+
+_worker = None
+_worker_lock = threading.Lock()
+_backend_factory = Pyttsx3Backend
+
+
+def get_speech_worker():
+    """Return the process-wide SpeechWorker, starting it on first use."""
+    global _worker
+    with _worker_lock:
+        if _worker is None:
+            _worker = SpeechWorker(_backend_factory)
+        return _worker
+
+
+def set_speech_backend(backend_factory):
+    """Swap the speech engine (e.g. SilentBackend or RecordingBackend for headless runs)."""
+    global _worker, _backend_factory
+    with _worker_lock:
+        old, _worker, _backend_factory = _worker, None, backend_factory
+    if old is not None:
+        old.interrupt()
+        old.close()
+    return get_speech_worker()
+
+
+def say(text, priority=PRIORITY_NORMAL, interrupt=False, block=False):
+    """Speak text through the shared worker; returns at once unless block is set."""
+    worker = get_speech_worker()
+    worker.say(text, priority=priority, interrupt=interrupt)
+    if block:
+        worker.wait()
+
+
+def is_speaking():
+    """True while the shared worker has something queued or playing; never starts the worker."""
+    worker = _worker
+    return worker is not None and worker.busy
+
+
+def wait_for_speech(timeout=None):
+    return get_speech_worker().wait(timeout)
+
+
+def interrupt_speech():
+    get_speech_worker().interrupt()
+
+
+def flush_speech():
+    get_speech_worker().flush()
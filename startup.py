@@ -0,0 +1,179 @@
+"""
+Startup support for main.py: warming up heavy modules and indexes in the
+background once the listener is live, and the import/initialization profile
+printed by `python main.py --profile-startup`.
+"""
+import sys
+import json
+import time
+import threading
+import contextlib
+from tracing import span
+
+
+def _warm_ai():
+    import ai_handler  # noqa: F401 -- requests, Pillow and the response caches
+
+
+def _warm_speech_recognition():
+    import speech_recognition  # noqa: F401
+
+
+def _warm_apps():
+    from app_launcher import get_app_registry
+    from process_index import get_process_index
+    get_app_registry()
+    get_process_index().refresh()
+
+
+def _warm_file_index():
+    from file_search import get_file_index
+    get_file_index()
+
+
+def _warm_domains():
+    import domain_loader
+    domain_loader.warm_up()
+
+
+# Modules and indexes loaded ahead of the first command that needs them.
+# Each task is independent; a failing one is reported and skipped.
+WARM_UP_TASKS = [
+    ("speech_recognition", _warm_speech_recognition),
+    ("apps", _warm_apps),
+    ("ai_handler", _warm_ai),
+    ("file_index", _warm_file_index),
+    ("domains", _warm_domains),
+]
+
+
+def warm_up(tasks=None, profiler=None):
+    """Run the warm-up tasks one after another, timing each as a phase when a profiler is given."""
+    for name, task in tasks or WARM_UP_TASKS:
+        phase = profiler.phase(f"warm_up:{name}") if profiler is not None else contextlib.nullcontext()
+        try:
+            with phase, span("warm_up", task=name):
+                task()
+        except Exception as e:
+            print(f"[WARN] Warm-up of {name} failed: {e}")
+
+
+def start_warm_up(tasks=None):
+    """Run warm_up() on a daemon thread and return the thread."""
+    thread = threading.Thread(target=warm_up, args=(tasks,), name="warm-up", daemon=True)
+    thread.start()
+    return thread
+
+
+class _TimedLoader:
+    """Wraps a module loader so its exec_module is timed by the profiler."""
+
+    def __init__(self, loader, profiler):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        spec = module.__spec__
+        # The module keeps its real loader; only this one exec_module call is wrapped.
+        spec.loader = module.__loader__ = self._loader
+        with self._profiler.timing(spec.name):
+            self._loader.exec_module(module)
+
+
+class StartupProfiler:
+    """
+    Records the time spent importing each module (inclusive of the imports
+    it triggers, and self time without them) and in named startup phases.
+    install() hooks the import system through sys.meta_path, so it should
+    run before the modules of interest are first imported.
+    """
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}  # module -> [inclusive_ms, self_ms, depth]
+        self.phases = {}   # phase name -> ms
+        self._local = threading.local()
+        self._finding = threading.local()
+
+    def install(self):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+        return self
+
+    def uninstall(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path=None, target=None):
+        if getattr(self._finding, "active", False):
+            return None
+        self._finding.active = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._finding.active = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    @contextlib.contextmanager
+    def timing(self, module):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        children = [0.0]
+        stack.append(children)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = (time.perf_counter() - started) * 1000
+            stack.pop()
+            if stack:
+                stack[-1][0] += elapsed
+            self.imports[module] = [elapsed, elapsed - children[0], len(stack)]
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = self.phases.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+    def results(self):
+        return {
+            "total_ms": (time.perf_counter() - self.started) * 1000,
+            "phases": dict(self.phases),
+            "imports": {name: {"inclusive_ms": inclusive, "self_ms": own, "depth": depth}
+                        for name, (inclusive, own, depth) in self.imports.items()},
+        }
+
+    def report(self, top=25):
+        results = self.results()
+        print(f"Startup profile: {results['total_ms']:.1f} ms total, {len(self.imports)} modules imported")
+        print("\nPhases:")
+        for name, ms in self.phases.items():
+            print(f"  {name:<40} {ms:10.1f} ms")
+        print(f"\nSlowest imports (top {top} by inclusive time):")
+        print(f"  {'module':<40} {'inclusive':>12} {'self':>12}")
+        ranked = sorted(self.imports.items(), key=lambda item: -item[1][0])[:top]
+        for name, (inclusive, own, depth) in ranked:
+            print(f"  {'  ' * min(depth, 4) + name:<40} {inclusive:9.1f} ms {own:9.1f} ms")
+
+    def save(self, path):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.results(), f, indent=2)
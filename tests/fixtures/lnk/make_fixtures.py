@@ -0,0 +1,110 @@
+"""
+Writes the .lnk fixtures used by tests/test_lnk_parser.py. They follow
+[MS-SHLLINK]; run this again after changing it:
+
+    python tests/fixtures/lnk/make_fixtures.py
+"""
+import os
+import struct
+
+LINK_CLSID = bytes.fromhex("0114020000000000c000000000000046")
+APP_USER_MODEL_FMTID = bytes.fromhex("55284c9f799f394ba8d0e1d42de1d5f3")
+HAS_TARGET_ID_LIST, HAS_LINK_INFO, HAS_WORKING_DIR, HAS_ARGUMENTS, IS_UNICODE = 0x1, 0x2, 0x10, 0x20, 0x80
+
+
+def header(flags):
+    return struct.pack("<I16sII8s8s8sIIIHHII", 0x4C, LINK_CLSID, flags, 0x20, b"\0" * 8, b"\0" * 8, b"\0" * 8,
+                       0, 0, 1, 0, 0, 0, 0)
+
+
+def link_info(base_path):
+    """LinkInfo with a VolumeID and both the ANSI and the Unicode local base path."""
+    header_size = 0x24
+    volume = struct.pack("<IIII", 0x11, 3, 0x1234, 0x10) + b"\0"
+    base = base_path.encode("cp1252") + b"\0"
+    suffix = b"\0"
+    base_unicode = base_path.encode("utf-16-le") + b"\0\0"
+    suffix_unicode = b"\0\0"
+    offset_volume = header_size
+    offset_base = offset_volume + len(volume)
+    offset_suffix = offset_base + len(base)
+    offset_base_unicode = offset_suffix + len(suffix)
+    offset_suffix_unicode = offset_base_unicode + len(base_unicode)
+    body = volume + base + suffix + base_unicode + suffix_unicode
+    return struct.pack("<IIIIIIIII", header_size + len(body), header_size, 1, offset_volume, offset_base, 0,
+                       offset_suffix, offset_base_unicode, offset_suffix_unicode) + body
+
+
+def string_data(text):
+    return struct.pack("<H", len(text)) + text.encode("utf-16-le")
+
+
+def file_item(long_name, short_name="SHORT~1"):
+    """A file/folder shell item with a BEEF0004 extension block carrying the long name."""
+    short = short_name.encode() + b"\0"
+    if len(short) % 2:
+        short += b"\0"
+    extension = struct.pack("<HHI", 0, 9, 0xBEEF0004) + b"\0" * 8 + struct.pack("<H", 46) + b"\0" * 28
+    extension += long_name.encode("utf-16-le") + b"\0\0" + struct.pack("<H", 0)
+    extension = struct.pack("<H", len(extension)) + extension[2:]
+    body = b"\x32\x00" + b"\0" * 8 + b"\x20\x00" + short + extension
+    return struct.pack("<H", len(body) + 2) + body
+
+
+def id_list(drive, names):
+    """My Computer, the drive, then one item per path component."""
+    items = struct.pack("<H", 20) + b"\x1f\x50" + b"\0" * 16
+    volume = b"\x2f" + drive.encode() + b"\0" * (22 - len(drive))
+    items += struct.pack("<H", len(volume) + 2) + volume
+    for name in names:
+        items += file_item(name)
+    items += b"\0\0"
+    return struct.pack("<H", len(items)) + items
+
+
+def property_store(app_user_model_id):
+    """A PropertyStoreDataBlock holding System.AppUserModel.ID as a VT_LPWSTR."""
+    value = (app_user_model_id + "\0").encode("utf-16-le")
+    value += b"\0" * (-len(value) % 4)
+    typed = struct.pack("<HHI", 0x1F, 0, len(app_user_model_id) + 1) + value
+    prop = struct.pack("<II", 9 + len(typed), 5) + b"\0" + typed
+    props = prop + struct.pack("<I", 0)
+    storage = struct.pack("<II", 24 + len(props), 0x53505331) + APP_USER_MODEL_FMTID + props
+    store = storage + struct.pack("<I", 0)
+    return struct.pack("<II", 8 + len(store), 0xA0000009) + store
+
+
+def shell_link(target=None, arguments="", working_dir="", app_user_model_id=None, ids=None):
+    flags = IS_UNICODE
+    body = b""
+    if ids:
+        flags |= HAS_TARGET_ID_LIST
+        body += id_list(*ids)
+    if target:
+        flags |= HAS_LINK_INFO
+        body += link_info(target)
+    if working_dir:
+        flags |= HAS_WORKING_DIR
+        body += string_data(working_dir)
+    if arguments:
+        flags |= HAS_ARGUMENTS
+        body += string_data(arguments)
+    if app_user_model_id:
+        body += property_store(app_user_model_id)
+    return header(flags) + body + b"\0\0\0\0"
+
+
+FIXTURES = {
+    "local_path.lnk": shell_link(r"C:\Program Files\Google\Chrome\Application\chrome.exe", "--profile-directory=Default",
+                                 r"C:\Program Files\Google\Chrome\Application"),
+    "id_list.lnk": shell_link(ids=("C:\\", ["Program Files", "Notepad++", "notepad++.exe"])),
+    "app_user_model_id.lnk": shell_link(app_user_model_id="Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"),
+}
+
+
+if __name__ == "__main__":
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name, data in FIXTURES.items():
+        with open(os.path.join(here, name), "wb") as f:
+            f.write(data)
+        print(f"Wrote {name} ({len(data)} bytes)")
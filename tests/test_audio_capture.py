@@ -0,0 +1,103 @@
+import io
+import math
+import wave
+import random
+
+import pytest
+
+from audio_capture import SAMPLE_RATE, SAMPLE_WIDTH, PRE_ROLL_MS, WavFileSource, capture_utterance, record_speech
+
+BYTES_PER_MS = SAMPLE_RATE * SAMPLE_WIDTH // 1000
+
+
+def silence(ms, rng=random.Random(1)):
+    """Low background noise, well under the VAD's minimum energy."""
+    return [rng.randint(-40, 40) for _ in range(SAMPLE_RATE * ms // 1000)]
+
+
+def tone(ms, amplitude=6000, hz=220):
+    return [int(amplitude * math.sin(2 * math.pi * hz * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE * ms // 1000)]
+
+
+def write_wav(path, samples, channels=1):
+    with wave.open(str(path), "wb") as wf:
+        wf.setnchannels(channels)
+        wf.setsampwidth(SAMPLE_WIDTH)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(b"".join(s.to_bytes(2, "little", signed=True) for s in samples))
+    return str(path)
+
+
+@pytest.fixture
+def wav(tmp_path):
+    """Writes the given segments (lists of samples) to a WAV file and returns its path."""
+    def make(*segments, name="input.wav"):
+        return write_wav(tmp_path / name, [s for segment in segments for s in segment])
+    return make
+
+
+def test_silence_times_out(wav):
+    with WavFileSource(wav(silence(4000))) as source:
+        assert capture_utterance(source, no_speech_timeout=1.0) is None
+        # Gave up after the timeout instead of reading the whole file.
+        remaining = 0
+        while source.read_frame():
+            remaining += 1
+        assert remaining > 0
+
+
+def test_stops_at_end_of_speech(wav):
+    path = wav(silence(500), tone(1000), silence(1500), tone(1000))
+    with WavFileSource(path) as source:
+        pcm = capture_utterance(source, end_silence_ms=800)
+    duration_ms = len(pcm) / BYTES_PER_MS
+    # Pre-roll + the first utterance + the trailing silence that ended it, but not the second utterance.
+    assert 1000 + 800 <= duration_ms <= PRE_ROLL_MS + 1000 + 800 + 100
+
+
+def test_keeps_pre_roll_before_speech(wav):
+    path = wav(silence(1000), tone(600), silence(1000))
+    with WavFileSource(path) as source:
+        pcm = capture_utterance(source, end_silence_ms=300)
+    # The first voiced frames are not clipped: the capture starts with background noise.
+    first_ms = pcm[:50 * BYTES_PER_MS]
+    assert max(abs(int.from_bytes(first_ms[i:i + 2], "little", signed=True))
+               for i in range(0, len(first_ms), 2)) < 100
+
+
+def test_prepends_caller_pre_roll(wav):
+    wake_word = b"\x01\x00" * 800
+    with WavFileSource(wav(silence(300), tone(500), silence(1000))) as source:
+        pcm = capture_utterance(source, end_silence_ms=300, pre_roll=wake_word)
+    assert pcm.startswith(wake_word)
+
+
+def test_source_running_dry_mid_speech_returns_what_was_heard(wav):
+    with WavFileSource(wav(silence(300), tone(700))) as source:
+        pcm = capture_utterance(source)
+    assert pcm is not None and len(pcm) >= 600 * BYTES_PER_MS
+
+
+def test_max_seconds_caps_the_recording(wav):
+    with WavFileSource(wav(silence(300), tone(3000))) as source:
+        pcm = capture_utterance(source, max_seconds=1)
+    assert len(pcm) <= (1000 + PRE_ROLL_MS) * BYTES_PER_MS
+
+
+def test_record_speech_returns_wav_bytes(wav):
+    with WavFileSource(wav(silence(500), tone(800), silence(1200))) as source:
+        audio = record_speech(source, end_silence_ms=500)
+    with wave.open(io.BytesIO(audio), "rb") as wf:
+        assert (wf.getnchannels(), wf.getsampwidth(), wf.getframerate()) == (1, SAMPLE_WIDTH, SAMPLE_RATE)
+        assert wf.getnframes() >= SAMPLE_RATE * 0.8
+
+
+def test_record_speech_returns_none_when_nothing_was_said(wav):
+    with WavFileSource(wav(silence(2000))) as source:
+        assert record_speech(source, no_speech_timeout=1.0) is None
+
+
+def test_wav_source_rejects_stereo(tmp_path):
+    path = write_wav(tmp_path / "stereo.wav", [0] * 3200, channels=2)
+    with pytest.raises(ValueError):
+        WavFileSource(path)
@@ -0,0 +1,67 @@
+import csv
+import sqlite3
+
+from catalog import Catalog
+
+
+def write_apps(path, apps):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["AppName", "ExecutablePath", "ShortcutPath", "AppUserModelID"])
+        writer.writerows(apps)
+    return str(path)
+
+
+def test_duplicate_names_resolve_to_the_first_row(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    catalog.import_csv("apps", write_apps(tmp_path / "apps.csv", [
+        ("Chrome", "C:/first/chrome.exe", "", ""),
+        ("Notepad", "C:/notepad.exe", "", ""),
+        ("Chrome", "C:/second/chrome.exe", "", ""),
+        ("chrome", "C:/third/chrome.exe", "", ""),
+    ]))
+
+    assert catalog.find_app("chrome")[1] == "C:/first/chrome.exe"
+    assert [row[1] for row in catalog.all_apps()] == ["C:/first/chrome.exe", "C:/notepad.exe", "C:/third/chrome.exe"]
+
+
+def test_reimport_follows_the_new_order(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    catalog.replace_apps([("Chrome", "C:/chrome.exe", "", ""), ("CHROME", "C:/other.exe", "", ""),
+                          ("Notepad", "C:/notepad.exe", "", "")])
+    catalog.replace_apps([("Paint", "C:/paint.exe", "", ""), ("CHROME", "C:/other.exe", "", ""),
+                          ("Chrome", "C:/chrome.exe", "", "")])
+
+    assert catalog.find_app("chrome")[1] == "C:/other.exe"
+    assert [row[0] for row in catalog.all_apps()] == ["Paint", "CHROME", "Chrome"]
+    assert [row[0] for row in catalog.apps_with_prefix("chr")] == ["CHROME", "Chrome"]
+
+
+def test_upsert_lists_new_apps_last_and_keeps_existing_places(tmp_path):
+    catalog = Catalog(str(tmp_path / "catalog.db"))
+    catalog.replace_apps([("Chrome", "C:/chrome.exe", "", ""), ("Notepad", "C:/notepad.exe", "", "")])
+    catalog.upsert_apps([("Paint", "C:/paint.exe", "", ""), ("Chrome", "C:/new/chrome.exe", "", "")])
+
+    assert [row[:2] for row in catalog.all_apps()] == [
+        ("Chrome", "C:/new/chrome.exe"), ("Notepad", "C:/notepad.exe"), ("Paint", "C:/paint.exe")]
+
+
+def test_schema_1_catalog_is_migrated(tmp_path):
+    path = str(tmp_path / "catalog.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+        CREATE TABLE apps (name TEXT PRIMARY KEY, name_key TEXT NOT NULL,
+                           executable_path TEXT NOT NULL DEFAULT '', shortcut_path TEXT NOT NULL DEFAULT '',
+                           app_id TEXT NOT NULL DEFAULT '');
+        CREATE INDEX apps_by_key ON apps (name_key);
+        INSERT INTO meta VALUES ('schema_version', 1), ('apps_source', 'apps.csv|1|1');
+        INSERT INTO apps VALUES ('Chrome', 'chrome', 'C:/chrome.exe', '', ''), ('Paint', 'paint', 'C:/paint.exe', '', '');
+    """)
+    conn.close()
+
+    catalog = Catalog(path)
+    assert [row[0] for row in catalog.all_apps()] == ["Chrome", "Paint"]
+    assert catalog.find_app("paint")[1] == "C:/paint.exe"
+    assert catalog.get_meta("schema_version") == "2"
+    assert catalog.get_meta("apps_source") is None
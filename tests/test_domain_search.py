@@ -0,0 +1,100 @@
+import csv
+import threading
+
+import domain_index
+import domain_loader
+
+
+def write_domains(path, domains):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Rank", "Domain"])
+        for rank, domain in enumerate(domains, 1):
+            writer.writerow([rank, domain])
+    return str(path)
+
+
+def test_chunked_trigram_build_matches_single_run(tmp_path):
+    source = write_domains(tmp_path / "domains.csv", [f"site{i}-{i % 13}.example" for i in range(5000)])
+    index = domain_index.open_domain_index(source)
+    try:
+        chunked = domain_index.build_trigram_index(index, str(tmp_path / "chunked.tri"), run_domains=700)
+        single = domain_index.build_trigram_index(index, str(tmp_path / "single.tri"), run_domains=10 ** 9)
+    finally:
+        index.close()
+    with open(chunked, "rb") as a, open(single, "rb") as b:
+        assert a.read() == b.read()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["chunked.tri", "domains.csv", "domains.idx", "single.tri"]
+
+
+def test_search_never_builds_trigrams_on_the_command_path(tmp_path, monkeypatch):
+    source = write_domains(tmp_path / "domains.csv", ["youtube.com", "example.com"])
+    started = []
+    monkeypatch.setattr(domain_loader, "_start_trigram_build", lambda file_path, index: started.append(file_path))
+
+    assert domain_loader.search_domains("open tube", top_k=1, file_path=source)[0][0] == "youtube.com"
+    assert started == [source]
+    assert not (tmp_path / "domains.tri").exists()
+
+
+def test_exact_label_past_the_verified_cap_is_found(tmp_path):
+    popular = [f"my{i}.tubes{i}.com" for i in range(domain_loader.MAX_VERIFIED_MATCHES * 3)]
+    source = write_domains(tmp_path / "domains.csv", popular + ["tube.com"])
+    domain_loader.warm_up(source)
+
+    # The most popular substring match still comes first; the exact label beats the rest.
+    assert [domain for domain, _ in domain_loader.search_domains("open tube", top_k=2, file_path=source)] == \
+        ["my0.tubes0.com", "tube.com"]
+    assert domain_loader.search_domains("open tube.com", top_k=1, file_path=source)[0][0] == "tube.com"
+
+
+def test_exact_and_prefix_matches_past_the_scan_cap_are_found(tmp_path, monkeypatch):
+    monkeypatch.setattr(domain_loader, "MAX_SCANNED_CANDIDATES", 200)
+    # Every domain has all of the query's trigrams, but none contains the query.
+    crowd = [f"abc{i}bca{i}cab{i}.com" for i in range(500)]
+    source = write_domains(tmp_path / "domains.csv", crowd + ["abcabcd.net", "www.abcabc.com"])
+    domain_loader.warm_up(source)
+
+    assert [domain for domain, _ in domain_loader.search_domains("open abcabc", top_k=5, file_path=source)] == \
+        ["www.abcabc.com", "abcabcd.net"]
+
+
+def test_domains_keep_their_csv_spelling(tmp_path):
+    # Out of rank order, so the sorting build path is covered too.
+    source = str(tmp_path / "domains.csv")
+    with open(source, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([["Rank", "Domain"], [3, "example.org"], [1, "YouTube.com"], [2, " GitHub.com "]])
+    domain_loader.warm_up(source)
+
+    assert domain_loader.load_domains(source) == ["YouTube.com", "GitHub.com", "example.org"]
+    assert domain_loader.search_domains("open tube", top_k=1, file_path=source) == \
+        [("YouTube.com", domain_loader.score_domain("tube", "youtube.com", 0))]
+    assert domain_loader.search_domains("open github.com", top_k=1, file_path=source)[0][0] == "GitHub.com"
+
+
+def test_domain_index_is_built_outside_the_lookup_lock(tmp_path, monkeypatch):
+    source = write_domains(tmp_path / "domains.csv", ["youtube.com", "example.com"])
+    other = write_domains(tmp_path / "other.csv", ["github.com"])
+    domain_loader.get_domain_index(other)
+    lookups = []
+
+    def open_while_another_query_runs(file_path):
+        # A query for an index that is already open must not wait behind this build.
+        thread = threading.Thread(target=lambda: lookups.append(domain_loader.get_domain_index(other).top()))
+        thread.start()
+        thread.join(5)
+        return domain_index.open_domain_index(file_path)
+
+    monkeypatch.setattr(domain_loader, "open_domain_index", open_while_another_query_runs)
+    assert domain_loader.get_domain_index(source).top() == ["youtube.com", "example.com"]
+    assert lookups == [["github.com"]]
+
+
+def test_match_where_the_substring_walk_stops_is_still_found(tmp_path):
+    # The walk stops on the first exact label past its cap; the prefix walk must still rank it.
+    popular = [f"my{i}.tubes{i}.com" for i in range(domain_loader.MAX_VERIFIED_MATCHES)]
+    source = write_domains(tmp_path / "domains.csv", popular + ["tube.com", "tube.net"])
+    domain_loader.warm_up(source)
+
+    assert [domain for domain, _ in domain_loader.search_domains("open tube", top_k=3, file_path=source)] == \
+        ["my0.tubes0.com", "tube.com", "tube.net"]
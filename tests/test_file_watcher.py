@@ -0,0 +1,121 @@
+import os
+import queue
+
+import pytest
+
+import file_watcher
+from file_scanner import scan_directories_incremental
+from file_watcher import OVERFLOW, FileWatcher, PollingBackend
+
+
+def write(path, text, mtime=None):
+    # Saved through a temporary file, as editors do, so the folder changes too.
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        f.write(text)
+    if mtime is not None:
+        os.utime(path + ".tmp", (mtime, mtime))
+    os.replace(path + ".tmp", path)
+
+
+def names(rows):
+    return sorted(row[0] for row in rows)
+
+
+@pytest.fixture
+def watched(tmp_path):
+    """A scanned folder tree and a polling FileWatcher on it; yields (root, next_delta)."""
+    root = tmp_path / "docs"
+    (root / "sub").mkdir(parents=True)
+    write(str(root / "keep.txt"), "keep")
+    write(str(root / "sub" / "old.pdf"), "old", mtime=1_600_000_000)
+    csv_path = str(tmp_path / "index.csv")
+    scan_directories_incremental([str(root)], {".txt", ".pdf"}, csv_path)
+
+    deltas = queue.Queue()
+    watcher = FileWatcher([str(root)], {".txt", ".pdf"}, csv_path, backend=PollingBackend(interval=0.02),
+                          on_update=deltas.put, debounce=0.05, max_delay=0.5).start()
+    yield root, lambda: deltas.get(timeout=5)
+    watcher.stop(timeout=5)
+    assert not watcher.running
+
+
+def test_polling_backend_reports_changed_folders(tmp_path):
+    backend = PollingBackend(interval=0.01)
+    assert backend.sync([str(tmp_path)]) == [str(tmp_path)]
+    assert backend.wait(1) == []
+
+    (tmp_path / "new.txt").write_text("new")
+    events = []
+    for _ in range(100):
+        events = backend.wait(0.05)
+        if events:
+            break
+    assert events == [(str(tmp_path), None, True)]
+
+
+def test_created_file_is_added(watched):
+    root, next_delta = watched
+    write(str(root / "sub" / "new.txt"), "new")
+
+    delta = next_delta()
+    assert names(delta.added) == ["new.txt"]
+    assert (delta.removed, delta.modified, delta.total) == ([], [], 3)
+
+
+def test_modified_file_is_reported(watched):
+    root, next_delta = watched
+    write(str(root / "sub" / "old.pdf"), "new contents")
+
+    delta = next_delta()
+    assert names(delta.modified) == ["old.pdf"]
+    assert (delta.added, delta.removed) == ([], [])
+
+
+def test_deleted_file_and_folder_are_removed(watched):
+    root, next_delta = watched
+    os.remove(root / "keep.txt")
+    assert names(next_delta().removed) == ["keep.txt"]
+
+    os.remove(root / "sub" / "old.pdf")
+    os.rmdir(root / "sub")
+    delta = next_delta()
+    assert names(delta.removed) == ["old.pdf"]
+    assert delta.total == 0
+
+
+class ScriptedBackend:
+    """Hands out one scripted batch of events per wait()."""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    def sync(self, directories):
+        return []
+
+    def wait(self, timeout=None):
+        return self.batches.pop(0) if self.batches else []
+
+    def wake(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def test_other_extensions_are_ignored_and_overflow_rescans(tmp_path, monkeypatch):
+    applied = []
+    monkeypatch.setattr(FileWatcher, "_apply", lambda self, directories, rescan: applied.append(
+        (sorted(directories), rescan)) or self._stop.set())
+    monkeypatch.setattr(file_watcher, "snapshot_directories", lambda csv_path, extensions: {})
+    folder = str(tmp_path)
+
+    FileWatcher([folder], {".txt"}, "index.csv", backend=ScriptedBackend(
+        [(folder, "photo.jpg", False)], [(folder, "notes.txt", False)]), debounce=0).run()
+    assert applied == [([folder], False)]
+
+    applied.clear()
+    watcher = FileWatcher([folder], {".txt"}, "index.csv", backend=ScriptedBackend(
+        [(folder, "photo.jpg", False)], [OVERFLOW]), debounce=0)
+    watcher.run()
+    assert applied == [([], True)]
+    assert watcher.events == 1
@@ -0,0 +1,93 @@
+from intent_router import IntentRouter, _PhraseMatcher
+
+
+def names(intents):
+    return [intent.name for intent in intents]
+
+
+def recording_router(*specs):
+    """A router whose handlers record their calls; spec is (name, returns, triggers)."""
+    router = IntentRouter()
+    calls = []
+    for name, returns, triggers in specs:
+        router.register(name, lambda query, name=name, returns=returns: calls.append(name) or returns, **triggers)
+    return router, calls
+
+
+def test_matcher_finds_overlapping_phrases():
+    matcher = _PhraseMatcher()
+    for phrase in ("he", "she", "his", "hers"):
+        matcher.add(phrase, phrase)
+    matcher.build()
+
+    assert sorted(matcher.scan("ushers")) == [(1, "she"), (2, "he"), (2, "hers")]
+    assert list(matcher.scan("")) == []
+
+
+def test_every_overlapping_trigger_is_found():
+    router, _ = recording_router(
+        ("folder", False, {"phrases": ["extract text from all images"]}),
+        ("image", False, {"phrases": ["text from all"]}),
+        ("all", False, {"phrases": ["all images in", "images"]}),
+        ("other", False, {"phrases": ["describe image"]}),
+    )
+    assert names(router.match("extract text from all images in downloads")) == ["folder", "image", "all"]
+
+
+def test_registration_order_decides_not_position_in_the_query():
+    router, calls = recording_router(
+        ("first", False, {"phrases": ["chrome"]}),
+        ("second", True, {"prefixes": ["open "]}),
+        ("third", True, {"phrases": ["open"]}),
+    )
+    assert router.dispatch("open chrome") == "second"
+    # "first" declined, "second" handled it, "third" was never asked.
+    assert calls == ["first", "second"]
+    stats = router.stats()
+    assert (stats["first"]["declined"], stats["second"]["handled"], stats["third"]["matched"]) == (1, 1, 0)
+
+
+def test_prefixes_only_trigger_at_the_start():
+    router, _ = recording_router(("open", True, {"prefixes": ["open "]}))
+    assert names(router.match("open notepad")) == ["open"]
+    assert router.match("please open notepad") == []
+    assert router.match("reopen notepad") == []
+
+
+def test_phrases_match_inside_words_unless_a_pattern_asks_for_boundaries():
+    # Phrases behave like the `phrase in query` checks they replaced.
+    router, _ = recording_router(
+        ("substring", True, {"phrases": ["exit"]}),
+        ("word", True, {"patterns": [r"\bexit\b"]}),
+    )
+    assert names(router.match("exit now")) == ["substring", "word"]
+    assert names(router.match("find the exits")) == ["substring"]
+    assert router.match("ex it") == []
+
+
+def test_fallbacks_run_after_every_triggered_intent_declines():
+    router, calls = recording_router(
+        ("catch_all", True, {"fallback": True}),
+        ("app", False, {"prefixes": ["open "]}),
+        ("website", False, {"prefixes": ["open "], "fallback": True}),
+    )
+    assert names(router.match("open tube")) == ["app", "catch_all", "website"]
+    assert names(router.match("hello")) == ["catch_all"]
+    assert router.dispatch("open tube") == "catch_all"
+    assert calls == ["app", "catch_all"]
+
+
+def test_failing_handler_is_counted_and_the_next_intent_runs():
+    router = IntentRouter()
+    router.register("broken", lambda query: 1 / 0, phrases=["time"])
+    router.register("clock", lambda query: True, phrases=["time"])
+
+    assert router.dispatch("what time is it") == "clock"
+    assert router.stats()["broken"]["errors"] == 1
+
+
+def test_registering_after_a_match_recompiles():
+    router, _ = recording_router(("time", True, {"phrases": ["time"]}))
+    assert router.match("open chrome") == []
+    router.register("app", lambda query: True, prefixes=["open "])
+    assert names(router.match("open chrome")) == ["app"]
@@ -0,0 +1,121 @@
+import threading
+
+import pytest
+
+import job_scheduler
+from job_scheduler import BULK, CANCELLED, DONE, FAILED, QUEUED, RUNNING, JobScheduler
+
+
+def blocker(started, release):
+    """A job body that reports it started, then holds its worker until released."""
+    def run(job):
+        started.set()
+        release.wait(5)
+        return job.name
+    return run
+
+
+@pytest.fixture
+def release():
+    release = threading.Event()
+    yield release
+    release.set()  # never leave workers blocked if a test fails
+
+
+def test_interactive_jobs_run_while_bulk_jobs_hold_their_workers(release):
+    scheduler = JobScheduler(workers=2, bulk_workers=1)
+    scan_started = threading.Event()
+    scan = scheduler.submit("scan", blocker(scan_started, release), kind=BULK)
+    second_scan = scheduler.submit("second scan", lambda job: "scanned", kind=BULK)
+    assert scan_started.wait(5)
+
+    answer = scheduler.submit("answer", lambda job: 42)
+    assert answer.wait(5) and answer.result == 42
+    # The second bulk job waits for the bulk slot even though a worker is idle.
+    assert (scan.state, second_scan.state) == (RUNNING, QUEUED)
+
+    release.set()
+    assert scheduler.wait_idle(5)
+    assert second_scan.result == "scanned"
+
+
+def test_queued_interactive_jobs_start_before_queued_bulk_jobs(release):
+    scheduler = JobScheduler(workers=1)
+    order = []
+    started = threading.Event()
+    scheduler.submit("busy", blocker(started, release))
+    assert started.wait(5)
+    scheduler.submit("scan", lambda job: order.append("scan"), kind=BULK)
+    scheduler.submit("answer", lambda job: order.append("answer"))
+
+    release.set()
+    assert scheduler.wait_idle(5)
+    assert order == ["answer", "scan"]
+
+
+def test_cancel_a_queued_job(release):
+    scheduler = JobScheduler(workers=1)
+    started = threading.Event()
+    scheduler.submit("busy", blocker(started, release))
+    assert started.wait(5)
+    cancelled = []
+    job = scheduler.submit("scan", lambda job: pytest.fail("a cancelled job must not run"), kind=BULK,
+                           on_cancel=lambda: cancelled.append(True))
+
+    assert scheduler.cancel(job.id) is job
+    assert job.done and job.state == CANCELLED and cancelled == [True]
+    assert job.status() == "Job 2, scan, was cancelled."
+    assert scheduler.cancel(job.id) is None
+    release.set()
+    assert scheduler.wait_idle(5)
+
+
+def test_cancel_a_running_job():
+    scheduler = JobScheduler()
+    started = threading.Event()
+
+    def scan(job):
+        started.set()
+        job.cancel_event.wait(5)
+
+    job = scheduler.submit("scan", scan, kind=BULK, announce="Scan finished.")
+    assert started.wait(5)
+    assert scheduler.cancel(job.id) is job
+    assert job.wait(5)
+    assert job.state == CANCELLED
+    assert scheduler.cancel(job.id) is None
+    assert scheduler.cancel(99) is None
+
+
+def test_status_and_announcements(release):
+    announced = []
+    scheduler = JobScheduler(announce=announced.append)
+    started = threading.Event()
+    running = scheduler.submit("scan", blocker(started, release), progress=lambda: "3 folders left.")
+    assert started.wait(5)
+    assert running.status().startswith("Job 1, scan, has been running for 0 seconds.")
+    assert running.status().endswith(" 3 folders left.")
+
+    failed = scheduler.submit("upload", lambda job: 1 / 0, error_message="Sorry, the upload failed.")
+    assert failed.wait(5)
+    assert (failed.state, failed.status()) == (FAILED, "Job 2, upload, failed.")
+    assert isinstance(failed.error, ZeroDivisionError)
+
+    release.set()
+    assert running.wait(5)
+    done = scheduler.submit("sum", lambda job: 3, announce=lambda result: f"The answer is {result}.")
+    assert done.wait(5) and done.state == DONE
+    assert announced == ["Sorry, the upload failed.", "The answer is 3."]
+    assert [job.id for job in scheduler.recent_jobs()] == [2, 1, 3]
+    assert scheduler.active_jobs() == []
+
+
+def test_history_forgets_the_oldest_finished_jobs(monkeypatch):
+    monkeypatch.setattr(job_scheduler, "HISTORY_SIZE", 2)
+    scheduler = JobScheduler(workers=1)
+    jobs = [scheduler.submit(f"job {i}", lambda job: None) for i in range(4)]
+    assert scheduler.wait_idle(5)
+
+    assert [job.id for job in scheduler.recent_jobs()] == [3, 4]
+    assert scheduler.get(jobs[0].id) is None
+    assert scheduler.get(jobs[3].id) is jobs[3]
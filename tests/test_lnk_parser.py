@@ -0,0 +1,106 @@
+import os
+import shutil
+
+import pytest
+
+import lnk_parser
+from lnk_parser import LnkParseError, ShortcutCache, parse_lnk, read_lnk, resolve_shortcut, resolve_shortcuts
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "lnk")
+
+
+def fixture(name):
+    return os.path.join(FIXTURES, name)
+
+
+def test_link_info_local_path():
+    link = read_lnk(fixture("local_path.lnk"))
+    assert link.target == r"C:\Program Files\Google\Chrome\Application\chrome.exe"
+    assert link.arguments == "--profile-directory=Default"
+    assert link.working_dir == r"C:\Program Files\Google\Chrome\Application"
+    assert link.app_id == ""
+
+
+def test_id_list_only_link():
+    link = read_lnk(fixture("id_list.lnk"))
+    assert link.target == r"C:\Program Files\Notepad++\notepad++.exe"
+    assert link.arguments == ""
+
+
+def test_app_user_model_id_property_store():
+    link = read_lnk(fixture("app_user_model_id.lnk"))
+    assert link.app_id == "Microsoft.WindowsCalculator_8wekyb3d8bbwe!App"
+    assert link.target == ""
+
+
+def test_rejects_files_that_are_not_shell_links():
+    with pytest.raises(LnkParseError):
+        parse_lnk(b"[InternetShortcut]\r\nURL=https://example.com\r\n")
+
+
+def test_rejects_truncated_links():
+    with open(fixture("local_path.lnk"), "rb") as f:
+        data = f.read()
+    with pytest.raises(LnkParseError):
+        parse_lnk(data[:lnk_parser.HEADER_SIZE + 6])
+
+
+@pytest.fixture
+def shortcut(tmp_path):
+    path = str(tmp_path / "Chrome.lnk")
+    shutil.copy(fixture("local_path.lnk"), path)
+    return path
+
+
+@pytest.fixture
+def parses(monkeypatch):
+    """Counts how often a shortcut is actually read and parsed."""
+    calls = []
+    read = lnk_parser.read_lnk
+
+    def counting_read(path):
+        calls.append(path)
+        return read(path)
+    monkeypatch.setattr(lnk_parser, "read_lnk", counting_read)
+    return calls
+
+
+def test_cache_skips_unchanged_shortcuts(shortcut, parses):
+    cache = ShortcutCache()
+    first = resolve_shortcut(shortcut, cache)
+    assert resolve_shortcut(shortcut, cache) == first
+    assert len(parses) == 1
+
+
+def test_cache_reparses_when_mtime_changes(shortcut, parses):
+    cache = ShortcutCache()
+    resolve_shortcut(shortcut, cache)
+    stat = os.stat(shortcut)
+    shutil.copy(fixture("id_list.lnk"), shortcut)
+    os.utime(shortcut, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert resolve_shortcut(shortcut, cache).target == r"C:\Program Files\Notepad++\notepad++.exe"
+    assert len(parses) == 2
+
+
+def test_cache_persists_and_prunes(tmp_path, shortcut, parses):
+    cache_path = str(tmp_path / "shortcut_cache.json")
+    cache = ShortcutCache(cache_path)
+    resolve_shortcuts([shortcut, fixture("id_list.lnk")], cache)
+    cache.save()
+
+    reloaded = ShortcutCache(cache_path)
+    assert resolve_shortcut(shortcut, reloaded).target.endswith("chrome.exe")
+    assert len(parses) == 2
+
+    reloaded.prune([shortcut])
+    assert reloaded.get(fixture("id_list.lnk"), os.stat(fixture("id_list.lnk"))) == (False, None)
+
+
+def test_unreadable_shortcuts_are_cached_as_none(tmp_path, parses):
+    path = str(tmp_path / "broken.lnk")
+    with open(path, "wb") as f:
+        f.write(b"not a link")
+    cache = ShortcutCache()
+    assert resolve_shortcut(path, cache) is None
+    assert resolve_shortcut(path, cache) is None
+    assert len(parses) == 1
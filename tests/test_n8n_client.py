@@ -0,0 +1,166 @@
+import io
+import json
+import time
+import threading
+import contextlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from n8n_client import N8nClient, CircuitOpenError
+
+
+class StubN8n:
+    """Local stand-in for n8n: answers each POST with the next queued status (200 once the queue is empty)."""
+
+    def __init__(self):
+        self.statuses = []
+        self.requests = 0
+        self.lock = threading.Lock()
+
+    def next_status(self):
+        with self.lock:
+            self.requests += 1
+            return self.statuses.pop(0) if self.statuses else 200
+
+
+@contextlib.contextmanager
+def stub_server():
+    stub = StubN8n()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            status = stub.next_status()
+            body = json.dumps({"result": f"status {status}"}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+    thread.start()
+    stub.url = f"http://127.0.0.1:{server.server_address[1]}/webhook/test-workflow"
+    try:
+        yield stub
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.fixture
+def stub():
+    with stub_server() as stub:
+        yield stub
+
+
+@pytest.fixture
+def client():
+    client = N8nClient(max_attempts=3, backoff=0)
+    yield client
+    client.close()
+
+
+def test_retries_transient_statuses(stub, client):
+    stub.statuses = [503, 502]
+    assert client.post_json(stub.url, {"prompt": "hi"}) == {"result": "status 200"}
+    assert stub.requests == 3
+    assert client.breaker_for(stub.url).state == "closed"
+
+
+def test_gives_up_after_max_attempts(stub, client):
+    stub.statuses = [503, 503, 503]
+    with pytest.raises(requests.HTTPError):
+        client.post_json(stub.url)
+    assert stub.requests == 3
+
+
+def test_client_errors_are_not_retried_and_keep_the_circuit_closed(stub, client):
+    stub.statuses = [400] * 5
+    for _ in range(5):
+        with pytest.raises(requests.HTTPError):
+            client.post_json(stub.url)
+    assert stub.requests == 5
+    assert client.breaker_for(stub.url).state == "closed"
+
+
+def test_circuit_opens_after_repeated_failures(stub):
+    client = N8nClient(max_attempts=1, backoff=0)
+    stub.statuses = [500] * 10
+    breaker = client.breaker_for(stub.url)
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post_json(stub.url)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        client.post_json(stub.url)
+    assert stub.requests == breaker.failure_threshold
+    client.close()
+
+
+def test_half_open_trial_closes_the_circuit(stub):
+    client = N8nClient(max_attempts=1, backoff=0)
+    breaker = client.breaker_for(stub.url)
+    breaker.reset_timeout = 0.05
+    stub.statuses = [500] * breaker.failure_threshold
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post_json(stub.url)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    assert breaker.state == "half-open"
+    assert client.post_json(stub.url) == {"result": "status 200"}
+    assert breaker.state == "closed"
+    client.close()
+
+
+def test_failed_half_open_trial_reopens_the_circuit(stub):
+    client = N8nClient(max_attempts=1, backoff=0)
+    breaker = client.breaker_for(stub.url)
+    breaker.reset_timeout = 0.05
+    stub.statuses = [500] * (breaker.failure_threshold + 1)
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post_json(stub.url)
+    time.sleep(0.06)
+    with pytest.raises(requests.HTTPError):
+        client.post_json(stub.url)
+    assert breaker.state == "open"
+    client.close()
+
+
+class _Unseekable(io.BytesIO):
+    def seek(self, *args):
+        raise ValueError("I/O operation on closed file")
+
+
+def test_trial_is_released_when_the_call_fails_before_sending(stub):
+    client = N8nClient(max_attempts=1, backoff=0)
+    breaker = client.breaker_for(stub.url)
+    breaker.reset_timeout = 0.05
+    stub.statuses = [500] * breaker.failure_threshold
+    for _ in range(breaker.failure_threshold):
+        with pytest.raises(requests.HTTPError):
+            client.post_json(stub.url)
+    time.sleep(0.06)
+    with pytest.raises(ValueError):
+        client.post_json(stub.url, files={"file": ("a.wav", _Unseekable(b"x"), "audio/wav")})
+    # The failed upload must not leave the trial slot taken.
+    assert client.post_json(stub.url) == {"result": "status 200"}
+    assert breaker.state == "closed"
+    client.close()
+
+
+def test_uploads_are_rewound_between_attempts(stub, client):
+    stub.statuses = [503]
+    upload = io.BytesIO(b"RIFF....WAVE")
+    client.post_json(stub.url, files={"file": ("a.wav", upload, "audio/wav")})
+    assert stub.requests == 2
@@ -0,0 +1,165 @@
+import pytest
+
+from process_index import ProcessIndex, process_stem
+
+
+class NoSuchProcess(Exception):
+    pass
+
+
+class AccessDenied(Exception):
+    pass
+
+
+class FakeProcess:
+    def __init__(self, table, pid, name, exits_on="terminate"):
+        self.table = table
+        self.pid = pid
+        self._name = name
+        # Which signal makes the process exit: "terminate", "kill" or None (never).
+        self.exits_on = exits_on
+        self.terminated = False
+        self.killed = False
+
+    def name(self):
+        if self.pid not in self.table.procs:
+            raise NoSuchProcess(self.pid)
+        if self._name is None:
+            raise AccessDenied(self.pid)
+        return self._name
+
+    def is_running(self):
+        return self.table.procs.get(self.pid) is self
+
+    def terminate(self):
+        self.terminated = True
+        if self.exits_on == "terminate":
+            self.table.exit(self.pid)
+
+    def kill(self):
+        self.killed = True
+        if self.exits_on in ("terminate", "kill"):
+            self.table.exit(self.pid)
+
+
+class FakePsutil:
+    """The slice of psutil that ProcessIndex uses, over an in-memory process table."""
+
+    NoSuchProcess = NoSuchProcess
+    AccessDenied = AccessDenied
+
+    def __init__(self):
+        self.procs = {}
+        self.lookups = 0
+        self.waits = []
+
+    def spawn(self, pid, name, exits_on="terminate"):
+        self.procs[pid] = FakeProcess(self, pid, name, exits_on)
+        return self.procs[pid]
+
+    def exit(self, pid):
+        self.procs.pop(pid, None)
+
+    def pids(self):
+        return list(self.procs)
+
+    def Process(self, pid):
+        self.lookups += 1
+        if pid not in self.procs:
+            raise NoSuchProcess(pid)
+        return self.procs[pid]
+
+    def wait_procs(self, procs, timeout=None):
+        self.waits.append((len(procs), timeout))
+        gone = [proc for proc in procs if not proc.is_running()]
+        return gone, [proc for proc in procs if proc.is_running()]
+
+
+@pytest.fixture
+def fake():
+    fake = FakePsutil()
+    fake.spawn(1, "System")
+    fake.spawn(10, "notepad.exe")
+    fake.spawn(11, "notepad.exe")
+    fake.spawn(20, "WINWORD.EXE")
+    fake.spawn(30, "chrome.exe")
+    return fake
+
+
+def test_process_stem():
+    assert process_stem("Notepad.EXE") == "notepad"
+    assert process_stem("bash") == "bash"
+
+
+def test_refresh_only_looks_up_new_processes(fake):
+    index = ProcessIndex(fake).refresh()
+    assert len(index) == 5
+    assert fake.lookups == 5
+    fake.exit(11)
+    fake.spawn(40, "code.exe")
+    index.refresh()
+    assert fake.lookups == 6
+    assert sorted(proc.pid for proc in index.find("notepad")) == [10]
+    assert [proc.pid for proc in index.find("code")] == [40]
+
+
+def test_unreadable_processes_are_not_retried(fake):
+    fake.spawn(50, None)
+    index = ProcessIndex(fake).refresh()
+    lookups = fake.lookups
+    index.refresh()
+    assert fake.lookups == lookups
+
+
+def test_find_prefers_stem_then_executable_then_substring(fake):
+    index = ProcessIndex(fake)
+    assert [proc.pid for proc in index.find("Notepad")] == [10, 11]
+    assert [proc.pid for proc in index.find("word", resolve_executable=lambda name: "WINWORD.EXE")] == [20]
+    assert [proc.pid for proc in index.find("chro")] == [30]
+    assert index.find("") == []
+
+
+def test_find_drops_reused_pids(fake):
+    index = ProcessIndex(fake).refresh()
+    # PID 10 is reused by another process between the refresh and the lookup.
+    fake.procs[10] = FakeProcess(fake, 10, "other.exe")
+    assert [proc.pid for proc in index.find("notepad")] == [11]
+
+
+def test_terminate_waits_for_all_processes_at_once(fake):
+    index = ProcessIndex(fake)
+    procs = index.find("notepad")
+    gone, alive = index.terminate(procs, timeout=3, kill_timeout=2)
+    assert sorted(proc.pid for proc in gone) == [10, 11] and alive == []
+    assert all(proc.terminated and not proc.killed for proc in procs)
+    # One wait for the whole batch, no kill round.
+    assert fake.waits == [(2, 3)]
+    assert index.find("notepad") == []
+
+
+def test_terminate_kills_processes_that_ignore_terminate(fake):
+    stubborn = fake.spawn(12, "notepad.exe", exits_on="kill")
+    index = ProcessIndex(fake)
+    gone, alive = index.terminate(index.find("notepad"), timeout=3, kill_timeout=2)
+    assert sorted(proc.pid for proc in gone) == [10, 11, 12] and alive == []
+    assert stubborn.killed
+    assert not fake.procs[30].terminated
+    assert fake.waits == [(3, 3), (1, 2)]
+
+
+def test_terminate_reports_processes_that_survive_kill(fake):
+    fake.spawn(60, "hung.exe", exits_on=None)
+    index = ProcessIndex(fake)
+    gone, alive = index.terminate(index.find("hung"))
+    assert gone == [] and [proc.pid for proc in alive] == [60]
+    # A survivor stays in the index so it can be found again.
+    assert [proc.pid for proc in index.find("hung")] == [60]
+
+
+def test_terminate_tolerates_processes_that_already_exited(fake):
+    index = ProcessIndex(fake)
+    procs = index.find("notepad")
+    fake.exit(10)
+    procs[0].terminate = lambda: (_ for _ in ()).throw(NoSuchProcess(10))
+    gone, alive = index.terminate(procs)
+    assert sorted(proc.pid for proc in gone) == [10, 11] and alive == []
@@ -0,0 +1,79 @@
+import json
+import time
+
+from resolution_cache import ResolutionCache
+
+
+def test_entries_survive_a_restart_with_halved_use_counts(tmp_path):
+    path = str(tmp_path / "resolutions.json")
+    cache = ResolutionCache(persist_path=path, save_delay=60)
+    cache.put("app", "open chrome", 3, ["C:/chrome.exe", ""])
+    for _ in range(5):
+        cache.get("app", "Open  Chrome", 3)
+    cache.put("website", "open tube", "v1", "youtube.com")
+    cache.flush()
+
+    with open(path, encoding="utf-8") as f:
+        stored = json.load(f)["entries"]
+    assert [key for key, _, _, _ in stored] == ["app\nopen chrome", "website\nopen tube"]
+
+    reloaded = ResolutionCache(persist_path=path)
+    assert reloaded.get("app", "open chrome", 3) == ["C:/chrome.exe", ""]
+    assert reloaded.get("website", "open tube", "v1") == "youtube.com"
+    assert reloaded._entries["app\nopen chrome"][2] == 4  # 6 uses halved, plus this lookup
+
+
+def test_puts_are_written_once_after_the_delay(tmp_path, monkeypatch):
+    path = str(tmp_path / "resolutions.json")
+    cache = ResolutionCache(persist_path=path, save_delay=0.05)
+    writes = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda entries: writes.append(len(entries)) or save(entries))
+
+    for i in range(50):
+        cache.put("app", f"open app {i}", 1, None)
+    assert writes == []
+
+    deadline = time.time() + 5
+    while not writes and time.time() < deadline:
+        time.sleep(0.01)
+    assert writes == [50]
+    cache.flush()
+    assert writes == [50]
+
+
+def test_another_version_of_the_data_is_a_miss_and_drops_the_entry():
+    cache = ResolutionCache()
+    cache.put("app", "open chrome", 1, ["C:/chrome.exe", ""])
+
+    assert cache.get("app", "open chrome", 2) is None
+    assert cache.get("app", "open chrome", 1) is None
+    stats = cache.stats()
+    assert stats["invalidations"] == 1
+    assert stats["entries"] == 0
+
+
+def test_eviction_drops_least_used_then_least_recent():
+    cache = ResolutionCache(max_entries=3)
+    cache.put("app", "a", 1, "A")
+    cache.put("app", "b", 1, "B")
+    cache.put("app", "c", 1, "C")
+    cache.get("app", "a", 1)
+    cache.get("app", "c", 1)
+
+    cache.put("app", "d", 1, "D")  # b is used least
+    assert cache.get("app", "b", 1) is None
+    cache.put("app", "e", 1, "E")  # d and e tie on uses; d is older
+    assert cache.get("app", "d", 1) is None
+    assert [cache.get("app", key, 1) for key in "ace"] == ["A", "C", "E"]
+    assert cache.stats()["evictions"] == 2
+
+
+def test_invalidate_by_kind():
+    cache = ResolutionCache()
+    cache.put("app", "open chrome", 1, "chrome")
+    cache.put("website", "open tube", 1, "youtube.com")
+
+    cache.invalidate("app")
+    assert cache.get("app", "open chrome", 1) is None
+    assert cache.get("website", "open tube", 1) == "youtube.com"
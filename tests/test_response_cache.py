@@ -0,0 +1,48 @@
+import json
+import time
+
+from response_cache import ResponseCache
+
+
+def stored_keys(path):
+    with open(path, encoding="utf-8") as f:
+        return [key for key, _, _ in json.load(f)["entries"]]
+
+
+def test_puts_are_written_once_on_flush(tmp_path, monkeypatch):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(persist_path=path, save_delay=60)
+    writes = []
+    save = cache._save
+    monkeypatch.setattr(cache, "_save", lambda entries: writes.append(len(entries)) or save(entries))
+
+    for i in range(100):
+        cache.put(f"k{i}", f"v{i}")
+    assert writes == []
+    assert not (tmp_path / "cache.json").exists()
+
+    cache.flush()
+    cache.flush()
+    assert writes == [100]
+    assert stored_keys(path)[-1] == "k99"
+
+
+def test_changes_are_saved_after_the_delay(tmp_path):
+    path = str(tmp_path / "cache.json")
+    cache = ResponseCache(persist_path=path, save_delay=0.05)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.invalidate("a")
+
+    deadline = time.time() + 5
+    while not (tmp_path / "cache.json").exists() and time.time() < deadline:
+        time.sleep(0.01)
+    assert stored_keys(path) == ["b"]
+    assert ResponseCache(persist_path=path).get("b") == "2"
+
+
+def test_memory_only_cache_never_schedules_a_save():
+    cache = ResponseCache()
+    cache.put("a", "1")
+    assert cache._save_timer is None
+    cache.flush()
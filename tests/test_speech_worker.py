@@ -0,0 +1,129 @@
+import threading
+import time
+
+import pytest
+
+import speech_worker
+from speech_worker import (PRIORITY_HIGH, PRIORITY_LOW, PRIORITY_NORMAL, RecordingBackend, SilentBackend,
+                           SpeechWorker)
+
+
+class GatedBackend(RecordingBackend):
+    """Holds the first utterance until released, so the rest queue up behind it."""
+
+    def __init__(self, seconds_per_word=0.0):
+        super().__init__(seconds_per_word)
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def speak(self, text, should_stop):
+        if not self.started.is_set():
+            self.started.set()
+            self.release.wait(5)
+        super().speak(text, should_stop)
+
+
+@pytest.fixture
+def gated():
+    backend = GatedBackend()
+    worker = SpeechWorker(lambda: backend)
+    yield worker, backend
+    backend.release.set()
+    worker.close(timeout=5)
+
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition() and time.time() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_queued_utterances_are_spoken_by_priority_then_in_order(gated):
+    worker, backend = gated
+    worker.say("first")
+    assert backend.started.wait(5)
+    worker.say("low", priority=PRIORITY_LOW)
+    worker.say("normal one")
+    worker.say("urgent", priority=PRIORITY_HIGH)
+    worker.say("normal two", priority=PRIORITY_NORMAL)
+
+    backend.release.set()
+    assert worker.wait(5)
+    assert backend.spoken == ["first", "urgent", "normal one", "normal two", "low"]
+
+
+def test_interrupt_cuts_off_the_current_utterance_and_drops_the_queue():
+    backend = RecordingBackend(seconds_per_word=0.01)
+    worker = SpeechWorker(lambda: backend)
+    try:
+        worker.say("this sentence goes on for a good long while " * 20)
+        worker.say("never spoken")
+        assert wait_until(lambda: worker._speaking)
+        worker.interrupt()
+        assert worker.wait(5)
+        worker.say("after the interruption")
+        assert worker.wait(5)
+    finally:
+        worker.close(timeout=5)
+
+    assert len(backend.interrupted) == 1
+    assert backend.spoken == ["after the interruption"]
+
+
+def test_say_with_interrupt_replaces_the_queue(gated):
+    worker, backend = gated
+    worker.say("first")
+    assert backend.started.wait(5)
+    worker.say("stale one")
+    worker.say("stale two", priority=PRIORITY_HIGH)
+    worker.say("fresh", interrupt=True)
+
+    backend.release.set()
+    assert worker.wait(5)
+    # "first" was already playing when the interrupt came in, so it was cut off.
+    assert backend.interrupted == ["first"]
+    assert backend.spoken == ["fresh"]
+
+
+def test_flush_lets_the_current_utterance_finish(gated):
+    worker, backend = gated
+    worker.say("first")
+    assert backend.started.wait(5)
+    worker.say("dropped")
+    assert worker.busy
+    worker.flush()
+
+    backend.release.set()
+    assert worker.wait(5)
+    assert backend.spoken == ["first"]
+    assert not worker.busy
+
+
+def test_backend_that_fails_to_start_falls_back_to_silence():
+    def broken():
+        raise RuntimeError("no audio device")
+
+    worker = SpeechWorker(broken)
+    worker.say("hello")
+    assert worker.wait(5)
+    worker.close(timeout=5)
+    assert isinstance(worker.backend, SilentBackend)
+
+
+def test_set_speech_backend_swaps_the_shared_worker(monkeypatch):
+    monkeypatch.setattr(speech_worker, "_worker", None)
+    monkeypatch.setattr(speech_worker, "_backend_factory", SilentBackend)
+    assert not speech_worker.is_speaking()
+    assert speech_worker._worker is None  # asking never starts the worker
+
+    backend = RecordingBackend()
+    worker = speech_worker.set_speech_backend(lambda: backend)
+    try:
+        speech_worker.say("one")
+        speech_worker.say("two", block=True)
+        assert backend.spoken == ["one", "two"]
+        assert speech_worker.get_speech_worker() is worker
+    finally:
+        speech_worker.set_speech_backend(SilentBackend)
+        speech_worker.get_speech_worker().close(timeout=5)
@@ -0,0 +1,148 @@
+import math
+import random
+import wave
+
+import pytest
+
+from audio_capture import SAMPLE_RATE, SAMPLE_WIDTH, WavFileSource
+from wake_listener import COMMAND_TIMEOUT, MAX_SEGMENT_MS, WakeListener, strip_wake_word
+
+BYTES_PER_MS = SAMPLE_RATE * SAMPLE_WIDTH // 1000
+
+
+def silence(ms, rng=random.Random(1)):
+    """Low background noise, well under the VAD's minimum energy."""
+    return [rng.randint(-40, 40) for _ in range(SAMPLE_RATE * ms // 1000)]
+
+
+def tone(ms, amplitude=6000, hz=220):
+    return [int(amplitude * math.sin(2 * math.pi * hz * i / SAMPLE_RATE)) for i in range(SAMPLE_RATE * ms // 1000)]
+
+
+@pytest.fixture
+def wav(tmp_path):
+    """Writes the given segments (lists of samples) to a WAV file and returns its path."""
+    def make(*segments):
+        path = str(tmp_path / "stream.wav")
+        with wave.open(path, "wb") as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(SAMPLE_WIDTH)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(b"".join(s.to_bytes(2, "little", signed=True)
+                                    for segment in segments for s in segment))
+        return path
+    return make
+
+
+class CountingSource(WavFileSource):
+    def __init__(self, wav):
+        super().__init__(wav)
+        self.bytes_read = 0
+
+    def read_frame(self):
+        frame = super().read_frame()
+        self.bytes_read += len(frame or b"")
+        return frame
+
+
+class FakeSpotter:
+    """Reports the wake word in every voiced segment it is handed."""
+
+    def __init__(self):
+        self.segments = []
+
+    def spot(self, pcm, rate):
+        self.segments.append(len(pcm))
+        return True
+
+
+class ScriptedRecognizer:
+    """Returns the scripted transcripts in order and records the audio it was given."""
+
+    def __init__(self, *texts):
+        self.texts = list(texts)
+        self.calls = []
+
+    def __call__(self, pcm, rate):
+        self.calls.append(len(pcm))
+        return self.texts.pop(0) if self.texts else None
+
+
+def listen(path, recognizer, **kwargs):
+    commands = []
+    source = CountingSource(path)
+    listener = WakeListener(source, spotter=FakeSpotter(), recognizer=recognizer, is_speaking=lambda: False,
+                            on_command=lambda command: commands.append((command, source.bytes_read)),
+                            report_interval=0, **kwargs)
+    with source:
+        stats = listener.run()
+    return listener, stats, commands
+
+
+def test_silence_and_noise_never_wake(wav):
+    rng = random.Random(7)
+    noise = [rng.randint(-150, 150) for _ in range(SAMPLE_RATE * 3)]
+    listener, stats, commands = listen(wav(silence(2000), noise, silence(1000)), ScriptedRecognizer())
+
+    assert listener.spotter.segments == []
+    assert stats["wakes"] == 0
+    assert commands == []
+
+
+def test_one_wake_per_utterance(wav):
+    recognizer = ScriptedRecognizer("jarvis open chrome", "jarvis open notepad")
+    _, stats, commands = listen(wav(silence(500), tone(1200), silence(1500), tone(1000), silence(1500)),
+                                recognizer)
+
+    assert stats["segments_spotted"] == 2
+    assert stats["wakes"] == 2
+    assert [command for command, _ in commands] == ["open chrome", "open notepad"]
+
+
+def test_command_in_the_same_breath_is_dispatched_without_waiting(wav):
+    recognizer = ScriptedRecognizer("Jarvis, open chrome")
+    _, _, commands = listen(wav(silence(500), tone(1200), silence(3000)), recognizer)
+
+    assert commands[0][0] == "open chrome"
+    # The wake segment itself was transcribed, and dispatch came right after the
+    # pause that ended it, not after waiting out COMMAND_TIMEOUT for more speech.
+    assert recognizer.calls == [recognizer.calls[0]]
+    assert recognizer.calls[0] >= 1200 * BYTES_PER_MS
+    assert commands[0][1] < (500 + 1200 + 600) * BYTES_PER_MS
+
+
+def test_command_after_a_pause_is_captured(wav):
+    recognizer = ScriptedRecognizer("jarvis", "jarvis open notepad")
+    _, _, commands = listen(wav(silence(500), tone(500), silence(500), tone(900), silence(2000)), recognizer)
+
+    assert commands == [("open notepad", commands[0][1])]
+    wake_only, with_command = recognizer.calls
+    # The command audio handed on keeps the wake-word segment and adds the follow-up.
+    assert with_command >= wake_only + 900 * BYTES_PER_MS
+
+
+def test_wake_word_alone_waits_only_the_short_timeout(wav):
+    recognizer = ScriptedRecognizer("jarvis", "jarvis open chrome")
+    pause_ms = 300 + int(COMMAND_TIMEOUT * 1000) + 700
+    listener, stats, commands = listen(wav(silence(500), tone(500), silence(pause_ms), tone(1200), silence(1500)),
+                                       recognizer)
+
+    # The lone wake word gave up after COMMAND_TIMEOUT, so the next utterance
+    # was heard as a wake of its own rather than taken as the command.
+    assert stats["wakes"] == 2
+    assert [command for command, _ in commands] == ["open chrome"]
+    assert len(recognizer.calls) == 2
+
+
+def test_cut_off_segment_is_captured_to_the_end_before_transcribing(wav):
+    recognizer = ScriptedRecognizer("jarvis open the quarterly budget spreadsheet")
+    _, _, commands = listen(wav(silence(500), tone(MAX_SEGMENT_MS + 1500), silence(2000)), recognizer)
+
+    assert commands[0][0] == "open the quarterly budget spreadsheet"
+    assert len(recognizer.calls) == 1
+    assert recognizer.calls[0] >= (MAX_SEGMENT_MS + 1500) * BYTES_PER_MS
+
+
+def test_strip_wake_word():
+    assert strip_wake_word("hey Jarvis, open chrome") == "open chrome"
+    assert strip_wake_word("open chrome") == "open chrome"
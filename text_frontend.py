@@ -0,0 +1,285 @@
+"""
+Headless text front end: feeds typed or scripted commands through
+command_handler.handle_command without a microphone.
+
+    python text_frontend.py                      # one command per line from stdin
+    python text_frontend.py --file cmds.jsonl    # JSON lines with a "command" (or "query"/"text") field
+    python text_frontend.py --file cmds.txt --concurrency 8 --report results.json
+    python text_frontend.py --file cmds.txt --trace trace.json   # Chrome trace; .jsonl for JSON lines
+
+By default launching apps, opening files and websites, speech, n8n calls
+and file scans are replaced with recording stubs, and the catalog and the
+resolution cache live in a temporary directory, so a run has no side
+effects and each result lists what would have happened. Pass --live to use
+the real ones.
+"""
+import os
+import sys
+import json
+import time
+import types
+import argparse
+import tempfile
+import threading
+import contextlib
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import tracing
+
+STUB_AI_ANSWER = "This is a stubbed answer."
+
+
+def parse_command_line(line):
+    """Return the command text from one input line (plain text, JSON string or JSON object)."""
+    line = line.strip()
+    if not line:
+        return None
+    if line[0] in '{"':
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return line
+        if isinstance(item, str):
+            return item
+        if isinstance(item, dict):
+            for field in ("command", "query", "text", "title"):
+                if isinstance(item.get(field), str):
+                    return item[field]
+        return None
+    return line
+
+
+def read_commands(stream):
+    return [command for command in (parse_command_line(line) for line in stream) if command]
+
+
+class Recorder:
+    """
+    Collects side effects, attributed to the command being run. The command
+    is kept in a context variable, so background jobs a command starts are
+    attributed to it too.
+    """
+
+    def __init__(self):
+        self._record = contextvars.ContextVar("record", default=None)
+        self._lock = threading.Lock()
+        self.unattributed = []
+
+    @contextlib.contextmanager
+    def command(self, record):
+        token = self._record.set(record)
+        try:
+            yield record
+        finally:
+            self._record.reset(token)
+
+    def add(self, kind, detail):
+        record = self._record.get()
+        with self._lock:
+            (record["actions"] if record is not None else self.unattributed).append([kind, detail])
+
+    def speak(self, text, *args, **kwargs):
+        self.add("say", text)
+
+
+class _StubN8nClient:
+    """Stands in for N8nClient: answers every workflow call with STUB_AI_ANSWER."""
+
+    def __init__(self, recorder):
+        self.recorder = recorder
+        self.executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="stub-n8n")
+
+    def post_json(self, url, data=None, files=None):
+        self.recorder.add("n8n", url)
+        return {"result": STUB_AI_ANSWER}
+
+    def stream_text(self, url, data=None):
+        self.recorder.add("n8n", url)
+        yield STUB_AI_ANSWER
+
+    def submit(self, url, data=None, files=None):
+        return self.executor.submit(self.post_json, url, data, files)
+
+
+def _stub_scan(recorder):
+    from file_scanner import ScanDelta
+
+    def scan(directories, extensions, csv_path, *args, **kwargs):
+        recorder.add("scan", list(directories))
+        return ScanDelta([], [], [], 0)
+    return scan
+
+
+def _stub_record_speech(*args, **kwargs):
+    from audio_capture import encode_wav
+    return encode_wav(b'\0\0' * 1600)
+
+
+@contextlib.contextmanager
+def recording_side_effects(recorder):
+    """
+    Swap every outward-facing side effect for a recording stub while the
+    block runs, and keep the catalog and resolution cache in a scratch
+    directory instead of the user's home.
+    """
+    import webbrowser
+    import speech_worker
+    import app_launcher
+    import ai_handler
+    import command_handler
+    import file_scanner
+    import catalog
+    import resolution_cache
+    from response_cache import ResponseCache
+
+    # Connections opened by job threads may still be open at cleanup on Windows.
+    scratch = tempfile.TemporaryDirectory(prefix="jarvis_frontend_", ignore_cleanup_errors=True)
+    catalog_path = os.path.join(scratch.name, "catalog.db")
+    cache_path = os.path.join(scratch.name, "resolutions.json")
+    patches = [
+        (command_handler, "say", recorder.speak),
+        (app_launcher, "say", recorder.speak),
+        (ai_handler, "say", recorder.speak),
+        (command_handler, "wait_for_speech", lambda timeout=None: True),
+        (app_launcher, "close_app", lambda query: recorder.add("close_app", query) or True),
+        (command_handler, "record_speech", _stub_record_speech),
+        (app_launcher, "subprocess", types.SimpleNamespace(Popen=lambda args, **kw: recorder.add("launch", args))),
+        (os, "startfile", lambda path, *args: recorder.add("startfile", path)),
+        (webbrowser, "open", lambda url, *args, **kw: recorder.add("browser", url) or True),
+        (ai_handler, "n8n_client", _StubN8nClient(recorder)),
+        (ai_handler, "response_cache", ResponseCache()),
+        (ai_handler, "image_cache", ResponseCache()),
+        (catalog, "DEFAULT_CATALOG_PATH", catalog_path),
+        (resolution_cache, "DEFAULT_CACHE_PATH", cache_path),
+        # FileScanJob and initialize_file_scan both look the scan up in file_scanner.
+        (file_scanner, "scan_directories_incremental", _stub_scan(recorder)),
+    ]
+    missing = object()
+    saved = [(target, name, getattr(target, name, missing)) for target, name, _ in patches]
+    speech_worker.set_speech_backend(speech_worker.SilentBackend)
+    for target, name, value in patches:
+        setattr(target, name, value)
+    try:
+        yield recorder
+    finally:
+        for target, name, value in saved:
+            if value is missing:
+                delattr(target, name)
+            else:
+                setattr(target, name, value)
+        catalog.get_catalog(catalog_path).close()
+        # Write out pending changes now rather than into a removed directory later.
+        resolution_cache.get_resolution_cache(cache_path).flush()
+        scratch.cleanup()
+
+
+def run_commands(commands, concurrency=1, recorder=None):
+    """
+    Run each command through handle_command and return one result dict per command:
+    command, handled, outcome ('handled', 'unhandled', 'shutdown' or 'error'), latency_ms
+    (until handle_command returns), completed_ms (until the background jobs it started are
+    done; with concurrency, until all running jobs are), actions (recorded side effects,
+    when running with stubs) and error.
+    """
+    from command_handler import handle_command, scheduler
+
+    def run_one(index_and_command):
+        index, command = index_and_command
+        record = {"index": index, "command": command, "handled": False, "outcome": "unhandled",
+                  "latency_ms": 0.0, "completed_ms": 0.0, "actions": [], "error": None}
+        context = recorder.command(record) if recorder is not None else contextlib.nullcontext()
+        with context, tracing.span("command", command=command):
+            started = time.perf_counter()
+            try:
+                record["handled"] = bool(handle_command(command))
+                record["outcome"] = "handled" if record["handled"] else "unhandled"
+            except SystemExit:
+                record["handled"], record["outcome"] = True, "shutdown"
+            except Exception as e:
+                record["outcome"], record["error"] = "error", repr(e)
+            record["latency_ms"] = (time.perf_counter() - started) * 1000
+            scheduler.wait_idle()
+            record["completed_ms"] = (time.perf_counter() - started) * 1000
+        return record
+
+    if concurrency <= 1:
+        return [run_one(item) for item in enumerate(commands)]
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="command") as executor:
+        return list(executor.map(run_one, enumerate(commands)))
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(results, wall_time):
+    latencies = [r["latency_ms"] for r in results]
+    completions = [r["completed_ms"] for r in results]
+    outcomes = {}
+    for r in results:
+        outcomes[r["outcome"]] = outcomes.get(r["outcome"], 0) + 1
+    return {
+        "commands": len(results),
+        "outcomes": outcomes,
+        "wall_time_s": wall_time,
+        "throughput_per_s": len(results) / wall_time if wall_time else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50),
+            "p95": percentile(latencies, 0.95),
+            "p99": percentile(latencies, 0.99),
+            "max": max(latencies, default=0.0),
+        },
+        "completed_ms": {
+            "p50": percentile(completions, 0.50),
+            "p95": percentile(completions, 0.95),
+            "max": max(completions, default=0.0),
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run JARVIS commands from text instead of the microphone.")
+    parser.add_argument("--file", help="Text or JSONL file of commands (default: stdin)")
+    parser.add_argument("--concurrency", type=int, default=1, help="Commands to run at once")
+    parser.add_argument("--live", action="store_true", help="Use real side effects instead of recording stubs")
+    parser.add_argument("--report", help="Write per-command results and the summary to this JSON file")
+    parser.add_argument("--quiet", action="store_true", help="Only print the summary")
+    parser.add_argument("--trace", help="Trace each stage and write the spans here (.jsonl, else Chrome trace JSON)")
+    args = parser.parse_args(argv)
+    if args.trace:
+        tracing.enable()
+
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            commands = read_commands(f)
+    else:
+        commands = read_commands(sys.stdin)
+
+    recorder = None if args.live else Recorder()
+    context = recording_side_effects(recorder) if recorder is not None else contextlib.nullcontext()
+    with context:
+        started = time.perf_counter()
+        results = run_commands(commands, args.concurrency, recorder)
+        wall_time = time.perf_counter() - started
+
+    summary = summarize(results, wall_time)
+    if args.trace:
+        summary["stages_ms"] = tracing.stats()
+        export = tracing.export_jsonl if args.trace.endswith(".jsonl") else tracing.export_chrome_trace
+        export(args.trace)
+    if not args.quiet:
+        for r in results:
+            actions = "; ".join(f"{kind}: {detail}" for kind, detail in r["actions"])
+            print(f"[RESULT] {r['latency_ms']:8.2f} ms  {r['outcome']:<9}  {r['command']!r}  {actions}")
+    print(json.dumps(summary, indent=2))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump({"summary": summary, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import os
+import json
+import time
+import itertools
+import threading
+import contextvars
+from collections import deque
+
+# Finished spans kept for export, and durations kept per stage for percentiles.
+MAX_SPANS = 10000
+STATS_WINDOW = 512
+# Set JARVIS_TRACE=1 to trace from startup; otherwise call enable().
+_enabled = os.environ.get("JARVIS_TRACE", "").lower() in ("1", "true", "yes")
+
+_current = contextvars.ContextVar("jarvis_span", default=None)
+_ids = itertools.count(1)
+
+
+class Span:
+    """One timed stage. Nested spans share the trace_id of the outermost one."""
+
+    __slots__ = ("name", "attrs", "span_id", "parent_id", "trace_id", "thread", "start_ns", "end_ns", "_token")
+
+    def __init__(self, name, parent=None, attrs=None):
+        self.name = name
+        self.attrs = attrs or {}
+        self.span_id = next(_ids)
+        self.parent_id = parent.span_id if parent is not None else None
+        self.trace_id = parent.trace_id if parent is not None else self.span_id
+        self.thread = None
+        self.start_ns = self.end_ns = 0
+        self._token = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+        return self
+
+    @property
+    def duration_ms(self):
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def __enter__(self):
+        self.thread = threading.current_thread().name
+        self._token = _current.set(self)
+        self.start_ns = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end_ns = time.perf_counter_ns()
+        _current.reset(self._token)
+        if exc_type is not None and exc_type is not SystemExit:
+            self.attrs["error"] = exc_type.__name__
+        collector.record(self)
+        return False
+
+    def to_dict(self):
+        return {"name": self.name, "trace_id": self.trace_id, "span_id": self.span_id,
+                "parent_id": self.parent_id, "thread": self.thread, "start_ns": self.start_ns,
+                "duration_ms": self.duration_ms, "attrs": self.attrs}
+
+
+class _NoopSpan:
+    """Returned by span() while tracing is off, so instrumented code costs one flag check."""
+
+    __slots__ = ()
+
+    def set(self, **attrs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class RollingStats:
+    """Durations of the last `window` occurrences of a stage, for p50/p95/p99."""
+
+    def __init__(self, window=STATS_WINDOW):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, duration_ms):
+        self.samples.append(duration_ms)
+        self.count += 1
+
+    def summary(self):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"count": self.count, "p50": 0.0, "p95": 0.0, "p99": 0.0, "max": 0.0, "mean": 0.0}
+
+        def pick(fraction):
+            return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+        return {"count": self.count, "p50": pick(0.50), "p95": pick(0.95), "p99": pick(0.99),
+                "max": ordered[-1], "mean": sum(ordered) / len(ordered)}
+
+
+class Collector:
+    """
+    Keeps the most recent finished spans and rolling duration stats per stage.
+    A span carrying an 'intent' attribute is also counted under 'name[intent]'.
+    """
+
+    def __init__(self, max_spans=MAX_SPANS, window=STATS_WINDOW):
+        self.spans = deque(maxlen=max_spans)
+        self.window = window
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def record(self, span):
+        duration = span.duration_ms
+        keys = [span.name]
+        if span.attrs.get("intent"):
+            keys.append(f"{span.name}[{span.attrs['intent']}]")
+        with self._lock:
+            self.spans.append(span)
+            for key in keys:
+                stats = self._stats.get(key)
+                if stats is None:
+                    stats = self._stats[key] = RollingStats(self.window)
+                stats.add(duration)
+
+    def stats(self):
+        with self._lock:
+            return {key: stats.summary() for key, stats in sorted(self._stats.items())}
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.spans)
+
+    def reset(self):
+        with self._lock:
+            self.spans.clear()
+            self._stats.clear()
+
+
+collector = Collector()
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def current_span():
+    return _current.get()
+
+
+def span(name, parent=None, **attrs):
+    """
+    Context manager timing one stage, as a child of the current span (or of
+    parent, for work handed over from another thread). Use `as s` and
+    s.set(...) to attach attributes found out along the way.
+    """
+    if not _enabled:
+        return _NOOP
+    return Span(name, parent if parent is not None else _current.get(), attrs)
+
+
+def traced(name=None):
+    """Decorator wrapping every call of a function in a span."""
+    def decorator(fn):
+        span_name = name or fn.__name__
+
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            with span(span_name):
+                return fn(*args, **kwargs)
+        wrapper.__name__ = fn.__name__
+        wrapper.__doc__ = fn.__doc__
+        wrapper.__wrapped__ = fn
+        return wrapper
+    return decorator
+
+
+def bind(fn):
+    """
+    Return fn bound to the caller's tracing context, for running on another
+    thread (thread pools do not inherit context variables).
+    """
+    if not _enabled:
+        return fn
+    context = contextvars.copy_context()
+
+    def run(*args, **kwargs):
+        return context.run(fn, *args, **kwargs)
+    return run
+
+
+def stats():
+    """Rolling p50/p95/p99/max/mean (ms) and counts per stage and per stage[intent]."""
+    return collector.stats()
+
+
+def export_jsonl(path, spans=None):
+    """Write finished spans, one JSON object per line."""
+    spans = collector.snapshot() if spans is None else spans
+    with open(path, "w", encoding="utf-8") as f:
+        for s in spans:
+            f.write(json.dumps(s.to_dict()) + "\n")
+    return len(spans)
+
+
+def export_chrome_trace(path, spans=None):
+    """Write finished spans in Chrome trace event format (chrome://tracing, Perfetto)."""
+    spans = collector.snapshot() if spans is None else spans
+    threads = {}
+    events = []
+    for s in spans:
+        tid = threads.setdefault(s.thread, len(threads) + 1)
+        events.append({"name": s.name, "ph": "X", "pid": os.getpid(), "tid": tid,
+                       "ts": s.start_ns / 1000, "dur": (s.end_ns - s.start_ns) / 1000,
+                       "args": dict(s.attrs, trace_id=s.trace_id, span_id=s.span_id, parent_id=s.parent_id)})
+    for thread, tid in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": thread}})
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+    return len(spans)
@@ -0,0 +1,273 @@
+import time
+from audio_capture import (EnergyVAD, MicrophoneSource, RingBuffer, capture_utterance, SAMPLE_RATE, SAMPLE_WIDTH,
+                           SPEECH_START_FRAMES)
+from tracing import span
+from speech_worker import is_speaking
+
+WAKE_WORDS = ("jarvis",)
+# Audio kept from before a voiced segment starts, the pause that ends a
+# segment, and the longest segment handed to the keyword spotter.
+PRE_ROLL_MS = 500
+SEGMENT_SILENCE_MS = 300
+MAX_SEGMENT_MS = 2500
+# Audio dropped after our own speech ends, so its echo does not start a segment.
+ECHO_TAIL_MS = 250
+# How long to wait for the command to start after a wake word said on its
+# own; a command said in the same breath is dispatched without waiting.
+COMMAND_TIMEOUT = 1.0
+# Seconds of audio between duty-cycle reports (0 disables them).
+REPORT_INTERVAL = 300
+# pocketsphinx keyword threshold: lower values spot more readily.
+SPHINX_SENSITIVITY = 1e-20
+
+
+class SphinxKeywordSpotter:
+    """Local keyword spotting with pocketsphinx, through SpeechRecognition's recognize_sphinx."""
+
+    def __init__(self, keywords=WAKE_WORDS, sensitivity=SPHINX_SENSITIVITY):
+        import speech_recognition as sr
+        import pocketsphinx  # noqa: F401 -- fail here, not on the first voiced frame
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self.keyword_entries = [(keyword, sensitivity) for keyword in keywords]
+
+    def spot(self, pcm, rate=SAMPLE_RATE):
+        audio = self._sr.AudioData(pcm, rate, SAMPLE_WIDTH)
+        try:
+            return bool(self._recognizer.recognize_sphinx(audio, keyword_entries=self.keyword_entries).strip())
+        except self._sr.UnknownValueError:
+            return False
+
+
+class TranscribingSpotter:
+    """
+    Fallback spotter when pocketsphinx is not installed: transcribes voiced
+    segments with the Google recognizer and looks for the wake word. Still
+    gated by the energy check, so silence never reaches the network.
+    """
+
+    def __init__(self, keywords=WAKE_WORDS):
+        import speech_recognition as sr
+        self._sr = sr
+        self._recognizer = sr.Recognizer()
+        self.keywords = tuple(k.lower() for k in keywords)
+
+    def spot(self, pcm, rate=SAMPLE_RATE):
+        try:
+            text = self._recognizer.recognize_google(self._sr.AudioData(pcm, rate, SAMPLE_WIDTH), language='en-in')
+        except (self._sr.UnknownValueError, self._sr.RequestError):
+            return False
+        return any(keyword in text.lower() for keyword in self.keywords)
+
+
+def default_spotter():
+    try:
+        return SphinxKeywordSpotter()
+    except ImportError:
+        print("[WARN] pocketsphinx is not installed; spotting the wake word with online recognition.")
+        return TranscribingSpotter()
+
+
+def recognize_command(pcm, rate=SAMPLE_RATE):
+    """Transcribe command audio with the Google recognizer; returns the text or None."""
+    import speech_recognition as sr
+    try:
+        with span("recognize"):
+            return sr.Recognizer().recognize_google(sr.AudioData(pcm, rate, SAMPLE_WIDTH), language='en-in')
+    except sr.UnknownValueError:
+        print("Sorry, I did not understand that. Please try again.")
+    except sr.RequestError as e:
+        print(f"Could not request results from Google Speech Recognition service; {e}")
+    return None
+
+
+def strip_wake_word(text, wake_words=WAKE_WORDS):
+    """Drop everything up to and including the wake word ("hey jarvis open chrome" -> "open chrome")."""
+    lowered = text.lower()
+    for word in wake_words:
+        i = lowered.find(word)
+        if i != -1:
+            return text[i + len(word):].strip(" ,.!?")
+    return text.strip()
+
+
+class WakeListener:
+    """
+    Listens on a continuous frame stream for the wake word.
+
+    Every frame passes a cheap energy check; only voiced segments (with a short
+    pre-roll, so the start of the word is not clipped) are handed to the
+    keyword spotter. On a hit, the segment is transcribed first: if words
+    follow the wake word ("jarvis open chrome" in one breath) they are passed
+    to on_command straight away. Otherwise the command is captured, keeping
+    the wake-word segment as pre-roll, then transcribed and passed on. CPU
+    time spent gating and spotting
+    is tracked against seconds of audio, which gives the duty cycle.
+
+    While the assistant is speaking (is_speaking() is true), frames are
+    dropped and any partial segment discarded, so it cannot wake itself with
+    its own voice.
+    """
+
+    def __init__(self, source, spotter=None, on_command=None, recognizer=recognize_command, vad=None,
+                 wake_words=WAKE_WORDS, report_interval=REPORT_INTERVAL, is_speaking=is_speaking):
+        self.source = source
+        self.spotter = spotter or default_spotter()
+        self.on_command = on_command
+        self.recognizer = recognizer
+        self.vad = vad or EnergyVAD()
+        self.wake_words = wake_words
+        self.report_interval = report_interval
+        self.is_speaking = is_speaking
+        self.rate = getattr(source, "rate", SAMPLE_RATE)
+        self.frames = 0
+        self.muted_frames = 0
+        self.voiced_frames = 0
+        self.segments = 0
+        self.wakes = 0
+        self.commands = 0
+        self.audio_seconds = 0.0
+        self.gate_cpu = 0.0
+        self.spot_cpu = 0.0
+
+    def _spot(self, pcm):
+        self.segments += 1
+        started = time.thread_time()
+        with span("wake_spot", seconds=round(len(pcm) / (self.rate * SAMPLE_WIDTH), 3)) as s:
+            detected = self.spotter.spot(pcm, self.rate)
+            s.set(detected=detected)
+        self.spot_cpu += time.thread_time() - started
+        return detected
+
+    def _handle_wake(self, segment, complete=True):
+        """
+        Transcribe and dispatch the command after a wake word. complete is
+        False when the segment was cut off at MAX_SEGMENT_MS, so the speaker
+        is still talking and the rest must be captured before transcribing.
+        """
+        self.wakes += 1
+        print("[DEBUG] Wake word detected.")
+        text = self.recognizer(segment, self.rate) if complete else None
+        command = strip_wake_word(text, self.wake_words) if text else ""
+        if not command:
+            with span("command_capture"):
+                pcm = capture_utterance(self.source, vad=self.vad, no_speech_timeout=COMMAND_TIMEOUT,
+                                        pre_roll=segment)
+            if pcm:
+                self.audio_seconds += (len(pcm) - len(segment)) / (self.rate * SAMPLE_WIDTH)
+                text = self.recognizer(pcm, self.rate)
+            elif not complete:
+                text = self.recognizer(segment, self.rate)
+            if not text:
+                return
+            command = strip_wake_word(text, self.wake_words)
+        print(f"User said: {command}")
+        if command and self.on_command is not None:
+            self.commands += 1
+            self.on_command(command)
+
+    def run(self, max_commands=None, on_ready=None):
+        """
+        Listen until the source runs dry (or max_commands were handled); returns stats().
+        on_ready, if given, is called once the listener is live.
+        """
+        bytes_per_ms = self.rate * SAMPLE_WIDTH // 1000
+        pre_roll = RingBuffer(PRE_ROLL_MS * bytes_per_ms)
+        segment = RingBuffer(MAX_SEGMENT_MS * bytes_per_ms)
+        in_segment = False
+        voiced_run = 0
+        silence = 0
+        echo_left = 0
+        next_report = self.report_interval
+        print("Listening for the wake word...")
+        if on_ready is not None:
+            on_ready()
+        while max_commands is None or self.commands < max_commands:
+            frame = self.source.read_frame()
+            if not frame:
+                break
+            started = time.thread_time()
+            self.frames += 1
+            self.audio_seconds += len(frame) / (self.rate * SAMPLE_WIDTH)
+            if self.is_speaking():
+                echo_left = ECHO_TAIL_MS * bytes_per_ms
+                muted = True
+            else:
+                muted = echo_left > 0
+                echo_left -= len(frame)
+            if muted:
+                self.muted_frames += 1
+                pre_roll.clear()
+                segment.clear()
+                in_segment, voiced_run, silence = False, 0, 0
+                self.gate_cpu += time.thread_time() - started
+                continue
+            voiced = self.vad.is_speech(frame)
+            self.voiced_frames += voiced
+            ready = None
+            complete = True
+            if not in_segment:
+                pre_roll.write(frame)
+                voiced_run = voiced_run + 1 if voiced else 0
+                if voiced_run >= SPEECH_START_FRAMES:
+                    in_segment, silence = True, 0
+                    segment.clear()
+                    segment.write(pre_roll.getvalue())
+            else:
+                segment.write(frame)
+                silence = 0 if voiced else silence + len(frame)
+                if silence >= SEGMENT_SILENCE_MS * bytes_per_ms or segment.full:
+                    complete = not segment.full
+                    ready = segment.getvalue()
+                    in_segment, voiced_run = False, 0
+                    pre_roll.clear()
+            self.gate_cpu += time.thread_time() - started
+            if ready is not None and self._spot(ready):
+                self._handle_wake(ready, complete)
+            if self.report_interval and self.audio_seconds >= next_report:
+                next_report += self.report_interval
+                self.report()
+        return self.stats()
+
+    def stats(self):
+        audio = self.audio_seconds or 1e-9
+        return {
+            "audio_seconds": self.audio_seconds,
+            "frames": self.frames,
+            "muted_frames": self.muted_frames,
+            "voiced_fraction": self.voiced_frames / self.frames if self.frames else 0.0,
+            "segments_spotted": self.segments,
+            "wakes": self.wakes,
+            "commands": self.commands,
+            "gate_cpu_seconds": self.gate_cpu,
+            "spot_cpu_seconds": self.spot_cpu,
+            # CPU seconds used per second of audio listened to.
+            "duty_cycle": (self.gate_cpu + self.spot_cpu) / audio,
+        }
+
+    def report(self):
+        stats = self.stats()
+        print(f"[DEBUG] Wake listener: {stats['audio_seconds']:.0f}s audio, "
+              f"{stats['voiced_fraction']:.0%} voiced, {stats['segments_spotted']} segments spotted, "
+              f"CPU duty cycle {stats['duty_cycle']:.2%}")
+
+
+def listen_for_wake_word(source=None, spotter=None, on_command=None, max_commands=None, on_ready=None):
+    """
+    Listen for the wake word and run each following command through
+    handle_command. Reads the microphone unless a source (e.g. a
+    WavFileSource) is given; returns the listener stats when the source ends.
+    on_ready is called once listening has started.
+    """
+    if on_command is None:
+        from command_handler import handle_command as on_command
+    owned = source is None
+    if owned:
+        source = MicrophoneSource()
+    listener = WakeListener(source, spotter=spotter, on_command=on_command)
+    try:
+        return listener.run(max_commands, on_ready)
+    finally:
+        listener.report()
+        if owned:
+            source.close()